@@ -1,16 +1,51 @@
 from typing import List, Dict, Any, Optional
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import AgentExecutor
 from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
+from langchain_core.memory import BaseMemory
 from langchain.agents.format_scratchpad import format_to_openai_functions
 from langchain.agents.output_parsers import OpenAIFunctionsAgentOutputParser
-from dotenv import load_dotenv
+import copy
+import functools
 import os
 
-load_dotenv()
+from db.embedding_cache import normalize_text
+from utils.singleflight import SingleFlight
+from .llm import get_llm
+from .memory import BoundedSummaryMemory, current_session
+
+agent_flights = SingleFlight("agent_requests")
+
+
+def coalesce_requests(method):
+    """Share one run of an agent's ``process_request`` between concurrent identical requests.
+
+    Requests in conversations with no history yet (every request without a
+    ``session_id`` starts one) match on the agent and the input up to
+    whitespace, whichever session they belong to; the exchange is then saved
+    to each session's memory. Later turns depend on their own history, so
+    they only match requests of the same session.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, user_input: str) -> Dict[str, Any]:
+        memory = getattr(self, "memory", None)
+        fresh = getattr(memory, "empty", False)
+        key = (self.name, method.__qualname__, None if fresh else current_session(), normalize_text(user_input))
+        led = False
+
+        def run():
+            nonlocal led
+            led = True
+            return method(self, user_input)
+
+        result = dict(await agent_flights.ado(key, run))
+        if fresh and not led and "response" in result:
+            # Served by another session's run, which wrote only its own memory.
+            await memory.asave_context({"input": user_input}, {"output": str(result["response"])})
+        return result
+    return wrapper
+
 
 class BaseAgent:
     """Base agent class that all specialized agents will inherit from."""
@@ -27,19 +62,15 @@ class BaseAgent:
         self.description = description
         self.temperature = temperature
         
-        # Initialize the LLM
-        self.llm = ChatGoogleGenerativeAI(
+        # Shared client from the registry; agents with the same settings reuse one connection
+        self.llm = get_llm(
             model="gemini-1.5-flash",
             temperature=temperature,
-            convert_system_message_to_human=True,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
+            convert_system_message_to_human=True
         )
         
-        # Initialize memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+        # Per-session memory: a bounded window of recent exchanges plus a rolling summary
+        self.memory = BoundedSummaryMemory(namespace=name)
         
         # Tools will be initialized by subclasses
         self.tools = []
@@ -85,6 +116,7 @@ class BaseAgent:
             max_iterations=3
         )
     
+    @coalesce_requests
     async def process_request(self, user_input: str) -> Dict[str, Any]:
         """Process a user request and return the response.
         
@@ -109,6 +141,25 @@ class BaseAgent:
                 "thought_process": []
             }
     
+    def for_session(self, memory: BaseMemory) -> "BaseAgent":
+        """A view of this agent with its own memory.
+
+        The view shares the LLM client, tools, sub-agents and compiled prompt
+        with this agent. Only the memory and the executor wrapping it are new,
+        so a view costs a few objects.
+
+        Args:
+            memory: The session's memory
+
+        Returns:
+            A shallow copy of the agent bound to ``memory``
+        """
+        view = copy.copy(self)
+        view.memory = memory
+        if self.agent is not None:
+            view.agent = self.agent.model_copy(update={"memory": memory})
+        return view
+
     def get_tools(self) -> List[Tool]:
         """Get all tools for this agent.
         
@@ -1,9 +1,14 @@
 from typing import List, Dict, Any
 from langchain.tools import Tool
 from langchain_core.tools import tool
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, coalesce_requests
+from .dag import Step, run_dag
+from .llm import get_llm
+from .tool_registry import tool_registry
+from utils.project_writer import project_writer
 import re
 import ast
+import functools
 import json
 import os
 import shutil
@@ -11,7 +16,6 @@ import logging
 import traceback
 from pathlib import Path
 from langchain_core.messages import HumanMessage
-from langchain.memory import ConversationBufferMemory
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 import aiohttp
 import asyncio
@@ -28,411 +32,196 @@ logging.basicConfig(
 logger = logging.getLogger("CodingAgent")
 from langchain.tools import StructuredTool
 
+# Per-step limits of an application scaffold; a step that runs over is reported and its dependents skipped.
+SCAFFOLD_GENERATION_TIMEOUT = float(os.getenv("SCAFFOLD_GENERATION_TIMEOUT", "120"))
+SCAFFOLD_FILE_TIMEOUT = float(os.getenv("SCAFFOLD_FILE_TIMEOUT", "30"))
+
+# thought_process lines for each scaffold step: (on success, prefix of the error on failure)
+SCAFFOLD_MESSAGES = {
+    "structure": (lambda result: f"Created project structure: {result}", "Error creating project structure"),
+    "frontend_code": (lambda _: "Generated frontend code for task management application", "Error generating frontend code"),
+    "frontend_file": (lambda path: f"Created frontend file: {path}", "Error creating frontend file"),
+    "codesandbox": (lambda _: "Created a CodeSandbox for interactive testing of the frontend component", "Error creating CodeSandbox"),
+    "backend_code": (lambda _: "Generated backend code for task management application", "Error generating backend code"),
+    "backend_file": (lambda path: f"Created backend file: {path}", "Error creating backend file"),
+}
+
 
 
 class ProjectInput(BaseModel):
     project_type: str = "fullstack"
     project_name: str = "task-manager"
-class CodingAgent(BaseAgent):
-    """A specialized agent for code generation, debugging, and analysis with sub-agents for different tasks."""
-    
-    def __init__(self, temperature: float = 0.2):
-        """Initialize the coding agent.
-        
-        Args:
-            temperature: The temperature for the LLM (0.0 to 1.0)
-        """
-        logger.info("Initializing CodingAgent")
-        super().__init__(
-            name="Coding Agent",
-            description="A specialized agent for code generation, debugging, and analysis.",
-            temperature=temperature
-        )
-        
-        # Initialize sub-agents
-        logger.info("Initializing sub-agents")
-        self.frontend_agent = FrontendAgent()
-        self.backend_agent = BackendAgent()
-        self.misc_agent = MiscAgent()
-        logger.info("Initializing memory")
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
-        
-        logger.info("Creating tools")
-        self.tools = self._create_tools()
-        logger.info("Creating agent")
-        self.agent = self._create_agent(self._get_system_prompt())
-        logger.info("CodingAgent initialization complete")
-    
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for the coding agent.
-        
-        Returns:
-            The system prompt
-        """
-        logger.debug("Getting system prompt")
-        return """You are an expert coding agent that helps with code generation, debugging, and analysis.
-        You have specialized sub-agents for frontend, backend, and miscellaneous tasks.
-        You can create complete applications with proper file and folder structures.
-        You write clean, efficient, and well-documented code.
-        You follow best practices and design patterns.
-        You can explain your code and reasoning clearly.
-        You can debug issues and suggest improvements.
-        
-        When asked to create a full-stack application:
-        1. First use the create_project_structure tool to set up the project structure
-        2. Then use generate_frontend_code to create frontend components
-        3. Then use generate_backend_code to create backend API endpoints and models
-        4. Use create_file to save the generated code to the appropriate files
-        5. Provide clear instructions on how to run the application
-        
-        You can also use the run_in_codesandbox tool to create an interactive sandbox environment where users can see and run the code in real-time. This is especially useful for:
-        - Demonstrating how a component works
-        - Testing code snippets
-        - Providing interactive examples
-        - Allowing users to modify and experiment with the code
-        
-        Always use the available tools to accomplish tasks rather than just providing code snippets.
-        You have the capability to create complete applications with proper file structures.
-        """
-    
-    def _create_agent(self, system_prompt: str) -> AgentExecutor:
-        """Create the agent with the given system prompt.
-        
-        Args:
-            system_prompt: The system prompt for the agent
-            
-        Returns:
-            The agent executor
-        """
-        logger.debug("Creating agent with system prompt")
-        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        llm_with_tools = self.llm.bind(tools=self.tools)
-        
-        agent = create_tool_calling_agent(
-            tools=self.tools,
-            llm=self.llm,
-            prompt=prompt
-        )
-        
-        return AgentExecutor.from_agent_and_tools(
-            agent=agent,
-            tools=self.tools,
-            memory=self.memory,
-        )
-    
-    async def process_request(self, user_input: str) -> Dict[str, Any]:
-        """Process a user request and return the response.
-        
-        Args:
-            user_input: The user's input
-            
-        Returns:
-            A dictionary containing the response and thought process
-        """
-        logger.info(f"Processing request: {user_input}")
-        try:
-            # Check if the request is for creating a full-stack application
-            if "create" in user_input.lower() and ("full-stack" in user_input.lower() or "fullstack" in user_input.lower() or "application" in user_input.lower()):
-                logger.info("Detected application creation request")
-                
-                # Extract project name if provided
-                project_name = "task-manager"  # Default name
-                project_type = "fullstack"     # Default type
-                
-                # Try to extract project name
-                name_match = re.search(r'name[d\s:]+([a-zA-Z0-9_-]+)', user_input, re.IGNORECASE)
-                if name_match:
-                    project_name = name_match.group(1)
-                    logger.info(f"Extracted project name: {project_name}")
-                
-                # Try to extract project type
-                if "react" in user_input.lower():
-                    project_type = "react"
-                    logger.info("Detected React project type")
-                elif "express" in user_input.lower():
-                    project_type = "express"
-                    logger.info("Detected Express project type")
-                
-                logger.info(f"Creating {project_type} project with name: {project_name}")
-                
-                thought_process = []
-                
-                try:
-                    # Create project structure
-                    logger.info(f"Creating project structure for {project_name}")
-                    # Call the tool with a single tool_input argument
-                    tool_input = {"project_type": "react", "project_name": "task-manager"}
-                    print(tool_input)
-                    structure_result = await self.tools[5].arun(tool_input)
-                    logger.info(f"Project structure created: {structure_result}")
-                    thought_process.append(f"Created project structure: {structure_result}")
-                except Exception as e:
-                    logger.error(f"Error creating project structure: {str(e)}")
-                    logger.error(traceback.format_exc())
-                    thought_process.append(f"Error creating project structure: {str(e)}")
-                    return {
-                        "error": f"Failed to create project structure: {str(e)}",
-                        "thought_process": thought_process
-                    }
-                
-                # Only proceed with code generation if it's a fullstack or specific type request
-                if project_type in ["fullstack", "react", "express"]:
-                    try:
-                        # Generate frontend code if it's a fullstack or react project
-                        if project_type in ["fullstack", "react"]:
-                            logger.info("Generating frontend code")
-                            frontend_prompt = f"Create a React frontend for a task management application with the following features: task list, task creation form, task details view, and task filtering by category. Include proper state management and API integration."
-                            # Call the tool with a single tool_input argument
-                            tool_input = {"prompt": frontend_prompt, "framework": "react"}
-                            frontend_code = await self.tools[9].arun(tool_input)
-                            logger.info("Frontend code generated successfully")
-                            thought_process.append("Generated frontend code for task management application")
-                            
-                            # Create frontend file
-                            try:
-                                logger.info("Creating frontend file")
-                                frontend_path = f"{project_name}/{'src' if project_type == 'react' else 'client/src'}/components/TaskList.js"
-                                # Call the tool with a single tool_input argument
-                                tool_input = {"file_path": frontend_path, "content": frontend_code}
-                                await self.tools[6].arun(tool_input)
-                                logger.info(f"Created frontend file: {frontend_path}")
-                                thought_process.append(f"Created frontend file: {frontend_path}")
-                            except Exception as e:
-                                logger.error(f"Error creating frontend file: {str(e)}")
-                                logger.error(traceback.format_exc())
-                                thought_process.append(f"Error creating frontend file: {str(e)}")
-                        
-                        # Generate backend code if it's a fullstack or express project
-                        if project_type in ["fullstack", "express"]:
-                            logger.info("Generating backend code")
-                            backend_prompt = f"Create an Express backend for a task management application with the following features: task CRUD operations, MongoDB integration, and proper error handling."
-                            # Call the tool with a single tool_input argument
-                            tool_input = {"prompt": backend_prompt, "framework": "express"}
-                            backend_code = await self.tools[10].arun(tool_input)
-                            logger.info("Backend code generated successfully")
-                            thought_process.append("Generated backend code for task management application")
-                            
-                            # Create backend file
-                            try:
-                                logger.info("Creating backend file")
-                                backend_path = f"{project_name}/{'src' if project_type == 'express' else 'server/src'}/models/Task.js"
-                                # Call the tool with a single tool_input argument
-                                tool_input = {"file_path": backend_path, "content": backend_code}
-                                await self.tools[6].arun(tool_input)
-                                logger.info(f"Created backend file: {backend_path}")
-                                thought_process.append(f"Created backend file: {backend_path}")
-                            except Exception as e:
-                                logger.error(f"Error creating backend file: {str(e)}")
-                                logger.error(traceback.format_exc())
-                                thought_process.append(f"Error creating backend file: {str(e)}")
-                    except Exception as e:
-                        logger.error(f"Error generating code: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        thought_process.append(f"Error generating code: {str(e)}")
-                        # Continue with the response even if code generation fails
-                
-                # Create a CodeSandbox for the frontend component if it's a fullstack or react project
-                codesandbox_result = "CodeSandbox creation skipped."
-                if project_type in ["fullstack", "react"] and 'frontend_code' in locals():
-                    try:
-                        logger.info("Creating CodeSandbox")
-                        # Call the tool with a single tool_input argument
-                        tool_input = {
-                            "code": frontend_code,
-                            "language": "react",
-                            "dependencies": '{"react": "^18.2.0", "react-dom": "^18.2.0", "axios": "^1.3.5"}'
-                        }
-                        codesandbox_result = await self.tools[12].arun(tool_input)
-                        logger.info(f"CodeSandbox created: {codesandbox_result}")
-                        thought_process.append("Created a CodeSandbox for interactive testing of the frontend component")
-                    except Exception as e:
-                        logger.error(f"Error creating CodeSandbox: {str(e)}")
-                        logger.error(traceback.format_exc())
-                        thought_process.append(f"Error creating CodeSandbox: {str(e)}")
-                        # Continue without CodeSandbox
-                
-                # Return a comprehensive response
-                logger.info("Returning response")
-                
-                # Customize response based on project type
-                if project_type == "react":
-                    run_instructions = f"1. Navigate to the project directory: cd {project_name}\n2. Install dependencies: npm install\n3. Start the development server: npm start"
-                elif project_type == "express":
-                    run_instructions = f"1. Navigate to the project directory: cd {project_name}\n2. Install dependencies: npm install\n3. Start the server: npm run dev"
-                else:  # fullstack
-                    run_instructions = f"1. Navigate to the project directory: cd {project_name}\n2. Install dependencies: npm run install-all\n3. Start the development servers: npm run dev"
-                
-                return {
-                    "response": f"I've created a {project_type} task management application. The project structure has been set up in the '{project_name}' directory.\n\nTo run the application:\n{run_instructions}\n\nThis will start the development server(s).\n\n{codesandbox_result}",
-                    "thought_process": thought_process
-                }
-            
-            # For other requests, use the agent normally
-            try:
-                logger.info("Using agent for non-application request")
-                response = await self.agent.ainvoke({"input": user_input})
-                logger.info("Agent response received")
-                return {
-                    "response": response["output"],
-                    "thought_process": response.get("intermediate_steps", [])
-                }
-            except Exception as e:
-                logger.error(f"Error processing request with agent: {str(e)}")
-                logger.error(traceback.format_exc())
-                return {
-                    "error": f"Error processing request with agent: {str(e)}",
-                    "thought_process": []
-                }
-        except Exception as e:
-            logger.error(f"Error processing request: {str(e)}")
-            logger.error(traceback.format_exc())
-            return {
-                "error": f"Error processing request: {str(e)}",
-                "thought_process": []
-            }
-    
-    def _create_tools(self) -> List[Tool]:
-        """Create the tools for the coding agent.
-        
-        Returns:
-            A list of tools
-        """
-        logger.info("Creating tools")
-        
-        @tool
-        async def generate_code(prompt: str, language: str = "python") -> str:
-            """Generate code based on the given prompt and language."""
-            logger.debug(f"Generating {language} code for prompt: {prompt[:50]}...")
-            try:
-                response = await self.llm.ainvoke([HumanMessage(content=f"Generate {language} code for: {prompt}")])
-                logger.debug("Code generated successfully")
-                return response.content
-            except Exception as e:
-                logger.error(f"Error generating code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error generating code: {str(e)}"
-        
-        @tool
-        async def debug_code(code: str, error_message: str = "") -> str:
-            """Debug code and fix issues."""
-            logger.debug(f"Debugging code with error message: {error_message[:50] if error_message else 'None'}")
-            try:
-                if error_message:
-                    prompt = f"Debug this code and fix the error: {error_message}\n\nCode:\n{code}"
-                else:
-                    prompt = f"Review this code for bugs and potential issues:\n{code}"
-                
-                response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-                logger.debug("Code debugging completed")
-                return response.content
-            except Exception as e:
-                logger.error(f"Error debugging code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error debugging code: {str(e)}"
-        
-        @tool
-        async def analyze_code(code: str) -> str:
-            """Analyze code for quality, complexity, and potential improvements."""
-            logger.debug("Analyzing code")
-            try:
-                # Basic static analysis
-                tree = ast.parse(code)
-                
-                # Count functions and classes
-                functions = len([node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)])
-                classes = len([node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)])
-                
-                # Check for common issues
-                issues = []
-                
-                # Check for long functions (more than 50 lines)
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.FunctionDef) and len(node.body) > 50:
-                        issues.append(f"Function '{node.name}' is too long ({len(node.body)} lines)")
-                
-                # Check for global variables
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.Global):
-                        issues.append(f"Global variables used in function '{node.parent.name}'")
-                
-                # Generate analysis report
-                report = {
-                    "functions": functions,
-                    "classes": classes,
-                    "issues": issues,
-                    "recommendations": [
-                        "Consider adding docstrings to functions and classes",
-                        "Break down long functions into smaller ones",
-                        "Avoid global variables when possible",
-                        "Add type hints for better code clarity"
-                    ]
-                }
-                
-                logger.debug("Code analysis completed")
-                return json.dumps(report, indent=2)
-            except Exception as e:
-                logger.error(f"Error analyzing code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error analyzing code: {str(e)}"
-        
-        @tool
-        async def refactor_code(code: str, improvements: str = "") -> str:
-            """Refactor code to improve quality and maintainability."""
-            logger.debug(f"Refactoring code with improvements: {improvements[:50] if improvements else 'None'}")
-            try:
-                if improvements:
-                    prompt = f"Refactor this code with the following improvements: {improvements}\n\nCode:\n{code}"
-                else:
-                    prompt = f"Refactor this code to improve quality and maintainability:\n{code}"
-                
-                response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-                logger.debug("Code refactoring completed")
-                return response.content
-            except Exception as e:
-                logger.error(f"Error refactoring code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error refactoring code: {str(e)}"
-        
-        @tool
-        async def explain_code(code: str) -> str:
-            """Explain how the code works in detail."""
-            logger.debug("Explaining code")
-            try:
-                prompt = f"Explain how this code works in detail:\n{code}"
-                response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-                logger.debug("Code explanation completed")
-                return response.content
-            except Exception as e:
-                logger.error(f"Error explaining code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error explaining code: {str(e)}"
-        
-        @tool(args_schema=ProjectInput)
-        async def create_project_structure(project_type: str, project_name: str)->str:
-            """ Create a project structure with appropriate folders and files."""
-            logger.debug("Creating project structure")
-            return f"Created {project_type} project named {project_name}"
 
-    
-        # @tool
+
+# The coding tools are built and registered once at import and shared by every CodingAgent.
+# They call the shared client of the coding agent's default settings, whatever an instance's temperature.
+CODING_TOOL_TEMPERATURE = 0.2
+
+# Registered names of the tools a CodingAgent is given, in the order the model sees them.
+CODING_TOOLS = (
+    "generate_code",
+    "debug_code",
+    "analyze_code",
+    "refactor_code",
+    "explain_code",
+    "create_project_structure",
+    "create_file",
+    "create_files",
+    "create_directory",
+    "generate_frontend_code",
+    "generate_backend_code",
+    "generate_misc_code",
+    "run_in_codesandbox",
+)
+
+
+def _tool_llm():
+    return get_llm(model="gemini-1.5-flash", temperature=CODING_TOOL_TEMPERATURE, convert_system_message_to_human=True)
+
+
+async def _run_step_tool(name: str, tool_input: Dict[str, Any]) -> str:
+    """Run a tool for a scaffold step, raising if it reports an error instead of a result.
+
+    The tools catch their own exceptions and return an "Error ..." message for
+    the agent to read; a scaffold step must fail instead, so that the steps
+    depending on it are skipped rather than fed the message as code.
+    """
+    result = await tool_registry.get(name).arun(tool_input)
+    if isinstance(result, str) and result.startswith("Error"):
+        # "Error generating code: <cause>" -> "<cause>"; the step's own message names the step.
+        raise RuntimeError(result.split(": ", 1)[-1])
+    return result
+
+
+@functools.lru_cache(maxsize=None)
+def _sub_agent(kind: str):
+    """The shared frontend, backend or misc sub-agent, built on first use."""
+    return {"frontend": FrontendAgent, "backend": BackendAgent, "misc": MiscAgent}[kind]()
+
+
+@tool
+async def generate_code(prompt: str, language: str = "python") -> str:
+    """Generate code based on the given prompt and language."""
+    logger.debug(f"Generating {language} code for prompt: {prompt[:50]}...")
+    try:
+        response = await _tool_llm().ainvoke([HumanMessage(content=f"Generate {language} code for: {prompt}")])
+        logger.debug("Code generated successfully")
+        return response.content
+    except Exception as e:
+        logger.error(f"Error generating code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error generating code: {str(e)}"
+
+@tool
+async def debug_code(code: str, error_message: str = "") -> str:
+    """Debug code and fix issues."""
+    logger.debug(f"Debugging code with error message: {error_message[:50] if error_message else 'None'}")
+    try:
+        if error_message:
+            prompt = f"Debug this code and fix the error: {error_message}\n\nCode:\n{code}"
+        else:
+            prompt = f"Review this code for bugs and potential issues:\n{code}"
+        
+        response = await _tool_llm().ainvoke([HumanMessage(content=prompt)])
+        logger.debug("Code debugging completed")
+        return response.content
+    except Exception as e:
+        logger.error(f"Error debugging code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error debugging code: {str(e)}"
+
+@tool
+async def analyze_code(code: str) -> str:
+    """Analyze code for quality, complexity, and potential improvements."""
+    logger.debug("Analyzing code")
+    try:
+        # Basic static analysis
+        tree = ast.parse(code)
+        
+        # Count functions and classes
+        functions = len([node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)])
+        classes = len([node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)])
+        
+        # Check for common issues
+        issues = []
+        
+        # Check for long functions (more than 50 lines)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) and len(node.body) > 50:
+                issues.append(f"Function '{node.name}' is too long ({len(node.body)} lines)")
+        
+        # Check for global variables
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Global):
+                issues.append(f"Global variables used in function '{node.parent.name}'")
+        
+        # Generate analysis report
+        report = {
+            "functions": functions,
+            "classes": classes,
+            "issues": issues,
+            "recommendations": [
+                "Consider adding docstrings to functions and classes",
+                "Break down long functions into smaller ones",
+                "Avoid global variables when possible",
+                "Add type hints for better code clarity"
+            ]
+        }
+        
+        logger.debug("Code analysis completed")
+        return json.dumps(report, indent=2)
+    except Exception as e:
+        logger.error(f"Error analyzing code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error analyzing code: {str(e)}"
+
+@tool
+async def refactor_code(code: str, improvements: str = "") -> str:
+    """Refactor code to improve quality and maintainability."""
+    logger.debug(f"Refactoring code with improvements: {improvements[:50] if improvements else 'None'}")
+    try:
+        if improvements:
+            prompt = f"Refactor this code with the following improvements: {improvements}\n\nCode:\n{code}"
+        else:
+            prompt = f"Refactor this code to improve quality and maintainability:\n{code}"
+        
+        response = await _tool_llm().ainvoke([HumanMessage(content=prompt)])
+        logger.debug("Code refactoring completed")
+        return response.content
+    except Exception as e:
+        logger.error(f"Error refactoring code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error refactoring code: {str(e)}"
+
+@tool
+async def explain_code(code: str) -> str:
+    """Explain how the code works in detail."""
+    logger.debug("Explaining code")
+    try:
+        prompt = f"Explain how this code works in detail:\n{code}"
+        response = await _tool_llm().ainvoke([HumanMessage(content=prompt)])
+        logger.debug("Code explanation completed")
+        return response.content
+    except Exception as e:
+        logger.error(f"Error explaining code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error explaining code: {str(e)}"
+
+@tool(args_schema=ProjectInput)
+async def create_project_structure(project_type: str, project_name: str)->str:
+    """ Create a project structure with appropriate folders and files."""
+    logger.debug("Creating project structure")
+    return f"Created {project_type} project named {project_name}"
+
+
+# @tool
 #         async def create_project_structure(project_type,project_name) -> str:
 
 #             """Create a project structure with appropriate folders and files.
-            
+    
 #             Args:
 #                 project:dict: A dictionary containing project_type and project_name
-            
+    
 #             Returns:
 #                 A string describing the result of the operation
 #             """
@@ -444,28 +233,28 @@ class CodingAgent(BaseAgent):
 #                 if project_type.lower() not in valid_types:
 #                     logger.warning(f"Invalid project type: {project_type}. Using default: fullstack")
 #                     project_type = "fullstack"
-                
+        
 #                 # Validate project name
 #                 if not project_name or not isinstance(project_name, str):
 #                     logger.warning(f"Invalid project name: {project_name}. Using default: task-manager")
 #                     project_name = "task-manager"
-                
+        
 #                 # Sanitize project name
 #                 project_name = re.sub(r'[^a-zA-Z0-9_-]', '-', project_name)
 #                 if not project_name:
 #                     project_name = "task-manager"
-                
+        
 #                 logger.info(f"Creating project structure with type: {project_type}, name: {project_name}")
-                
+        
 #                 # Create base directory
 #                 base_dir = Path(project_name)
 #                 if base_dir.exists():
 #                     logger.warning(f"Project directory '{project_name}' already exists.")
 #                     return f"Project directory '{project_name}' already exists."
-                
+        
 #                 base_dir.mkdir(parents=True)
 #                 logger.debug(f"Created base directory: {base_dir}")
-                
+        
 #                 # Create structure based on project type
 #                 if project_type.lower() == "react":
 #                     # React project structure
@@ -479,7 +268,7 @@ class CodingAgent(BaseAgent):
 #                     (base_dir / "src" / "utils").mkdir()
 #                     (base_dir / "src" / "services").mkdir()
 #                     (base_dir / "public").mkdir()
-                    
+            
 #                     # Create basic files
 #                     logger.debug("Creating React basic files")
 #                     with open(base_dir / "package.json", "w") as f:
@@ -500,7 +289,7 @@ class CodingAgent(BaseAgent):
 #     "eject": "react-scripts eject"
 #   }
 # }''')
-                    
+            
 #                     with open(base_dir / "src" / "index.js", "w") as f:
 #                         f.write('''import React from 'react';
 # import ReactDOM from 'react-dom/client';
@@ -512,7 +301,7 @@ class CodingAgent(BaseAgent):
 #     <App />
 #   </React.StrictMode>
 # );''')
-                    
+            
 #                     with open(base_dir / "src" / "App.js", "w") as f:
 #                         f.write('''import React from 'react';
 # import { BrowserRouter as Router, Routes, Route } from 'react-router-dom';
@@ -531,7 +320,7 @@ class CodingAgent(BaseAgent):
 # }
 
 # export default App;''')
-                    
+            
 #                 elif project_type.lower() == "express":
 #                     # Express project structure
 #                     logger.debug("Creating Express project structure")
@@ -542,7 +331,7 @@ class CodingAgent(BaseAgent):
 #                     (base_dir / "src" / "middleware").mkdir()
 #                     (base_dir / "src" / "config").mkdir()
 #                     (base_dir / "src" / "utils").mkdir()
-                    
+            
 #                     # Create basic files
 #                     logger.debug("Creating Express basic files")
 #                     with open(base_dir / "package.json", "w") as f:
@@ -566,7 +355,7 @@ class CodingAgent(BaseAgent):
 #     "nodemon": "^2.0.22"
 #   }
 # }''')
-                    
+            
 #                     with open(base_dir / "src" / "server.js", "w") as f:
 #                         f.write('''const express = require('express');
 # const cors = require('cors');
@@ -590,18 +379,18 @@ class CodingAgent(BaseAgent):
 # app.listen(PORT, () => {
 #   console.log(`Server running on port ${PORT}`);
 # });''')
-                    
+            
 #                     with open(base_dir / ".env", "w") as f:
 #                         f.write('''PORT=5000
 # MONGODB_URI=mongodb://localhost:27017/''' + project_name.lower() + '''
 # JWT_SECRET=your_jwt_secret_here''')
-                    
+            
 #                 elif project_type.lower() == "fullstack":
 #                     # Full-stack project structure (React + Express)
 #                     logger.debug("Creating full-stack project structure")
 #                     (base_dir / "client").mkdir()
 #                     (base_dir / "server").mkdir()
-                    
+            
 #                     # Create client structure (React)
 #                     logger.debug("Creating client structure")
 #                     (base_dir / "client" / "src").mkdir()
@@ -613,7 +402,7 @@ class CodingAgent(BaseAgent):
 #                     (base_dir / "client" / "src" / "utils").mkdir()
 #                     (base_dir / "client" / "src" / "services").mkdir()
 #                     (base_dir / "client" / "public").mkdir()
-                    
+            
 #                     # Create server structure (Express)
 #                     logger.debug("Creating server structure")
 #                     (base_dir / "server" / "src").mkdir()
@@ -623,7 +412,7 @@ class CodingAgent(BaseAgent):
 #                     (base_dir / "server" / "src" / "middleware").mkdir()
 #                     (base_dir / "server" / "src" / "config").mkdir()
 #                     (base_dir / "server" / "src" / "utils").mkdir()
-                    
+            
 #                     # Create basic files for client
 #                     logger.debug("Creating client basic files")
 #                     with open(base_dir / "client" / "package.json", "w") as f:
@@ -644,7 +433,7 @@ class CodingAgent(BaseAgent):
 #     "eject": "react-scripts eject"
 #   }
 # }''')
-                    
+            
 #                     # Create basic files for server
 #                     logger.debug("Creating server basic files")
 #                     with open(base_dir / "server" / "package.json", "w") as f:
@@ -668,7 +457,7 @@ class CodingAgent(BaseAgent):
 #     "nodemon": "^2.0.22"
 #   }
 # }''')
-                    
+            
 #                     # Create root package.json for scripts
 #                     logger.debug("Creating root package.json")
 #                     with open(base_dir / "package.json", "w") as f:
@@ -686,261 +475,461 @@ class CodingAgent(BaseAgent):
 #     "concurrently": "^8.0.1"
 #   }
 # }''')
-                
+        
 #                 else:
 #                     logger.warning(f"Unknown project type: {project_type}")
 #                     return f"Unknown project type: {project_type}. Supported types: react, express, fullstack"
-                
+        
 #                 logger.info(f"Created {project_type} project structure in '{project_name}' directory.")
 #                 return f"Created {project_type} project structure in '{project_name}' directory."
 #             except Exception as e:
 #                 logger.error(f"Error creating project structure: {str(e)}")
 #                 logger.error(traceback.format_exc())
 #                 return f"Error creating project structure: {str(e)}"
+
+@tool
+async def create_file(file_path: str, content: str) -> str:
+    """Create a file with the given content."""
+    logger.debug(f"Creating file: {file_path}")
+    report = await project_writer.awrite_files({file_path: content})
+    if not report.ok:
+        logger.error(f"Error creating file: {report.failed[file_path]}")
+        return f"Error creating file: {report.failed[file_path]}"
+    if report.unchanged:
+        return f"File already up to date: {file_path}"
+    return f"Created file: {file_path}"
+
+@tool
+async def create_files(files: str) -> str:
+    """Create many files at once from a JSON object mapping file paths to their content."""
+    try:
+        file_map = json.loads(files)
+    except json.JSONDecodeError:
+        logger.error("Invalid files JSON format")
+        return "Error: Invalid files JSON format"
+    if not isinstance(file_map, dict):
+        return "Error: files must be a JSON object mapping file paths to content"
+    logger.debug(f"Creating {len(file_map)} files")
+    report = await project_writer.awrite_files(file_map)
+    lines = [f"Created {len(report.written)} files, {len(report.unchanged)} already up to date."]
+    lines += [f"Error creating file {path}: {error}" for path, error in report.failed.items()]
+    return "\n".join(lines)
+
+@tool
+async def create_directory(dir_path: str) -> str:
+    """Create a directory and its parent directories if they don't exist."""
+    logger.debug(f"Creating directory: {dir_path}")
+    failed = await project_writer.amake_dirs([dir_path])
+    if failed:
+        error = next(iter(failed.values()))
+        logger.error(f"Error creating directory: {error}")
+        return f"Error creating directory: {error}"
+    return f"Created directory: {dir_path}"
+
+@tool
+async def generate_frontend_code(prompt: str, framework: str = "react") -> str:
+    """Generate frontend code using the frontend agent."""
+    logger.debug(f"Generating {framework} frontend code for prompt: {prompt[:50]}...")
+    try:
+        result = await _sub_agent("frontend").generate_code(prompt, framework)
+        logger.debug("Frontend code generated successfully")
+        return result
+    except Exception as e:
+        logger.error(f"Error generating frontend code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error generating frontend code: {str(e)}"
+
+@tool
+async def generate_backend_code(prompt: str, framework: str = "express") -> str:
+    """Generate backend code using the backend agent."""
+    logger.debug(f"Generating {framework} backend code for prompt: {prompt[:50]}...")
+    try:
+        result = await _sub_agent("backend").generate_code(prompt, framework)
+        logger.debug("Backend code generated successfully")
+        return result
+    except Exception as e:
+        logger.error(f"Error generating backend code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error generating backend code: {str(e)}"
+
+@tool
+async def generate_misc_code(prompt: str) -> str:
+    """Generate miscellaneous code using the misc agent."""
+    logger.debug(f"Generating miscellaneous code for prompt: {prompt[:50]}...")
+    try:
+        result = await _sub_agent("misc").generate_code(prompt)
+        logger.debug("Miscellaneous code generated successfully")
+        return result
+    except Exception as e:
+        logger.error(f"Error generating miscellaneous code: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error generating miscellaneous code: {str(e)}"
+
+@tool
+async def run_in_codesandbox(code: str, language: str = "javascript", dependencies: str = "") -> str:
+    """Run code in a CodeSandbox environment and return the results.
+    
+    Args:
+        code: The code to run
+        language: The programming language (javascript, python, etc.)
+        dependencies: JSON string of dependencies to include
+        
+    Returns:
+        The result of running the code
+    """
+    logger.debug(f"Running code in CodeSandbox with language: {language}")
+    try:
+        # Validate inputs
+        if not code or not isinstance(code, str):
+            logger.error("Invalid code provided")
+            return "Error: Invalid code provided"
+        
+        # Prepare the sandbox configuration
+        sandbox_config = {
+            "files": {
+                "index.js": {
+                    "content": code,
+                    "isBinary": False
+                }
+            },
+            "template": "node",
+            "dependencies": {}
+        }
         
-        @tool
-        async def create_file(file_path: str, content: str) -> str:
-            """Create a file with the given content."""
-            logger.debug(f"Creating file: {file_path}")
+        # Add dependencies if provided
+        if dependencies:
             try:
-                file_path = Path(file_path)
-                
-                # Create parent directories if they don't exist
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                logger.debug(f"Created parent directories: {file_path.parent}")
-                
-                # Write content to file
-                with open(file_path, "w") as f:
-                    f.write(content)
-                logger.debug(f"Wrote content to file: {file_path}")
-                
-                return f"Created file: {file_path}"
-            except Exception as e:
-                logger.error(f"Error creating file: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error creating file: {str(e)}"
+                deps = json.loads(dependencies)
+                sandbox_config["dependencies"] = deps
+                logger.debug(f"Added dependencies: {deps}")
+            except json.JSONDecodeError:
+                logger.error("Invalid dependencies JSON format")
+                return "Error: Invalid dependencies JSON format"
+        
+        # Set template based on language
+        if language.lower() == "python":
+            sandbox_config["template"] = "python"
+            sandbox_config["files"] = {
+                "main.py": {
+                    "content": code,
+                    "isBinary": False
+                }
+            }
+            logger.debug("Set template to python")
+        elif language.lower() == "react":
+            sandbox_config["template"] = "react"
+            sandbox_config["files"] = {
+                "src/App.js": {
+                    "content": code,
+                    "isBinary": False
+                }
+            }
+            logger.debug("Set template to react")
         
-        @tool
-        async def create_directory(dir_path: str) -> str:
-            """Create a directory and its parent directories if they don't exist."""
-            logger.debug(f"Creating directory: {dir_path}")
-            try:
-                dir_path = Path(dir_path)
-                dir_path.mkdir(parents=True, exist_ok=True)
-                logger.debug(f"Created directory: {dir_path}")
-                return f"Created directory: {dir_path}"
-            except Exception as e:
-                logger.error(f"Error creating directory: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error creating directory: {str(e)}"
+        # Create a sandbox using the CodeSandbox API
+        try:
+            logger.debug("Sending request to CodeSandbox API")
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    "https://codesandbox.io/api/v1/sandboxes/define?json=1",
+                    json=sandbox_config,
+                    timeout=30  # Add timeout
+                ) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"Error creating sandbox: {error_text}")
+                        return f"Error creating sandbox: {error_text}"
+                    
+                    try:
+                        sandbox_data = await response.json()
+                        sandbox_id = sandbox_data.get("sandbox_id")
+                        
+                        if not sandbox_id:
+                            logger.error("Failed to get sandbox ID")
+                            return "Error: Failed to get sandbox ID"
+                        
+                        # Get the sandbox URL
+                        sandbox_url = f"https://codesandbox.io/embed/{sandbox_id}?fontsize=14&hidenavigation=1&theme=dark"
+                        logger.info(f"CodeSandbox created successfully: {sandbox_url}")
+                        
+                        return f"CodeSandbox created successfully! You can view and run the code at: {sandbox_url}\n\nThis sandbox allows you to see the code in action and make modifications as needed."
+                    except Exception as json_error:
+                        logger.error(f"Error parsing sandbox response: {str(json_error)}")
+                        logger.error(traceback.format_exc())
+                        return f"Error parsing sandbox response: {str(json_error)}"
+        except aiohttp.ClientError as http_error:
+            logger.error(f"Error connecting to CodeSandbox API: {str(http_error)}")
+            logger.error(traceback.format_exc())
+            return f"Error connecting to CodeSandbox API: {str(http_error)}"
+        except asyncio.TimeoutError:
+            logger.error("Timeout connecting to CodeSandbox API")
+            return "Error: Timeout connecting to CodeSandbox API. Please try again later."
+    except Exception as e:
+        logger.error(f"Error running code in CodeSandbox: {str(e)}")
+        logger.error(traceback.format_exc())
+        return f"Error running code in CodeSandbox: {str(e)}"
+
+
+for _tool in (
+    generate_code,
+    debug_code,
+    analyze_code,
+    refactor_code,
+    explain_code,
+    create_project_structure,
+    create_file,
+    create_files,
+    create_directory,
+    generate_frontend_code,
+    generate_backend_code,
+    generate_misc_code,
+    run_in_codesandbox,
+):
+    tool_registry.register(_tool)
+
+
+class CodingAgent(BaseAgent):
+    """A specialized agent for code generation, debugging, and analysis with sub-agents for different tasks."""
+    
+    def __init__(self, temperature: float = 0.2):
+        """Initialize the coding agent.
         
-        @tool
-        async def generate_frontend_code(prompt: str, framework: str = "react") -> str:
-            """Generate frontend code using the frontend agent."""
-            logger.debug(f"Generating {framework} frontend code for prompt: {prompt[:50]}...")
-            try:
-                result = await self.frontend_agent.generate_code(prompt, framework)
-                logger.debug("Frontend code generated successfully")
-                return result
-            except Exception as e:
-                logger.error(f"Error generating frontend code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error generating frontend code: {str(e)}"
+        Args:
+            temperature: The temperature for the LLM (0.0 to 1.0)
+        """
+        logger.info("Initializing CodingAgent")
+        super().__init__(
+            name="Coding Agent",
+            description="A specialized agent for code generation, debugging, and analysis.",
+            temperature=temperature
+        )
         
-        @tool
-        async def generate_backend_code(prompt: str, framework: str = "express") -> str:
-            """Generate backend code using the backend agent."""
-            logger.debug(f"Generating {framework} backend code for prompt: {prompt[:50]}...")
-            try:
-                result = await self.backend_agent.generate_code(prompt, framework)
-                logger.debug("Backend code generated successfully")
-                return result
-            except Exception as e:
-                logger.error(f"Error generating backend code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error generating backend code: {str(e)}"
+        # Shared tools from the registry; their frontend, backend and misc sub-agents are built on first use
+        self.tools = tool_registry.tools(*CODING_TOOLS)
+        logger.info("Creating agent")
+        self.agent = self._create_agent(self._get_system_prompt())
+        logger.info("CodingAgent initialization complete")
+    
+    def _get_system_prompt(self) -> str:
+        """Get the system prompt for the coding agent.
         
-        @tool
-        async def generate_misc_code(prompt: str) -> str:
-            """Generate miscellaneous code using the misc agent."""
-            logger.debug(f"Generating miscellaneous code for prompt: {prompt[:50]}...")
-            try:
-                result = await self.misc_agent.generate_code(prompt)
-                logger.debug("Miscellaneous code generated successfully")
-                return result
-            except Exception as e:
-                logger.error(f"Error generating miscellaneous code: {str(e)}")
-                logger.error(traceback.format_exc())
-                return f"Error generating miscellaneous code: {str(e)}"
+        Returns:
+            The system prompt
+        """
+        logger.debug("Getting system prompt")
+        return """You are an expert coding agent that helps with code generation, debugging, and analysis.
+        You have specialized sub-agents for frontend, backend, and miscellaneous tasks.
+        You can create complete applications with proper file and folder structures.
+        You write clean, efficient, and well-documented code.
+        You follow best practices and design patterns.
+        You can explain your code and reasoning clearly.
+        You can debug issues and suggest improvements.
+        
+        When asked to create a full-stack application:
+        1. First use the create_project_structure tool to set up the project structure
+        2. Then use generate_frontend_code to create frontend components
+        3. Then use generate_backend_code to create backend API endpoints and models
+        4. Use create_file to save the generated code to the appropriate files, or create_files to save many files in one call
+        5. Provide clear instructions on how to run the application
         
-        @tool
-        async def run_in_codesandbox(code: str, language: str = "javascript", dependencies: str = "") -> str:
-            """Run code in a CodeSandbox environment and return the results.
+        You can also use the run_in_codesandbox tool to create an interactive sandbox environment where users can see and run the code in real-time. This is especially useful for:
+        - Demonstrating how a component works
+        - Testing code snippets
+        - Providing interactive examples
+        - Allowing users to modify and experiment with the code
+        
+        Always use the available tools to accomplish tasks rather than just providing code snippets.
+        You have the capability to create complete applications with proper file structures.
+        """
+    
+    def _create_agent(self, system_prompt: str) -> AgentExecutor:
+        """Create the agent with the given system prompt.
+        
+        Args:
+            system_prompt: The system prompt for the agent
             
-            Args:
-                code: The code to run
-                language: The programming language (javascript, python, etc.)
-                dependencies: JSON string of dependencies to include
+        Returns:
+            The agent executor
+        """
+        logger.debug("Creating agent with system prompt")
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{input}"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ])
+        
+        llm_with_tools = self.llm.bind(tools=self.tools)
+        
+        agent = create_tool_calling_agent(
+            tools=self.tools,
+            llm=self.llm,
+            prompt=prompt
+        )
+        
+        return AgentExecutor.from_agent_and_tools(
+            agent=agent,
+            tools=self.tools,
+            memory=self.memory,
+        )
+    
+    @coalesce_requests
+    async def process_request(self, user_input: str) -> Dict[str, Any]:
+        """Process a user request and return the response.
+        
+        Args:
+            user_input: The user's input
+            
+        Returns:
+            A dictionary containing the response and thought process
+        """
+        logger.info(f"Processing request: {user_input}")
+        try:
+            # Check if the request is for creating a full-stack application
+            if "create" in user_input.lower() and ("full-stack" in user_input.lower() or "fullstack" in user_input.lower() or "application" in user_input.lower()):
+                logger.info("Detected application creation request")
                 
-            Returns:
-                The result of running the code
-            """
-            logger.debug(f"Running code in CodeSandbox with language: {language}")
-            try:
-                # Validate inputs
-                if not code or not isinstance(code, str):
-                    logger.error("Invalid code provided")
-                    return "Error: Invalid code provided"
+                # Extract project name if provided
+                project_name = "task-manager"  # Default name
+                project_type = "fullstack"     # Default type
                 
-                # Prepare the sandbox configuration
-                sandbox_config = {
-                    "files": {
-                        "index.js": {
-                            "content": code,
-                            "isBinary": False
-                        }
-                    },
-                    "template": "node",
-                    "dependencies": {}
-                }
+                # Try to extract project name
+                name_match = re.search(r'name[d\s:]+([a-zA-Z0-9_-]+)', user_input, re.IGNORECASE)
+                if name_match:
+                    project_name = name_match.group(1)
+                    logger.info(f"Extracted project name: {project_name}")
                 
-                # Add dependencies if provided
-                if dependencies:
-                    try:
-                        deps = json.loads(dependencies)
-                        sandbox_config["dependencies"] = deps
-                        logger.debug(f"Added dependencies: {deps}")
-                    except json.JSONDecodeError:
-                        logger.error("Invalid dependencies JSON format")
-                        return "Error: Invalid dependencies JSON format"
+                # Try to extract project type
+                if "react" in user_input.lower():
+                    project_type = "react"
+                    logger.info("Detected React project type")
+                elif "express" in user_input.lower():
+                    project_type = "express"
+                    logger.info("Detected Express project type")
                 
-                # Set template based on language
-                if language.lower() == "python":
-                    sandbox_config["template"] = "python"
-                    sandbox_config["files"] = {
-                        "main.py": {
-                            "content": code,
-                            "isBinary": False
-                        }
-                    }
-                    logger.debug("Set template to python")
-                elif language.lower() == "react":
-                    sandbox_config["template"] = "react"
-                    sandbox_config["files"] = {
-                        "src/App.js": {
-                            "content": code,
-                            "isBinary": False
-                        }
+                logger.info(f"Creating {project_type} project with name: {project_name}")
+                
+                thought_process = []
+                steps = self._scaffold_steps(project_type, project_name)
+                results = await run_dag(steps)
+                for result in results.values():
+                    succeeded, failed = SCAFFOLD_MESSAGES[result.name]
+                    if result.ok:
+                        thought_process.append(succeeded(result.value))
+                    else:
+                        thought_process.append(f"{failed}: {result.error}")
+                logger.info("Scaffold steps: " + ", ".join(f"{r.name}={r.status} ({r.seconds:.1f}s)" for r in results.values()))
+                
+                if not results["structure"].ok:
+                    return {
+                        "error": f"Failed to create project structure: {results['structure'].error}",
+                        "thought_process": thought_process
                     }
-                    logger.debug("Set template to react")
                 
-                # Create a sandbox using the CodeSandbox API
-                try:
-                    logger.debug("Sending request to CodeSandbox API")
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(
-                            "https://codesandbox.io/api/v1/sandboxes/define?json=1",
-                            json=sandbox_config,
-                            timeout=30  # Add timeout
-                        ) as response:
-                            if response.status != 200:
-                                error_text = await response.text()
-                                logger.error(f"Error creating sandbox: {error_text}")
-                                return f"Error creating sandbox: {error_text}"
-                            
-                            try:
-                                sandbox_data = await response.json()
-                                sandbox_id = sandbox_data.get("sandbox_id")
-                                
-                                if not sandbox_id:
-                                    logger.error("Failed to get sandbox ID")
-                                    return "Error: Failed to get sandbox ID"
-                                
-                                # Get the sandbox URL
-                                sandbox_url = f"https://codesandbox.io/embed/{sandbox_id}?fontsize=14&hidenavigation=1&theme=dark"
-                                logger.info(f"CodeSandbox created successfully: {sandbox_url}")
-                                
-                                return f"CodeSandbox created successfully! You can view and run the code at: {sandbox_url}\n\nThis sandbox allows you to see the code in action and make modifications as needed."
-                            except Exception as json_error:
-                                logger.error(f"Error parsing sandbox response: {str(json_error)}")
-                                logger.error(traceback.format_exc())
-                                return f"Error parsing sandbox response: {str(json_error)}"
-                except aiohttp.ClientError as http_error:
-                    logger.error(f"Error connecting to CodeSandbox API: {str(http_error)}")
-                    logger.error(traceback.format_exc())
-                    return f"Error connecting to CodeSandbox API: {str(http_error)}"
-                except asyncio.TimeoutError:
-                    logger.error("Timeout connecting to CodeSandbox API")
-                    return "Error: Timeout connecting to CodeSandbox API. Please try again later."
+                sandbox = results.get("codesandbox")
+                codesandbox_result = sandbox.value if sandbox and sandbox.ok else "CodeSandbox creation skipped."
+                
+                # Return a comprehensive response
+                logger.info("Returning response")
+                
+                # Customize response based on project type
+                if project_type == "react":
+                    run_instructions = f"1. Navigate to the project directory: cd {project_name}\n2. Install dependencies: npm install\n3. Start the development server: npm start"
+                elif project_type == "express":
+                    run_instructions = f"1. Navigate to the project directory: cd {project_name}\n2. Install dependencies: npm install\n3. Start the server: npm run dev"
+                else:  # fullstack
+                    run_instructions = f"1. Navigate to the project directory: cd {project_name}\n2. Install dependencies: npm run install-all\n3. Start the development servers: npm run dev"
+                
+                return {
+                    "response": f"I've created a {project_type} task management application. The project structure has been set up in the '{project_name}' directory.\n\nTo run the application:\n{run_instructions}\n\nThis will start the development server(s).\n\n{codesandbox_result}",
+                    "thought_process": thought_process
+                }
+            
+            # For other requests, use the agent normally
+            try:
+                logger.info("Using agent for non-application request")
+                response = await self.agent.ainvoke({"input": user_input})
+                logger.info("Agent response received")
+                return {
+                    "response": response["output"],
+                    "thought_process": response.get("intermediate_steps", [])
+                }
             except Exception as e:
-                logger.error(f"Error running code in CodeSandbox: {str(e)}")
+                logger.error(f"Error processing request with agent: {str(e)}")
                 logger.error(traceback.format_exc())
-                return f"Error running code in CodeSandbox: {str(e)}"
+                return {
+                    "error": f"Error processing request with agent: {str(e)}",
+                    "thought_process": []
+                }
+        except Exception as e:
+            logger.error(f"Error processing request: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {
+                "error": f"Error processing request: {str(e)}",
+                "thought_process": []
+            }
+    
+    def _scaffold_steps(self, project_type: str, project_name: str) -> List[Step]:
+        """Steps of an application scaffold; code generation does not wait for the project structure.
         
-        logger.info("All tools created successfully")
-        return [
-            Tool(
-                name="generate_code",
-                func=generate_code,
-                description="Generate code based on the given prompt and language"
-            ),
-            Tool(
-                name="debug_code",
-                func=debug_code,
-                description="Debug code and fix issues"
-            ),
-            Tool(
-                name="analyze_code",
-                func=analyze_code,
-                description="Analyze code for quality, complexity, and potential improvements"
-            ),
-            Tool(
-                name="refactor_code",
-                func=refactor_code,
-                description="Refactor code to improve quality and maintainability"
-            ),
-            Tool(
-                name="explain_code",
-                func=explain_code,
-                description="Explain how the code works in detail"
-            ),
+        Args:
+            project_type: "fullstack", "react" or "express"
+            project_name: Directory of the project
+            
+        Returns:
+            The steps, for run_dag
+        """
+        async def structure(_):
+            return await _run_step_tool("create_project_structure", {"project_type": project_type, "project_name": project_name})
+        
+        steps = [Step("structure", structure, timeout=SCAFFOLD_FILE_TIMEOUT)]
+        
+        # Generate frontend code if it's a fullstack or react project
+        if project_type in ["fullstack", "react"]:
+            frontend_prompt = f"Create a React frontend for a task management application with the following features: task list, task creation form, task details view, and task filtering by category. Include proper state management and API integration."
+            frontend_path = f"{project_name}/{'src' if project_type == 'react' else 'client/src'}/components/TaskList.js"
+            
+            async def frontend_code(_):
+                return await _run_step_tool("generate_frontend_code", {"prompt": frontend_prompt, "framework": "react"})
             
-            Tool(
-                name="create_project_structure",
-                func=create_project_structure,
-                description="Create a project structure with appropriate folders and files",
-            ),
-            Tool(
-                name="create_file",
-                func=create_file,
-                description="Create a file with the given content"
-            ),
-            Tool(
-                name="create_directory",
-                func=create_directory,
-                description="Create a directory and its parent directories if they don't exist"
-            ),
-            Tool(
-                name="generate_frontend_code",
-                func=generate_frontend_code,
-                description="Generate frontend code using the frontend agent"
-            ),
-            Tool(
-                name="generate_backend_code",
-                func=generate_backend_code,
-                description="Generate backend code using the backend agent"
-            ),
-            Tool(
-                name="generate_misc_code",
-                func=generate_misc_code,
-                description="Generate miscellaneous code using the misc agent"
-            ),
-            Tool(
-                name="run_in_codesandbox",
-                func=run_in_codesandbox,
-                description="Run code in a CodeSandbox environment and return the results"
-            )
-        ]
+            async def frontend_file(inputs):
+                await _run_step_tool("create_file", {"file_path": frontend_path, "content": inputs["frontend_code"]})
+                return frontend_path
+            
+            # A CodeSandbox for interactive testing of the frontend component
+            async def codesandbox(inputs):
+                return await _run_step_tool("run_in_codesandbox", {
+                    "code": inputs["frontend_code"],
+                    "language": "react",
+                    "dependencies": '{"react": "^18.2.0", "react-dom": "^18.2.0", "axios": "^1.3.5"}'
+                })
+            
+            steps += [
+                Step("frontend_code", frontend_code, timeout=SCAFFOLD_GENERATION_TIMEOUT),
+                Step("frontend_file", frontend_file, deps=("structure", "frontend_code"), timeout=SCAFFOLD_FILE_TIMEOUT),
+                Step("codesandbox", codesandbox, deps=("frontend_code",), timeout=SCAFFOLD_GENERATION_TIMEOUT),
+            ]
+        
+        # Generate backend code if it's a fullstack or express project
+        if project_type in ["fullstack", "express"]:
+            backend_prompt = f"Create an Express backend for a task management application with the following features: task CRUD operations, MongoDB integration, and proper error handling."
+            backend_path = f"{project_name}/{'src' if project_type == 'express' else 'server/src'}/models/Task.js"
+            
+            async def backend_code(_):
+                return await _run_step_tool("generate_backend_code", {"prompt": backend_prompt, "framework": "express"})
+            
+            async def backend_file(inputs):
+                await _run_step_tool("create_file", {"file_path": backend_path, "content": inputs["backend_code"]})
+                return backend_path
+            
+            steps += [
+                Step("backend_code", backend_code, timeout=SCAFFOLD_GENERATION_TIMEOUT),
+                Step("backend_file", backend_file, deps=("structure", "backend_code"), timeout=SCAFFOLD_FILE_TIMEOUT),
+            ]
+        return steps
+    
 
 class FrontendAgent:
     """A specialized agent for frontend development."""
@@ -954,18 +943,8 @@ class FrontendAgent:
         self.llm = self._create_llm(temperature)
     
     def _create_llm(self, temperature: float):
-        """Create the LLM for the frontend agent."""
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        import os
-        from dotenv import load_dotenv
-        
-        load_dotenv()
-        
-        return ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",       
-            temperature=temperature,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        """Get the shared LLM client for the frontend agent."""
+        return get_llm(model="gemini-1.5-flash", temperature=temperature)
     
     async def generate_code(self, prompt: str, framework: str = "react") -> str:
         """Generate frontend code based on the given prompt and framework."""
@@ -990,18 +969,8 @@ class BackendAgent:
         self.llm = self._create_llm(temperature)
     
     def _create_llm(self, temperature: float):
-        """Create the LLM for the backend agent."""
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        import os
-        from dotenv import load_dotenv
-        
-        load_dotenv()
-        
-        return ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            temperature=temperature,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        """Get the shared LLM client for the backend agent."""
+        return get_llm(model="gemini-1.5-flash", temperature=temperature)
     
     async def generate_code(self, prompt: str, framework: str = "express") -> str:
         """Generate backend code based on the given prompt and framework."""
@@ -1026,18 +995,8 @@ class MiscAgent:
         self.llm = self._create_llm(temperature)
     
     def _create_llm(self, temperature: float):
-        """Create the LLM for the misc agent."""
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        import os
-        from dotenv import load_dotenv
-        
-        load_dotenv()
-        
-        return ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            temperature=temperature,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        """Get the shared LLM client for the misc agent."""
+        return get_llm(model="gemini-1.5-flash", temperature=temperature)
     
     async def generate_code(self, prompt: str) -> str:
         """Generate miscellaneous code based on the given prompt."""
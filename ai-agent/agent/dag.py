@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("DAG")
+
+DAG_STEP_TIMEOUT = float(os.getenv("DAG_STEP_TIMEOUT", "120"))
+
+
+@dataclass
+class Step:
+    """A unit of work that may start once every step in ``deps`` has succeeded.
+
+    ``run`` receives the values of its dependencies by step name.
+    """
+
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = DAG_STEP_TIMEOUT
+
+
+@dataclass
+class StepResult:
+    name: str
+    # "ok", "failed", "timeout" or "skipped" (a dependency did not succeed)
+    status: str
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def _check(steps: List[Step]) -> List[Step]:
+    """Steps in dependency order; raises ValueError on unknown dependencies, duplicates or cycles."""
+    by_name: Dict[str, Step] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step {step.name!r}")
+        by_name[step.name] = step
+    for step in steps:
+        unknown = [d for d in step.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f"Step {step.name!r} depends on unknown steps {unknown}")
+
+    ordered: List[Step] = []
+    state: Dict[str, int] = {}  # 1 while visiting, 2 when placed
+
+    def visit(step: Step, path: Tuple[str, ...]):
+        if state.get(step.name) == 2:
+            return
+        if state.get(step.name) == 1:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + (step.name,))}")
+        state[step.name] = 1
+        for dep in step.deps:
+            visit(by_name[dep], path + (step.name,))
+        state[step.name] = 2
+        ordered.append(step)
+
+    for step in steps:
+        visit(step, ())
+    return ordered
+
+
+async def run_dag(steps: List[Step]) -> Dict[str, StepResult]:
+    """Run ``steps`` with every step starting as soon as its dependencies are done.
+
+    Independent steps run concurrently, so the wall-clock time is that of the
+    longest dependency chain. A failed or timed-out step does not stop the
+    others; only the steps depending on it are skipped.
+
+    Args:
+        steps: The steps; dependencies refer to step names
+
+    Returns:
+        A result per step, in dependency order
+    """
+    ordered = _check(steps)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def execute(step: Step) -> StepResult:
+        deps = await asyncio.gather(*(tasks[d] for d in step.deps))
+        blocked = [d.name for d in deps if not d.ok]
+        if blocked:
+            return StepResult(step.name, "skipped", error=f"{', '.join(blocked)} did not complete")
+        start = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(step.run({d.name: d.value for d in deps}), step.timeout)
+            return StepResult(step.name, "ok", value, seconds=time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            logger.error(f"Step {step.name} timed out after {step.timeout}s")
+            return StepResult(step.name, "timeout", error=f"timed out after {step.timeout:g}s", seconds=step.timeout)
+        except Exception as e:
+            logger.error(f"Step {step.name} failed: {e}")
+            return StepResult(step.name, "failed", error=str(e), seconds=time.perf_counter() - start)
+
+    # Dependencies come first, so each step's inputs already have tasks.
+    for step in ordered:
+        tasks[step.name] = asyncio.create_task(execute(step))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    return {result.name: result for result in results}
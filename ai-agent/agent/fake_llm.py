@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from utils.tokens import count_tokens
+
+# Defaults for LLM_BACKEND=fake, shaped like a hosted model: a wait for the
+# first token, then a steady stream.
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "150"))
+FAKE_LLM_RESPONSE_TOKENS = int(os.getenv("FAKE_LLM_RESPONSE_TOKENS", "64"))
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for the Gemini chat model, for load tests and local runs.
+
+    Replies are deterministic, echo the last message and take as long as a
+    real model would to produce them. Tool and function bindings are
+    accepted and ignored, so the agents run unchanged; they just never call
+    a tool.
+    """
+
+    model: str = "fake"
+    temperature: float = 0.7
+    max_output_tokens: Optional[int] = None
+    latency: float = FAKE_LLM_LATENCY
+    tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND
+    response_tokens: int = FAKE_LLM_RESPONSE_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _words(self, messages: List[BaseMessage]) -> List[str]:
+        last = str(messages[-1].content) if messages else ""
+        n = min(self.response_tokens, self.max_output_tokens or self.response_tokens)
+        words = f"[{self.model}] Answer to: {' '.join(last.split()[:24])}".split()
+        filler = "lorem ipsum dolor sit amet consectetur".split()
+        while len(words) < n:
+            words.append(filler[len(words) % len(filler)])
+        return words[:n]
+
+    def _result(self, messages: List[BaseMessage], words: List[str]) -> ChatResult:
+        text = " ".join(words)
+        prompt_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        usage = {"input_tokens": prompt_tokens, "output_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        words = self._words(messages)
+        time.sleep(self.latency + len(words) / self.tokens_per_second)
+        return self._result(messages, words)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        words = self._words(messages)
+        await asyncio.sleep(self.latency + len(words) / self.tokens_per_second)
+        return self._result(messages, words)
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, word in enumerate(self._words(messages)):
+            time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self._words(messages)):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -1,13 +1,11 @@
 import os
-from dotenv import load_dotenv
 
 from langchain.agents import load_tools, initialize_agent, AgentType
 from langchain.chat_models import ChatOpenAI  # or use OpenAI() if you're not using chat models
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.utilities import GoogleSearchAPIWrapper
 from langchain_core.tools import Tool
-load_dotenv()
-llm=ChatGoogleGenerativeAI(temperature=0.5, model="gemini-1.5-flash", max_tokens=1000,api_key=os.getenv("GOOGLE_API_KEY"))
+from agent.llm import get_llm
+llm=get_llm("gemini-1.5-flash", temperature=0.5, max_output_tokens=1000)
 
 import requests
 from langchain_core.tools import Tool
@@ -1,9 +1,219 @@
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+import copy
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.fake_llm import FakeChatModel
+from db.embedding_engine import is_rate_limited
+from db.response_cache import cache_for
+from utils.scheduler import llm_scheduler
+from utils.singleflight import SingleFlight, flight_key
+from utils.tokens import count_tokens
+
+# The one place the environment is loaded; importing the registry is enough for every agent.
 load_dotenv(dotenv_path="../.env", override=True, encoding="utf-8")
 
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=1, max_output_tokens=512,
-                             api_key=os.getenv("GOOGLE_API_KEY"))
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+# "grpc" (default), "grpc_asyncio" or "rest"; one connection per shared client, kept open.
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT")
+# "gemini", or "fake" for the offline stand-in in agent/fake_llm.py.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# Output tokens reserved for a call without max_output_tokens, until its real usage is known.
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "512"))
+
+
+def _message_tokens(messages) -> int:
+    return sum(count_tokens(str(m.content)) for m in messages)
+
+
+def _usage(result) -> Optional[int]:
+    usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+    return usage.get("total_tokens") if usage else None
+
+
+# Set while a scheduled call runs, so a model whose async path falls back to
+# its sync one (or the reverse) is not admitted twice for the same request.
+_admitted: ContextVar[bool] = ContextVar("llm_admitted", default=False)
+
+llm_flights = SingleFlight("llm")
+
+
+@contextmanager
+def _admitted_step():
+    token = _admitted.set(True)
+    try:
+        yield
+    except Exception as e:
+        if is_rate_limited(e):
+            llm_scheduler.pause()
+        raise
+    finally:
+        _admitted.reset(token)
+
+
+class ScheduledChatModel:
+    """Mixin that admits every call of a chat model through ``llm_scheduler``.
+
+    Applied to the classes the registry builds, so agents, sub-agents and the
+    RAG graph are all covered, sync or async, streamed or not. A stream holds
+    its slot until the last chunk. Concurrent identical non-streamed calls are
+    coalesced into one request by ``llm_flights``; streams are not, since
+    each caller consumes its own tokens.
+    """
+
+    def _estimate(self, messages) -> int:
+        return _message_tokens(messages) + (getattr(self, "max_output_tokens", None) or LLM_OUTPUT_TOKEN_ESTIMATE)
+
+    def _flight_key(self, messages, stop, kwargs) -> str:
+        # Clients are shared per configuration, so the instance stands for model and sampling settings.
+        return flight_key(
+            id(self),
+            [(m.type, m.content, m.additional_kwargs, getattr(m, "tool_calls", None)) for m in messages],
+            stop,
+            kwargs,
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if _admitted.get():
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = self._flight_key(messages, stop, kwargs)
+        # Identical calls already in flight share one upstream request; each caller gets its own copy.
+        return copy.deepcopy(
+            llm_flights.do(key, lambda: self._scheduled_generate(messages, stop, run_manager, **kwargs))
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if _admitted.get():
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = self._flight_key(messages, stop, kwargs)
+        return copy.deepcopy(
+            await llm_flights.ado(key, lambda: self._scheduled_agenerate(messages, stop, run_manager, **kwargs))
+        )
+
+    def _scheduled_generate(self, messages, stop, run_manager, **kwargs):
+        with llm_scheduler.slot(self._estimate(messages)) as permit:
+            with _admitted_step():
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            permit.used_tokens = _usage(result)
+            return result
+
+    async def _scheduled_agenerate(self, messages, stop, run_manager, **kwargs):
+        async with llm_scheduler.aslot(self._estimate(messages)) as permit:
+            with _admitted_step():
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            permit.used_tokens = _usage(result)
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if _admitted.get():
+            yield from chunks
+            return
+        with llm_scheduler.slot(self._estimate(messages)) as permit:
+            text: List[str] = []
+            # The flag is set per step, never across a yield into the caller's code.
+            while True:
+                with _admitted_step():
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                text.append(chunk.text)
+                yield chunk
+            permit.used_tokens = _message_tokens(messages) + count_tokens("".join(text))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if _admitted.get():
+            async for chunk in chunks:
+                yield chunk
+            return
+        async with llm_scheduler.aslot(self._estimate(messages)) as permit:
+            text: List[str] = []
+            while True:
+                with _admitted_step():
+                    chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                text.append(chunk.text)
+                yield chunk
+            permit.used_tokens = _message_tokens(messages) + count_tokens("".join(text))
+
+
+class ScheduledGemini(ScheduledChatModel, ChatGoogleGenerativeAI):
+    pass
+
+
+class ScheduledFakeChatModel(ScheduledChatModel, FakeChatModel):
+    pass
+
+
+_clients: Dict[Tuple, BaseChatModel] = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm(
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.7,
+    max_output_tokens: Optional[int] = None,
+    cache: Optional[bool] = None,
+    **kwargs: Any,
+) -> BaseChatModel:
+    """Shared chat client for a (model, temperature, max tokens) configuration.
+
+    Clients are built on first request and reused by every caller asking for
+    the same configuration, so agents share one API connection instead of
+    opening their own. Every call is admitted by ``llm_scheduler``, and
+    temperature-0 configurations, and those created with ``cache=True``, are
+    answered from the response cache when they repeat a prompt (see
+    db/response_cache.py).
+
+    Args:
+        model: Gemini model name
+        temperature: Sampling temperature
+        max_output_tokens: Response length limit, or None for the model default
+        cache: True to replay cached answers whatever the temperature, for callers
+            that accept one fixed answer per prompt; False never to; None by temperature
+        **kwargs: Further ChatGoogleGenerativeAI options, part of the cache key
+
+    Returns:
+        The shared client
+    """
+    key = (model, temperature, max_output_tokens, cache, tuple(sorted(kwargs.items())))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None and LLM_BACKEND == "fake":
+                # Gemini-only options such as the transport do not apply to the stand-in.
+                client = ScheduledFakeChatModel(
+                    model=model,
+                    temperature=temperature,
+                    max_output_tokens=max_output_tokens,
+                    cache=cache_for(temperature, cache) or False,
+                )
+                _clients[key] = client
+            elif client is None:
+                if LLM_TRANSPORT:
+                    kwargs.setdefault("transport", LLM_TRANSPORT)
+                client = ScheduledGemini(
+                    model=model,
+                    temperature=temperature,
+                    max_output_tokens=max_output_tokens,
+                    google_api_key=os.getenv("GOOGLE_API_KEY"),
+                    cache=cache_for(temperature, cache) or False,
+                    **kwargs,
+                )
+                _clients[key] = client
+    return client
 
 
+def __getattr__(name: str):
+    # `from agent.llm import llm` keeps working, but builds the client only when first imported.
+    if name == "llm":
+        return get_llm(temperature=1, max_output_tokens=512)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.memory import BaseMemory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from pydantic import Field
+
+from utils.tokens import count_tokens, truncate_tokens
+from .llm import get_llm
+
+logger = logging.getLogger("Memory")
+
+# Tokens of verbatim history replayed per turn; older exchanges are folded into the summary.
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "2000"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+# Sessions unused for this many seconds are dropped, and at most this many are kept.
+MEMORY_SESSION_TTL = float(os.getenv("MEMORY_SESSION_TTL", "1800"))
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "1000"))
+
+_session: ContextVar[str] = ContextVar("agent_session", default="default")
+
+
+@contextmanager
+def session(session_id: str):
+    """Route agent memory reads and writes in this context to ``session_id``."""
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session() -> str:
+    return _session.get()
+
+
+class ConversationState:
+    """One session's history: a rolling summary plus the most recent exchanges with their token counts."""
+
+    __slots__ = ("summary", "turns", "tokens", "pending", "last_used", "lock", "folding", "views")
+
+    def __init__(self):
+        self.summary = ""
+        self.turns: deque = deque()
+        self.tokens = 0
+        # Exchanges evicted from the window and waiting to be folded into the summary.
+        self.pending: List[Tuple[str, str]] = []
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.folding = threading.Lock()
+        # Agent views bound to this conversation (agent/session_pool.py), dropped with it.
+        self.views: Dict[str, Any] = {}
+
+    def reset(self):
+        """Forget the history, keeping the state (and the views bound to it) in place."""
+        with self.lock:
+            self.summary = ""
+            self.turns.clear()
+            self.tokens = 0
+            self.pending = []
+
+    def messages(self) -> List[BaseMessage]:
+        with self.lock:
+            history: List[BaseMessage] = []
+            if self.summary:
+                # Gemini only takes a system message first, so the summary is replayed as an exchange.
+                history.append(HumanMessage(content=f"Summary of our conversation so far:\n{self.summary}"))
+                history.append(AIMessage(content="Understood."))
+            for role, text, _ in self.turns:
+                history.append(HumanMessage(content=text) if role == "human" else AIMessage(content=text))
+            return history
+
+    def add(self, human: str, ai: str, max_tokens: int):
+        """Append an exchange; beyond ``max_tokens``, move the oldest exchanges to ``pending``."""
+        with self.lock:
+            for role, text in (("human", human), ("ai", ai)):
+                text = truncate_tokens(text, max_tokens // 4)
+                n = count_tokens(text)
+                self.turns.append((role, text, n))
+                self.tokens += n
+            if self.tokens > max_tokens:
+                # Evict down to 3/4 of the budget so summaries run every few turns, not every turn.
+                while len(self.turns) > 2 and self.tokens > max_tokens * 3 // 4:
+                    for _ in range(2):
+                        role, text, n = self.turns.popleft()
+                        self.tokens -= n
+                        self.pending.append((role, text))
+
+    def take_pending(self) -> List[Tuple[str, str]]:
+        with self.lock:
+            pending, self.pending = self.pending, []
+            return pending
+
+
+def _fold_prompt(summary: str, turns: List[Tuple[str, str]], max_tokens: int) -> List[BaseMessage]:
+    transcript = "\n".join(f"{'User' if role == 'human' else 'Assistant'}: {text}" for role, text in turns)
+    return [
+        HumanMessage(
+            content=(
+                "Update the running summary of a conversation with the new lines below. Keep facts, "
+                "decisions, names, file paths and open questions; drop pleasantries. Reply with the "
+                f"summary only, in at most {max_tokens * 3 // 4} words.\n\n"
+                f"Current summary:\n{summary or '(none)'}\n\nNew lines:\n{transcript}"
+            )
+        )
+    ]
+
+
+class SessionMemoryStore:
+    """Conversation states by session id, dropped after ``ttl`` idle seconds or beyond ``max_sessions``."""
+
+    def __init__(self, ttl: float = MEMORY_SESSION_TTL, max_sessions: int = MEMORY_MAX_SESSIONS):
+        """Initialize the store.
+
+        Args:
+            ttl: Seconds a session may stay unused
+            max_sessions: Sessions kept; the least recently used go first
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationState:
+        """The session's state, created if missing; refreshes its recency."""
+        now = time.monotonic()
+        with self._lock:
+            # Sessions are kept in order of last use, so idle ones are at the front.
+            while self._sessions and next(iter(self._sessions.values())).last_used < now - self.ttl:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = ConversationState()
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_used = now
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return state
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"sessions": len(self._sessions), "evicted": self.evicted}
+
+
+session_store = SessionMemoryStore()
+
+
+class BoundedSummaryMemory(BaseMemory):
+    """Agent memory with a token-budgeted window of recent exchanges and a rolling summary.
+
+    Bound to one ``state``, the memory serves that conversation only (see
+    agent/session_pool.py). Without one, a single instance serves every
+    session: reads and writes go to the session set with ``session()`` for
+    the current request, looked up in ``store``. Exchanges pushed out of
+    the window are folded into the session's summary by a temperature-0
+    model call, in the background on the async path, so the history
+    replayed per turn stays under ``max_tokens + summary_tokens`` however
+    long the session or the server runs.
+    """
+
+    store: Any = Field(default_factory=lambda: session_store)
+    state: Any = None
+    namespace: str = "agent"
+    memory_key: str = "chat_history"
+    input_key: str = "input"
+    output_key: str = "output"
+    max_tokens: int = MEMORY_MAX_TOKENS
+    summary_tokens: int = MEMORY_SUMMARY_TOKENS
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _state(self) -> ConversationState:
+        if self.state is not None:
+            return self.state
+        return self.store.get(f"{self.namespace}:{current_session()}")
+
+    def _summarizer(self):
+        return get_llm(temperature=0, max_output_tokens=self.summary_tokens)
+
+    @property
+    def empty(self) -> bool:
+        """Whether the conversation has no history yet."""
+        state = self._state()
+        with state.lock:
+            return not (state.summary or state.turns or state.pending)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {self.memory_key: self._state().messages()}
+
+    def _add(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> ConversationState:
+        state = self._state()
+        state.add(str(inputs.get(self.input_key, "")), str(outputs.get(self.output_key, "")), self.max_tokens)
+        return state
+
+    def _merge(self, state: ConversationState, turns: List[Tuple[str, str]], summary: str):
+        if not summary:
+            # The model call failed: keep the newest text rather than nothing.
+            transcript = " ".join(text for _, text in turns)
+            summary = f"{state.summary} {transcript}".strip()[-self.summary_tokens * 4 :]
+        with state.lock:
+            state.summary = truncate_tokens(summary.strip(), self.summary_tokens)
+
+    def _fold(self, state: ConversationState):
+        # One fold per session at a time; turns evicted meanwhile wait for the next one.
+        if not state.folding.acquire(blocking=False):
+            return
+        try:
+            turns = state.take_pending()
+            if turns:
+                try:
+                    summary = self._summarizer().invoke(_fold_prompt(state.summary, turns, self.summary_tokens)).content
+                except Exception as e:
+                    logger.warning(f"Summarizing conversation failed: {e}")
+                    summary = ""
+                self._merge(state, turns, summary)
+        finally:
+            state.folding.release()
+
+    async def _afold(self, state: ConversationState):
+        if not state.folding.acquire(blocking=False):
+            return
+        try:
+            turns = state.take_pending()
+            if turns:
+                try:
+                    response = await self._summarizer().ainvoke(_fold_prompt(state.summary, turns, self.summary_tokens))
+                    summary = response.content
+                except Exception as e:
+                    logger.warning(f"Summarizing conversation failed: {e}")
+                    summary = ""
+                self._merge(state, turns, summary)
+        finally:
+            state.folding.release()
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        state = self._add(inputs, outputs)
+        if state.pending:
+            self._fold(state)
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        state = self._add(inputs, outputs)
+        if state.pending:
+            # Off the response path: the answer is returned while the summary is written.
+            task = asyncio.get_running_loop().create_task(self._afold(state))
+            _folds.add(task)
+            task.add_done_callback(_folds.discard)
+
+    def clear(self) -> None:
+        if self.state is not None:
+            self.state.reset()
+        else:
+            self.store.drop(f"{self.namespace}:{current_session()}")
+
+
+# Background fold tasks, referenced until done so they are not garbage collected.
+_folds: set = set()
@@ -1,28 +1,20 @@
 from typing import List, Dict, Any
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import AgentExecutor,create_tool_calling_agent,AgentType
 from langchain.tools import Tool
 from langchain.memory import ConversationBufferMemory
 from langchain_core.tools import tool
 from langchain.agents.format_scratchpad import format_to_openai_functions
 from langchain.agents.output_parsers import OpenAIFunctionsAgentOutputParser
-from dotenv import load_dotenv
 from langchain_community.utils import math
 import os
 from tools.math_tool import scipy_general_solver
 from db.vectorstore import vector_store
 from scipy.integrate import quad
 from .coding_agent import CodingAgent
-load_dotenv()
-
-# Initialize Gemini
-llm=ChatGoogleGenerativeAI(
-    model="gemini-1.5-pro",
-    temperature=0,
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+from .memory import session
+from .session_pool import AgentSessionPool
 
 class MultiAgentSystem:
     def __init__(self):
@@ -30,13 +22,14 @@ class MultiAgentSystem:
         self.agents = {
             "coding": self.coding_agent
         }
+        # Each session talks to its own view of the shared agents
+        self.sessions = AgentSessionPool(self.agents)
 
-    async def route_request(self, request: str, agent_type: str = "coding") -> Dict[str, Any]:
-        """Route a request to the appropriate agent."""
-        if agent_type not in self.agents:
-            raise ValueError(f"Unknown agent type: {agent_type}")
-        
-        return await self.agents[agent_type].process_request(request)
+    async def route_request(self, request: str, agent_type: str = "coding", session_id: str = "default") -> Dict[str, Any]:
+        """Route a request to the appropriate agent, with the conversation history of ``session_id``."""
+        agent = self.sessions.get(agent_type, session_id)
+        with session(session_id):
+            return await agent.process_request(request)
 
 # Example usage
 if __name__ == "__main__":
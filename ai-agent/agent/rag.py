@@ -1,19 +1,54 @@
 # --- agent/rag.py ---
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 import bs4
 from langchain import hub
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import START, StateGraph, END
-from typing import List, TypedDict
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, TypedDict
 from langchain_core.prompts import ChatPromptTemplate
 
-from agent.llm import llm 
-from db.vectorstore import vector_store 
+from agent.llm import llm
+from db.vectorstore import vector_store, embedding_model, index_lock, search_ids, stored_vectors
+from db.semantic_cache import SemanticCache
+from db.bm25 import reciprocal_rank_fusion
+from agent.rerank import rerank
+from utils.scheduler import with_priority
+
+logger = logging.getLogger("RAG")
+
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+# Candidates retrieved for the rerank node to choose RAG_TOP_K from.
+RAG_FETCH_K = int(os.getenv("RAG_FETCH_K", str(4 * RAG_TOP_K)))
+# "dense" (vectors only), "bm25" (keywords only) or "hybrid" (both, fused by reciprocal rank).
+RETRIEVAL_MODES = ("dense", "bm25", "hybrid")
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+# In hybrid mode each retriever contributes this many times RAG_TOP_K candidates to the fusion.
+RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "5"))
+
+# FAISS search is CPU-bound and releases the GIL, so the async nodes run it on a
+# dedicated pool instead of the event loop.
+SEARCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAG_SEARCH_THREADS", str(min(8, os.cpu_count() or 1)))),
+    thread_name_prefix="rag-search",
+)
+
+# Answers to near-identical past questions; see cache_lookup.
+semantic_cache = SemanticCache()
 
 # --- State Definition ---
-class State(TypedDict):
+class State(TypedDict, total=False):
     question: str
+    question_embedding: List[float]
     context: List[Document]
     answer: str
+    cache_hit: bool
+    retrieval_mode: str
+    filter: Dict[str, Any]
 
 
 
@@ -23,69 +58,291 @@ prompt = ChatPromptTemplate.from_messages([
     ("user", "Answer the question based on the following context:\n\n{context}\n\nQuestion: {question} and also add more knowledge to the answer if possible."),
 ])
 
+def _search(
+    question: str,
+    embedding: List[float],
+    mode: str = RAG_RETRIEVAL_MODE,
+    filter: Optional[Dict[str, Any]] = None,
+    k: int = RAG_FETCH_K,
+) -> List[Document]:
+    """Search the shared indexes; the read lock lets searches overlap but not index writes.
+
+    Hybrid mode ranks candidates from the vector and keyword indexes separately
+    and fuses the two rankings, so exact identifiers the embedding blurs still
+    surface next to semantically close chunks. A metadata ``filter`` restricts
+    both searches to the matching chunks up front.
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+    with index_lock.read():
+        selected = vector_store.metadata_index.select(filter) if filter else None
+        allowed = None
+        if selected is not None and mode != "dense":
+            allowed = vector_store.keyword_index.mask(vector_store.index_to_docstore_id[i] for i in selected.tolist())
+
+        if mode == "dense":
+            ids = search_ids(vector_store, embedding, k, selected)
+        elif mode == "bm25":
+            ids = [doc_id for doc_id, _ in vector_store.keyword_index.search(question, k, allowed)]
+        else:
+            n = k * RAG_HYBRID_CANDIDATES
+            keyword = [doc_id for doc_id, _ in vector_store.keyword_index.search(question, n, allowed)]
+            fused = reciprocal_rank_fusion([search_ids(vector_store, embedding, n, selected), keyword])
+            ids = [doc_id for doc_id, _ in fused[:k]]
+        return [vector_store.docstore.search(doc_id) for doc_id in ids]
+
+
+def _chunks_unchanged(entry) -> bool:
+    """A cached answer is valid while every chunk it used is still indexed.
+
+    Chunk ids are content hashes, so presence means the text is unchanged.
+    """
+    docstore = vector_store.docstore._dict
+    return all(chunk_id in docstore for chunk_id in entry.chunk_ids)
+
+
+def _cache_result(state: State, embedding: List[float]):
+    """State update for the cache_lookup node."""
+    accept = None
+    if state.get("filter"):
+        # Only answers built entirely from chunks inside the filter may be reused.
+        with index_lock.read():
+            selected = vector_store.metadata_index.select(state["filter"]).tolist()
+            allowed = {vector_store.index_to_docstore_id[i] for i in selected}
+        accept = lambda entry: all(chunk_id in allowed for chunk_id in entry.chunk_ids)
+    entry = semantic_cache.lookup(embedding, _chunks_unchanged, accept)
+    if entry is None:
+        return {"question_embedding": embedding, "cache_hit": False}
+    logger.info(f"Semantic cache hit for {state['question']!r} (cached question: {entry.question!r})")
+    context = [vector_store.docstore.search(chunk_id) for chunk_id in entry.chunk_ids]
+    return {"question_embedding": embedding, "context": context, "answer": entry.answer, "cache_hit": True}
+
+
+def _store_answer(state: State):
+    """Cache a freshly generated answer; answers without context or from failed calls are not cached."""
+    chunk_ids = [doc.metadata.get("chunk_id") for doc in state["context"]]
+    if chunk_ids and all(chunk_ids) and not state["answer"].startswith("Sorry, an error occurred"):
+        semantic_cache.store(state["question_embedding"], state["question"], state["answer"], chunk_ids)
+    return {}
+
+
+def _build_messages(state: State):
+    """Fill the prompt with the question and the retrieved context."""
+    context_docs = state["context"]
+    if not context_docs:
+        logger.warning("No context found, generating answer based on question only.")
+        docs_content = "No specific context found."
+    else:
+        docs_content = "\n\n".join(doc.page_content for doc in context_docs)
+
+    messages = prompt.invoke({"question": state["question"], "context": docs_content})
+    logger.debug(f"Prompt messages: {messages}")
+    return messages
+
+
 # --- Nodes ---
+@with_priority("interactive")
+def cache_lookup(state: State):
+    """Embeds the question and answers it from the semantic cache when possible."""
+    return _cache_result(state, embedding_model.embed_query(state["question"]))
+
+
+@with_priority("interactive")
+async def acache_lookup(state: State):
+    """Async cache_lookup."""
+    return _cache_result(state, await embedding_model.aembed_query(state["question"]))
+
+
+def cache_store(state: State):
+    """Stores the generated answer in the semantic cache."""
+    return _store_answer(state)
+
+
+def route_after_cache(state: State) -> str:
+    return END if state.get("cache_hit") else "retrieve"
+
+
+@with_priority("interactive")
 def retrieve(state: State):
     """Retrieves documents relevant to the question."""
-    print(f"[retrieve] Retrieving documents for question: {state['question']}")
+    logger.info(f"Retrieving documents for question: {state['question']}")
     try:
-        # Use the globally accessible vector_store
-        retrieved_docs = vector_store.similarity_search(state["question"])
-        print(f"[retrieve] Found {len(retrieved_docs)} documents.")
-        return {"context": retrieved_docs}
+        embedding = state.get("question_embedding") or embedding_model.embed_query(state["question"])
+        retrieved_docs = _search(
+            state["question"], embedding, state.get("retrieval_mode") or RAG_RETRIEVAL_MODE, state.get("filter")
+        )
+        logger.info(f"Found {len(retrieved_docs)} documents.")
+        return {"context": retrieved_docs, "question_embedding": embedding}
     except Exception as e:
-        print(f"[retrieve] Error during similarity search: {e}")
+        logger.error(f"Error during similarity search: {e}")
         return {"context": []}
 
 
-def generate(state: State):
-    """Generates an answer using the LLM based on retrieved context."""
-    print(f"[generate] Generating answer for question: {state['question']}")
-    print(f"[generate] Context length: {len(state['context'])}")
-    question = state["question"]
-    context_docs = state["context"]
+@with_priority("interactive")
+async def aretrieve(state: State):
+    """Async retrieve: awaits the query embedding, then searches on the search pool."""
+    logger.info(f"Retrieving documents for question: {state['question']}")
+    try:
+        embedding = state.get("question_embedding") or await embedding_model.aembed_query(state["question"])
+        loop = asyncio.get_running_loop()
+        retrieved_docs = await loop.run_in_executor(
+            SEARCH_EXECUTOR,
+            _search,
+            state["question"],
+            embedding,
+            state.get("retrieval_mode") or RAG_RETRIEVAL_MODE,
+            state.get("filter"),
+        )
+        logger.info(f"Found {len(retrieved_docs)} documents.")
+        return {"context": retrieved_docs, "question_embedding": embedding}
+    except Exception as e:
+        logger.error(f"Error during similarity search: {e}")
+        return {"context": []}
 
-    if not context_docs:
-        print("[generate] Warning: No context found, generating answer based on question only.")
-        docs_content = "No specific context found."
-        # return {"answer": "I couldn't find relevant information in the provided documents to answer your question."}
 
-    else:
-        docs_content = "\n\n".join(doc.page_content for doc in context_docs)
+def _rerank_fallback(state: State, e: Exception):
+    logger.error(f"Error during re-ranking, keeping retrieval order: {e}")
+    return {"context": state["context"][:RAG_TOP_K]}
+
+
+def _candidate_embeddings(docs: List[Document]):
+    """The candidates' vectors as stored in the index, or None if it cannot return them."""
+    ids = [doc.metadata.get("chunk_id") for doc in docs]
+    if not all(ids):
+        return None
+    with index_lock.read():
+        return stored_vectors(vector_store, ids)
+
 
-    messages = prompt.invoke({"question": question, "context": docs_content})
-    print(f"[generate] Prompt messages: {messages}") # Log the actual prompt sent
+@with_priority("interactive")
+def rerank_context(state: State):
+    """Orders candidates by relevance and diversity and packs the best into the context token budget."""
+    docs = state["context"]
+    try:
+        doc_embeddings = _candidate_embeddings(docs) if docs else []
+        if doc_embeddings is None:
+            # IVF/PQ indexes: the texts' embeddings, usually from the embedding cache.
+            doc_embeddings = embedding_model.embed_documents([doc.page_content for doc in docs])
+        context = rerank(state["question"], state["question_embedding"], docs, doc_embeddings, RAG_TOP_K)
+        logger.info(f"Packed {len(context)} of {len(docs)} candidates into the context.")
+        return {"context": context}
+    except Exception as e:
+        return _rerank_fallback(state, e)
 
+
+@with_priority("interactive")
+async def arerank_context(state: State):
+    """Async rerank_context: reading candidate vectors and scoring run on the search pool."""
+    docs = state["context"]
     try:
-        response = llm.invoke(messages, config={"configurable": {"callbacks": True}})
+        loop = asyncio.get_running_loop()
+        doc_embeddings = await loop.run_in_executor(SEARCH_EXECUTOR, _candidate_embeddings, docs) if docs else []
+        if doc_embeddings is None:
+            doc_embeddings = await embedding_model.aembed_documents([doc.page_content for doc in docs])
+        context = await loop.run_in_executor(
+            SEARCH_EXECUTOR, rerank, state["question"], state["question_embedding"], docs, doc_embeddings, RAG_TOP_K
+        )
+        logger.info(f"Packed {len(context)} of {len(docs)} candidates into the context.")
+        return {"context": context}
+    except Exception as e:
+        return _rerank_fallback(state, e)
 
-        print(f"[generate] LLM response content: {response.content}")
+
+@with_priority("interactive")
+def generate(state: State):
+    """Generates an answer using the LLM based on retrieved context."""
+    logger.info(f"Generating answer from {len(state['context'])} documents")
+    messages = _build_messages(state)
+    try:
+        response = llm.invoke(messages)
+        logger.debug(f"LLM response content: {response.content}")
         return {"answer": response.content}
     except Exception as e:
-        print(f"[generate] Error during LLM invocation: {e}")
+        logger.error(f"Error during LLM invocation: {e}")
         # Decide how to handle LLM errors
         return {"answer": f"Sorry, an error occurred while generating the answer: {e}"}
 
 
+@with_priority("interactive")
+async def agenerate(state: State, config: RunnableConfig):
+    """Async generate: awaits the LLM without blocking the event loop."""
+    logger.info(f"Generating answer from {len(state['context'])} documents")
+    messages = _build_messages(state)
+    try:
+        response = await llm.ainvoke(messages, config=config)
+        logger.debug(f"LLM response content: {response.content}")
+        return {"answer": response.content}
+    except Exception as e:
+        logger.error(f"Error during LLM invocation: {e}")
+        return {"answer": f"Sorry, an error occurred while generating the answer: {e}"}
+
+
 # --- Graph Definition ---
 graph_builder = StateGraph(State)
 
-# Add nodes
-graph_builder.add_node("retrieve", retrieve)
-graph_builder.add_node("generate", generate)
+# Add nodes; graph.invoke runs the sync implementations, graph.ainvoke the async ones.
+graph_builder.add_node("cache_lookup", RunnableLambda(cache_lookup, afunc=acache_lookup))
+graph_builder.add_node("retrieve", RunnableLambda(retrieve, afunc=aretrieve))
+graph_builder.add_node("rerank", RunnableLambda(rerank_context, afunc=arerank_context))
+graph_builder.add_node("generate", RunnableLambda(generate, afunc=agenerate))
+graph_builder.add_node("cache_store", cache_store)
 
 # Define edges
-graph_builder.add_edge(START, "retrieve") # Start with retrieval
-graph_builder.add_edge("retrieve", "generate") # Move from retrieval to generation
-graph_builder.add_edge("generate", END) # End after generation
+graph_builder.add_edge(START, "cache_lookup") # Answer repeated questions from the cache
+graph_builder.add_conditional_edges("cache_lookup", route_after_cache, ["retrieve", END])
+graph_builder.add_edge("retrieve", "rerank") # Narrow the candidates down to the prompt context
+graph_builder.add_edge("rerank", "generate") # Move from retrieval to generation
+graph_builder.add_edge("generate", "cache_store")
+graph_builder.add_edge("cache_store", END) # End after generation
 
 # Compile the graph
 graph = graph_builder.compile()
 
-print("RAG graph compiled successfully.")
+logger.info("RAG graph compiled successfully.")
+
+
+def _initial_state(question: str, retrieval_mode: Optional[str], filter: Optional[Dict[str, Any]]) -> State:
+    state: State = {"question": question}
+    if retrieval_mode:
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {retrieval_mode!r}; expected one of {RETRIEVAL_MODES}")
+        state["retrieval_mode"] = retrieval_mode
+    if filter:
+        unknown = set(filter) - set(vector_store.metadata_index.fields)
+        if unknown:
+            raise ValueError(f"Cannot filter on {sorted(unknown)}; indexed fields: {vector_store.metadata_index.fields}")
+        state["filter"] = filter
+    return state
+
+
+async def answer_question(
+    question: str, retrieval_mode: Optional[str] = None, filter: Optional[Dict[str, Any]] = None
+) -> State:
+    """Run the RAG graph asynchronously for one question, optionally scoped by a metadata ``filter``."""
+    return await graph.ainvoke(_initial_state(question, retrieval_mode, filter))
+
+
+async def astream_answer(
+    question: str, retrieval_mode: Optional[str] = None, filter: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Stream ``(event, data)`` pairs for one question: retrieval metadata first, then answer tokens.
 
-# Remove the redundant document loading/processing from this file
-# docs = text_loader("./uploaded_files/main.txt")
-# text_splitter = ...
-# all_splits = ...
-# texts = ...
-# _=vector_store.add_texts(...)
\ No newline at end of file
+    Closing the iterator (e.g. when the client disconnects) closes the graph
+    stream and cancels the in-flight LLM call.
+    """
+    stream = graph.astream(_initial_state(question, retrieval_mode, filter), stream_mode=["updates", "messages"])
+    async with aclosing(stream):
+        async for mode, chunk in stream:
+            if mode == "updates" and chunk.get("cache_lookup", {}).get("cache_hit"):
+                hit = chunk["cache_lookup"]
+                yield "retrieval", {"sources": [doc.metadata for doc in hit["context"]], "cached": True}
+                yield "token", {"text": hit["answer"]}
+            elif mode == "updates" and "rerank" in chunk:
+                docs = chunk["rerank"]["context"]
+                yield "retrieval", {"sources": [doc.metadata for doc in docs], "cached": False}
+            elif mode == "messages":
+                # Token chunks from llm.ainvoke inside the generate node.
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "generate" and message.content:
+                    yield "token", {"text": message.content}
+    yield "done", {}
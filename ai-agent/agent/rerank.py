@@ -0,0 +1,160 @@
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from db.bm25 import tokenize
+from utils.tokens import count_tokens, truncate_tokens
+
+logger = logging.getLogger("RAG")
+
+# Trade-off between relevance (1.0) and diversity (0.0) when ordering candidates.
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+# Weight of the query-term overlap added to the embedding similarity.
+RAG_LEXICAL_WEIGHT = float(os.getenv("RAG_LEXICAL_WEIGHT", "0.2"))
+# Maximum prompt tokens spent on retrieved context.
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "1500"))
+# Optional sentence-transformers cross-encoder, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2".
+RAG_RERANK_MODEL = os.getenv("RAG_RERANK_MODEL")
+
+# Shorter shared runs between neighbouring chunks are treated as coincidence.
+MIN_OVERLAP = 20
+
+
+@lru_cache(maxsize=None)
+def _cross_encoder(model_name: str):
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError:
+        logger.warning(f"RAG_RERANK_MODEL={model_name} needs sentence-transformers; skipping cross-encoder re-scoring")
+        return None
+    return CrossEncoder(model_name)
+
+
+def _normalize_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def lexical_overlap(question: str, texts: List[str]) -> np.ndarray:
+    """Fraction of the question's distinct terms that occur in each text."""
+    terms = set(tokenize(question))
+    if not terms:
+        return np.zeros(len(texts), dtype=np.float32)
+    return np.asarray([len(terms.intersection(tokenize(t))) / len(terms) for t in texts], dtype=np.float32)
+
+
+def relevance_scores(question: str, query_embedding, docs: List[Document], doc_embeddings) -> np.ndarray:
+    """Relevance of each candidate: a cross-encoder score if one is configured, else
+    cosine similarity plus weighted query-term overlap."""
+    texts = [doc.page_content for doc in docs]
+    model = _cross_encoder(RAG_RERANK_MODEL) if RAG_RERANK_MODEL else None
+    if model is not None:
+        scores = np.asarray(model.predict([(question, t) for t in texts]), dtype=np.float32)
+        # Squash logits into the cosine range so the MMR lambda keeps its meaning.
+        return 1.0 / (1.0 + np.exp(-scores))
+    similarity = _normalize_rows(doc_embeddings) @ _normalize_rows(query_embedding)
+    return similarity + RAG_LEXICAL_WEIGHT * lexical_overlap(question, texts)
+
+
+def mmr_order(relevance: np.ndarray, doc_embeddings, lambda_mult: float = RAG_MMR_LAMBDA) -> List[int]:
+    """Order candidates by maximal marginal relevance: each pick maximizes
+    ``lambda * relevance - (1 - lambda) * max similarity to the picks so far``."""
+    n = len(relevance)
+    if n == 0:
+        return []
+    vectors = _normalize_rows(doc_embeddings)
+    similarity = vectors @ vectors.T
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    remaining = np.ones(n, dtype=bool)
+    order = []
+    for _ in range(n):
+        penalty = np.where(np.isinf(redundancy), 0.0, redundancy)
+        score = np.where(remaining, lambda_mult * relevance - (1 - lambda_mult) * penalty, -np.inf)
+        pick = int(np.argmax(score))
+        order.append(pick)
+        remaining[pick] = False
+        redundancy = np.maximum(redundancy, similarity[pick])
+    return order
+
+
+def _overlap(head_of: str, tail_of: str) -> int:
+    """Length of the longest prefix of ``head_of`` that is a suffix of ``tail_of``."""
+    for k in range(min(len(head_of), len(tail_of)) // 2, MIN_OVERLAP - 1, -1):
+        if tail_of.endswith(head_of[:k]):
+            return k
+    return 0
+
+
+def trim_overlap(text: str, packed: List[str]) -> str:
+    """Drop the leading or trailing run of ``text`` already present at a boundary of a packed neighbour."""
+    for other in packed:
+        k = _overlap(text, other)
+        if k:
+            text = text[k:].lstrip()
+        k = _overlap(other, text)
+        if k:
+            text = text[:-k].rstrip()
+    return text
+
+
+def pack_context(docs: List[Document], max_chunks: int, max_tokens: int = RAG_CONTEXT_TOKENS) -> List[Document]:
+    """Greedily pack ranked chunks into the token budget.
+
+    Neighbouring chunks of one source share their split overlap; the shared text
+    is kept once. Chunks that do not fit are skipped in favour of later, smaller
+    ones, except that the top chunk is truncated rather than dropped.
+    """
+    packed: List[Document] = []
+    texts_by_source = {}
+    used = 0
+    for doc in docs:
+        if len(packed) == max_chunks or used >= max_tokens:
+            break
+        source = doc.metadata.get("source")
+        neighbours = texts_by_source.setdefault(source, []) if source else []
+        text = trim_overlap(doc.page_content, neighbours)
+        if not text:
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > max_tokens:
+            if packed:
+                continue
+            text = truncate_tokens(text, max_tokens)
+            tokens = max_tokens
+        packed.append(Document(page_content=text, metadata=doc.metadata))
+        neighbours.append(text)
+        used += tokens
+    return packed
+
+
+def rerank(
+    question: str,
+    query_embedding,
+    docs: List[Document],
+    doc_embeddings,
+    max_chunks: int,
+    max_tokens: Optional[int] = None,
+) -> List[Document]:
+    """Score, diversify and pack retrieved candidates for the prompt.
+
+    Args:
+        question: The user question
+        query_embedding: Its embedding
+        docs: Retrieved candidates
+        doc_embeddings: Their embeddings, in the same order
+        max_chunks: Maximum chunks in the prompt
+        max_tokens: Context token budget (default RAG_CONTEXT_TOKENS)
+
+    Returns:
+        The chunks to put in the prompt, best first
+    """
+    if not docs:
+        return []
+    relevance = relevance_scores(question, query_embedding, docs, doc_embeddings)
+    order = mmr_order(relevance, doc_embeddings)
+    return pack_context([docs[i] for i in order], max_chunks, max_tokens or RAG_CONTEXT_TOKENS)
@@ -0,0 +1,53 @@
+import threading
+from typing import Dict
+
+from .base_agent import BaseAgent
+from .memory import BoundedSummaryMemory, SessionMemoryStore, session_store
+
+
+class AgentSessionPool:
+    """Per-session views of shared agents, kept with the sessions' histories.
+
+    Each agent type is built once; a session gets a view of it with its own
+    memory and executor (``BaseAgent.for_session``). The view is stored on
+    the session's ``ConversationState`` in ``store``, so it lives exactly as
+    long as the history it serves: ``MEMORY_SESSION_TTL`` and
+    ``MEMORY_MAX_SESSIONS`` govern both. A request still running on a view
+    whose session was dropped finishes normally.
+    """
+
+    def __init__(self, agents: Dict[str, BaseAgent], store: SessionMemoryStore = session_store):
+        """Initialize the pool.
+
+        Args:
+            agents: The shared agent of each agent type
+            store: Where session histories, and with them the views, are kept
+        """
+        self.agents = agents
+        self.store = store
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def get(self, agent_type: str, session_id: str) -> BaseAgent:
+        """The agent of ``agent_type`` bound to ``session_id``'s conversation, created if missing."""
+        if agent_type not in self.agents:
+            raise ValueError(f"Unknown agent type: {agent_type}")
+        template = self.agents[agent_type]
+        # The same key BoundedSummaryMemory uses for an unbound memory in this session.
+        state = self.store.get(f"{template.name}:{session_id}")
+        with self._lock:
+            view = state.views.get(agent_type)
+            if view is None:
+                memory = BoundedSummaryMemory(namespace=template.name, store=self.store, state=state)
+                view = state.views[agent_type] = template.for_session(memory)
+                self.created += 1
+            return view
+
+    def drop(self, agent_type: str, session_id: str):
+        """Forget a session and its history."""
+        if agent_type in self.agents:
+            self.store.drop(f"{self.agents[agent_type].name}:{session_id}")
+
+    def stats(self) -> Dict[str, int]:
+        """Live sessions and sessions evicted (from ``store``), and views created by this process."""
+        return {**self.store.stats(), "views_created": self.created}
@@ -1,4 +1,5 @@
-from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
+from agent.llm import get_llm
+from utils.project_writer import project_writer
 from langchain_core.tools import Tool
 from langchain.agents import initialize_agent, AgentType
 from langchain_community.utilities import GoogleSearchAPIWrapper
@@ -14,7 +15,7 @@ class SingleCodingAgent:
             google_api_key=search_apikey,
             google_cse_id=search_cseid
         )
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
+        self.llm = get_llm(model="gemini-1.5-flash", temperature=0)
         self.promptTemplate = ChatPromptTemplate.from_messages([
             ("system", "You are a coding assistant that builds fullstack projects. Use tools when needed."),
             ("human", "{input}"),
@@ -46,9 +47,11 @@ class SingleCodingAgent:
         """Create a general folder structure inside a 'code' directory for a Next.js app and return example code files."""
         base_dir = os.path.join(os.getcwd(), "code")
         
-        for file_path in code_files:
-            full_path = os.path.join(base_dir, os.path.relpath(file_path, 'code'))
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Each directory is created once, however many files it holds.
+        project_writer.make_dirs(
+            [os.path.dirname(os.path.relpath(file_path, 'code')) for file_path in code_files],
+            root=base_dir,
+        )
 
         return code_files
 
@@ -67,8 +70,7 @@ class SingleCodingAgent:
         response = self.agent.run({"input": code_spec})
         return response
 
-    def write_code(self, code_map) -> str:
-        """Write multiple code files to appropriate paths."""
+    def _parse_code_map(self, code_map):
         import ast
 
         if isinstance(code_map, str):
@@ -79,19 +81,28 @@ class SingleCodingAgent:
 
         if not isinstance(code_map, dict):
             return "Error: code_map is not a dictionary."
+        return code_map
 
-        created_files = []
-        for relative_path, code in code_map.items():
-            try:
-                full_path = os.path.join(os.getcwd(), relative_path)
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, "w", encoding="utf-8") as f:
-                    f.write(code)
-                created_files.append(relative_path)
-            except Exception as e:
-                return f"Failed to write {relative_path}: {str(e)}"
-
+    def _describe_write(self, report) -> str:
+        if report.failed:
+            path, error = next(iter(report.failed.items()))
+            return f"Failed to write {path}: {error}"
+        created_files = report.written + report.unchanged
         return f"Code written to {len(created_files)} files:\n" + "\n".join(created_files)
+
+    def write_code(self, code_map) -> str:
+        """Write multiple code files to appropriate paths."""
+        code_map = self._parse_code_map(code_map)
+        if isinstance(code_map, str):
+            return code_map
+        return self._describe_write(project_writer.write_files(code_map))
+
+    async def awrite_code(self, code_map) -> str:
+        """Write multiple code files to appropriate paths without blocking the event loop."""
+        code_map = self._parse_code_map(code_map)
+        if isinstance(code_map, str):
+            return code_map
+        return self._describe_write(await project_writer.awrite_files(code_map))
     
     def get_tools(self) -> list[Tool]:
         """Return the tools available to the agent."""
@@ -110,6 +121,7 @@ class SingleCodingAgent:
             ),
             Tool.from_function(
                 func=self.write_code,
+                coroutine=self.awrite_code,
                 name="write_code",
                 description="Use this tool to write code files to the appropriate paths."
             ),
@@ -139,4 +151,8 @@ class SingleCodingAgent:
 
     def ask(self, prompt: str) -> str:
         """Ask the agent a question."""
-        return self.agent.run({"input": prompt})
\ No newline at end of file
+        return self.agent.run({"input": prompt})
+
+    async def aask(self, prompt: str) -> str:
+        """Ask the agent a question without blocking the event loop."""
+        return await self.agent.arun({"input": prompt})
\ No newline at end of file
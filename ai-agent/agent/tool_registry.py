@@ -0,0 +1,139 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_core.tools import BaseTool
+
+# Upper bounds, in seconds, of the latency histogram buckets; slower calls land in "+Inf".
+TOOL_LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class ToolStats:
+    """Call and error counts and a latency histogram of one tool."""
+
+    __slots__ = ("calls", "errors", "in_flight", "total_seconds", "max_seconds", "buckets", "_lock")
+
+    def __init__(self):
+        self.calls = 0
+        # Calls that raised or were cancelled; tools that return an error message count as calls.
+        self.errors = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(TOOL_LATENCY_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, seconds: float, ok: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.buckets[bisect.bisect_left(TOOL_LATENCY_BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            bounds = [f"{bound:g}" for bound in TOOL_LATENCY_BUCKETS] + ["+Inf"]
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "mean_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+                "max_seconds": self.max_seconds,
+                # Calls per bucket, keyed by the bucket's upper bound in seconds.
+                "latency_histogram": dict(zip(bounds, self.buckets)),
+            }
+
+
+def _timed(fn: Callable, stats: ToolStats) -> Callable:
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            stats.start()
+            start, ok = time.perf_counter(), False
+            try:
+                result = await fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                stats.observe(time.perf_counter() - start, ok)
+    else:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            stats.start()
+            start, ok = time.perf_counter(), False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                stats.observe(time.perf_counter() - start, ok)
+    return timed
+
+
+class ToolRegistry:
+    """Tools by name, built once per process and shared by every agent that uses them.
+
+    Registering a tool wraps its function so each call, however it is made
+    (an agent executor, ``arun`` from a scaffold step), is counted and timed.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, BaseTool] = {}
+        self._stats: Dict[str, ToolStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, tool: BaseTool) -> BaseTool:
+        """Add ``tool`` under its name.
+
+        Args:
+            tool: A tool with a ``func`` or ``coroutine``, such as one made with ``@tool``
+
+        Returns:
+            The tool, now instrumented
+        """
+        if getattr(tool, "func", None) is None and getattr(tool, "coroutine", None) is None:
+            raise TypeError(f"Tool {tool.name!r} has neither a func nor a coroutine to instrument")
+        with self._lock:
+            if tool.name in self._tools:
+                raise ValueError(f"Duplicate tool {tool.name!r}")
+            stats = self._stats[tool.name] = ToolStats()
+            if getattr(tool, "func", None) is not None:
+                tool.func = _timed(tool.func, stats)
+            if getattr(tool, "coroutine", None) is not None:
+                tool.coroutine = _timed(tool.coroutine, stats)
+            self._tools[tool.name] = tool
+        return tool
+
+    def get(self, name: str) -> BaseTool:
+        """The tool registered as ``name``; raises KeyError listing the known names if there is none."""
+        tool = self._tools.get(name)
+        if tool is None:
+            raise KeyError(f"Unknown tool {name!r}; registered tools: {', '.join(sorted(self._tools))}")
+        return tool
+
+    def tools(self, *names: str) -> List[BaseTool]:
+        """The tools called ``names``, in that order."""
+        return [self.get(name) for name in names]
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Calls, errors, calls running now and latency of each tool in this process, by name."""
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+
+tool_registry = ToolRegistry()
@@ -0,0 +1,106 @@
+"""Recall vs latency of the approximate FAISS index modes against the flat index.
+
+Run from the ai-agent directory:
+
+    python -m benchmarks.ann_benchmark --n 200000 --dim 768
+
+By default the corpus is a synthetic Gaussian mixture, which clusters like real
+embeddings do. Pass ``--index-dir vector_index`` to benchmark on the vectors of a
+persisted flat index instead.
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from db.index_factory import base_index, create_index, set_search_params, train_index
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, n_clusters: int = 256, seed: int = 0):
+    """Generate clustered corpus vectors and held-out queries from the same distribution."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(n_clusters, size=n + n_queries)
+    points = centers[labels] + 0.5 * rng.normal(size=(n + n_queries, dim)).astype(np.float32)
+    return points[:n], points[n:]
+
+
+def persisted_corpus(index_dir: str, n_queries: int, seed: int = 0):
+    """Read vectors back from a persisted flat index and perturb a sample of them as queries."""
+    # The flat index under the id map stores vectors contiguously.
+    index = base_index(faiss.read_index(os.path.join(index_dir, "index.faiss")))
+    vectors = index.reconstruct_n(0, index.ntotal)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), n_queries)]
+    queries = queries + 0.01 * rng.normal(size=queries.shape).astype(np.float32)
+    return vectors, queries
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true k nearest neighbours present in the returned k."""
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def time_queries(index: faiss.Index, queries: np.ndarray, k: int):
+    """Search one query at a time, as the RAG retrieve node does; return ids and per-query latencies in ms."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids[i] = index.search(q[None, :], k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000, help="corpus size for the synthetic corpus")
+    parser.add_argument("--dim", type=int, default=768, help="vector dimension for the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4, help="neighbours per query (similarity_search default)")
+    parser.add_argument("--index-dir", help="benchmark on a persisted flat index instead")
+    args = parser.parse_args()
+
+    if args.index_dir:
+        corpus, queries = persisted_corpus(args.index_dir, args.queries)
+    else:
+        corpus, queries = synthetic_corpus(args.n, args.dim, args.queries)
+    n, dim = corpus.shape
+    print(f"corpus: {n} x {dim}, queries: {len(queries)}, k={args.k}")
+
+    configs = [("flat", {})]
+    configs += [("ivf_flat", {"nprobe": p}) for p in (1, 4, 16, 64)]
+    configs += [("hnsw", {"ef_search": ef}) for ef in (16, 32, 64, 128)]
+    configs += [("ivf_pq", {"nprobe": p}) for p in (4, 16, 64)]
+
+    truth = None
+    built = {}
+    print(f"{'index':<10}{'params':<16}{'build s':>9}{'recall':>9}{'p50 ms':>9}{'p99 ms':>9}{'MB':>9}")
+    for index_type, params in configs:
+        if index_type not in built:
+            pq_m = next(m for m in (16, 8, 4, 2, 1) if dim % m == 0)
+            start = time.perf_counter()
+            index = create_index(dim, index_type, n_hint=n, pq_m=pq_m)
+            train_index(index, corpus)
+            index.add_with_ids(corpus, np.arange(n, dtype=np.int64))
+            build_s = time.perf_counter() - start
+            size_mb = faiss.serialize_index(index).nbytes / 2**20
+            built[index_type] = (index, build_s, size_mb)
+        index, build_s, size_mb = built[index_type]
+        set_search_params(index, **params)
+
+        ids, latencies = time_queries(index, queries, args.k)
+        if truth is None:
+            truth = ids
+        label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+        print(
+            f"{index_type:<10}{label:<16}{build_s:>9.2f}{recall_at_k(ids, truth):>9.3f}"
+            f"{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 99):>9.3f}{size_mb:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Offline load test of the LLM call scheduler against the fake chat model.
+
+Run from the ai-agent directory:
+
+    python -m benchmarks.llm_load --requests 200 --rpm 600 --max-concurrency 8
+    python -m benchmarks.llm_load --batch-share 0.8 --latency 0.5
+
+Sends ``--requests`` calls at once through the model registry with
+LLM_BACKEND=fake, a share of them in the "batch" priority class and the
+rest "interactive", and reports latency per class, throughput and the
+scheduler's own counters. No API key or network access is needed.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="calls to send at once")
+    parser.add_argument("--batch-share", type=float, default=0.5, help="fraction sent in the batch class")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=600, help="requests per minute, 0 for no limit")
+    parser.add_argument("--tpm", type=float, default=0, help="tokens per minute, 0 for no limit")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake model seconds to first token")
+    parser.add_argument("--response-tokens", type=int, default=64)
+    return parser.parse_args()
+
+
+async def run(args):
+    # Imported here so the limits above are read by the scheduler and registry.
+    from agent.llm import get_llm
+    from utils.scheduler import llm_scheduler, priority
+
+    llm = get_llm("fake-load", temperature=0)
+    rng = random.Random(0)
+    latencies = {"interactive": [], "batch": []}
+
+    async def call(i: int, name: str):
+        with priority(name):
+            start = time.perf_counter()
+            await llm.ainvoke(f"Question {i}: how does the scheduler order calls?")
+            latencies[name].append(time.perf_counter() - start)
+
+    classes = ["batch" if rng.random() < args.batch_share else "interactive" for _ in range(args.requests)]
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i, name) for i, name in enumerate(classes)))
+    seconds = time.perf_counter() - start
+
+    print(f"{args.requests} calls in {seconds:.1f}s ({args.requests / seconds:.1f}/s)")
+    print(f"{'class':<13}{'calls':>7}{'p50 s':>8}{'p95 s':>8}{'max s':>8}")
+    for name, values in latencies.items():
+        if values:
+            v = np.asarray(values)
+            print(f"{name:<13}{len(v):>7}{np.median(v):>8.2f}{np.percentile(v, 95):>8.2f}{v.max():>8.2f}")
+    print(llm_scheduler.stats())
+
+
+def main():
+    args = parse_args()
+    os.environ["LLM_BACKEND"] = "fake"
+    # Every call must reach the scheduler; cached answers from a previous run would skip it.
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.rpm)
+    os.environ["LLM_TOKENS_PER_MINUTE"] = str(args.tpm)
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_LLM_RESPONSE_TOKENS"] = str(args.response_tokens)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Throughput and chunk-size spread of the token splitter against RecursiveCharacterTextSplitter.
+
+Run from the ai-agent directory:
+
+    python -m benchmarks.splitter_benchmark --mb 50
+    python -m benchmarks.splitter_benchmark --path uploaded_files
+
+By default the corpus is synthetic prose with paragraphs, sentences of varying
+length and code-like lines. ``--path`` benchmarks on the text files of a file
+or directory instead. Token counts use the same encoding as the splitter.
+"""
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from loaders.engine import directory_sources
+from loaders.splitter import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, BoundaryTokenSplitter
+from utils.tokens import count_tokens
+
+WORDS = (
+    "the index vector query embedding latency throughput request server cache token model chunk "
+    "document retrieval answer context batch worker process thread memory disk network error"
+).split()
+
+
+def synthetic_corpus(mb: float, doc_kb: int = 64, seed: int = 0):
+    """Documents of about ``doc_kb`` KB each, totalling ``mb`` MB."""
+    rng = random.Random(seed)
+    docs = []
+    total = 0
+    while total < mb * 2**20:
+        paragraphs = []
+        size = 0
+        while size < doc_kb * 1024:
+            sentences = []
+            for _ in range(rng.randint(2, 8)):
+                words = rng.choices(WORDS, k=rng.randint(4, 30))
+                sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+            if rng.random() < 0.2:
+                sentences.append(f"\nraise ERR_{rng.randint(100, 999)}: os.path.join(a, b)")
+            paragraph = " ".join(sentences)
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        text = "\n\n".join(paragraphs)
+        docs.append(Document(page_content=text, metadata={"source": f"synthetic-{len(docs)}"}))
+        total += len(text)
+    return docs
+
+
+def file_corpus(path: str):
+    """Text documents from a file or every file under a directory."""
+    paths = directory_sources(path) if os.path.isdir(path) else [path]
+    docs = []
+    for p in paths:
+        with open(p, encoding="utf-8", errors="replace") as f:
+            docs.append(Document(page_content=f.read(), metadata={"source": p}))
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=20, help="size of the synthetic corpus")
+    parser.add_argument("--path", help="benchmark on a text file or directory instead")
+    parser.add_argument("--chunk-size", type=int, default=400, help="characters, for the recursive splitter")
+    parser.add_argument("--chunk-overlap", type=int, default=80, help="characters, for the recursive splitter")
+    args = parser.parse_args()
+
+    docs = file_corpus(args.path) if args.path else synthetic_corpus(args.mb)
+    mb = sum(len(d.page_content) for d in docs) / 2**20
+    print(f"corpus: {len(docs)} documents, {mb:.1f} MB")
+
+    splitters = [
+        (f"recursive {args.chunk_size}c", RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)),
+        (f"token {CHUNK_TOKENS}t", BoundaryTokenSplitter(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)),
+    ]
+    # Warm the tokenizer so its one-time load is not billed to the first run.
+    count_tokens("warm up")
+
+    print(f"{'splitter':<18}{'seconds':>9}{'MB/s':>8}{'chunks':>9}{'tok mean':>10}{'tok p99':>9}{'tok max':>9}")
+    for name, splitter in splitters:
+        start = time.perf_counter()
+        chunks = splitter.split_documents(docs)
+        seconds = time.perf_counter() - start
+        tokens = np.asarray([count_tokens(c.page_content) for c in chunks])
+        print(
+            f"{name:<18}{seconds:>9.2f}{mb / seconds:>8.1f}{len(chunks):>9}"
+            f"{tokens.mean():>10.1f}{np.percentile(tokens, 99):>9.0f}{tokens.max():>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
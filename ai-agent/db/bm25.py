@@ -0,0 +1,230 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# New postings land in small segments; once there are more than this many they are merged.
+BM25_MAX_SEGMENTS = int(os.getenv("BM25_MAX_SEGMENTS", "8"))
+
+# Identifiers, error codes and API names stay whole ("ERR_CONN_RESET", "os.path.join",
+# "HTTP-429"); dotted/dashed compounds are also indexed by their parts.
+_TOKEN = re.compile(r"[A-Za-z0-9_]+(?:[.\-:/][A-Za-z0-9_]+)*")
+_PART = re.compile(r"[.\-:/]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word and identifier tokens of ``text``."""
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        token = match.group().lower()
+        tokens.append(token)
+        if _PART.search(token):
+            tokens.extend(part for part in _PART.split(token) if part)
+    return tokens
+
+
+class _Segment:
+    """Immutable postings in CSR form: for ``terms[i]``, docs/tfs[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, docs: np.ndarray, tfs: np.ndarray):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+
+    @classmethod
+    def from_postings(cls, terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray) -> "_Segment":
+        order = np.lexsort((docs, terms))
+        terms, docs, tfs = terms[order], docs[order], tfs[order]
+        unique, starts = np.unique(terms, return_index=True)
+        offsets = np.append(starts, len(terms)).astype(np.int64)
+        return cls(unique.astype(np.int32), offsets, docs.astype(np.int32), tfs.astype(np.float32))
+
+    def postings(self, term_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = np.searchsorted(self.terms, term_id)
+        if i == len(self.terms) or self.terms[i] != term_id:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.docs[start:end], self.tfs[start:end]
+
+    def expanded_terms(self) -> np.ndarray:
+        return np.repeat(self.terms, np.diff(self.offsets))
+
+
+class BM25Index:
+    """An in-process inverted index with Okapi BM25 scoring over compact numpy arrays.
+
+    Documents are keyed by docstore id. Removed documents are tombstoned and
+    dropped from the postings the next time segments are merged.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.doc_ids: List[str] = []
+        self.doc_index: Dict[str, int] = {}
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.df = np.zeros(0, dtype=np.int32)
+        self.segments: List[_Segment] = []
+        self._total_len = 0.0
+
+    @property
+    def num_docs(self) -> int:
+        return int(self.alive.sum())
+
+    def add(self, ids: List[str], texts: List[str]):
+        """Index a batch of documents as a new segment."""
+        # Re-added ids replace their previous postings.
+        self.remove(ids)
+        terms, docs, tfs, lengths = [], [], [], []
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self.doc_index:
+                continue
+            doc = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_index[doc_id] = doc
+            counts = Counter(self.vocab.setdefault(t, len(self.vocab)) for t in tokenize(text))
+            terms.extend(counts.keys())
+            tfs.extend(counts.values())
+            docs.extend([doc] * len(counts))
+            lengths.append(sum(counts.values()))
+
+        self.doc_len = np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(lengths), dtype=bool)])
+        self._total_len += sum(lengths)
+        terms = np.asarray(terms, dtype=np.int32)
+        if len(self.df) < len(self.vocab):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int32)])
+        np.add.at(self.df, terms, 1)
+        if len(terms):
+            self.segments.append(
+                _Segment.from_postings(terms, np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            )
+        if len(self.segments) > BM25_MAX_SEGMENTS:
+            self.compact()
+
+    def remove(self, ids: Iterable[str]):
+        """Tombstone documents by docstore id."""
+        removed = [doc for doc in (self.doc_index.pop(doc_id, None) for doc_id in ids) if doc is not None]
+        if not removed:
+            return
+        removed = np.asarray(removed, dtype=np.int32)
+        self.alive[removed] = False
+        self._total_len -= float(self.doc_len[removed].sum())
+        for segment in self.segments:
+            # Keep document frequencies exact so idf ignores removed documents.
+            mask = np.isin(segment.docs, removed)
+            if mask.any():
+                np.subtract.at(self.df, segment.expanded_terms()[mask], 1)
+
+    def compact(self):
+        """Merge all segments into one, dropping removed documents and renumbering the rest."""
+        if not self.segments:
+            return
+        terms = np.concatenate([s.expanded_terms() for s in self.segments])
+        docs = np.concatenate([s.docs for s in self.segments])
+        tfs = np.concatenate([s.tfs for s in self.segments])
+        keep = self.alive[docs]
+        renumber = np.cumsum(self.alive) - 1
+        self.segments = [_Segment.from_postings(terms[keep], renumber[docs[keep]], tfs[keep])]
+        self.doc_ids = [doc_id for doc_id, alive in zip(self.doc_ids, self.alive) if alive]
+        self.doc_index = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        self.doc_len = self.doc_len[self.alive]
+        self.alive = np.ones(len(self.doc_ids), dtype=bool)
+
+    def mask(self, ids: Iterable[str]) -> np.ndarray:
+        """Boolean mask over internal document numbers selecting the docstore ``ids``, for ``search``."""
+        allowed = np.zeros(len(self.doc_ids), dtype=bool)
+        allowed[np.fromiter((self.doc_index[i] for i in ids if i in self.doc_index), dtype=np.int64)] = True
+        return allowed
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Top ``k`` ``(docstore id, score)`` pairs for ``query``.
+
+        Args:
+            query: The query text
+            k: Number of results
+            allowed: Optional mask from ``mask`` restricting the search to a subset of documents
+        """
+        n = self.num_docs
+        if not n:
+            return []
+        avg_len = self._total_len / n
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / avg_len)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None or not self.df[term_id]:
+                continue
+            df = self.df[term_id]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for segment in self.segments:
+                postings = segment.postings(term_id)
+                if postings is None:
+                    continue
+                docs, tfs = postings
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+
+        mask = self.alive & (scores > 0)
+        if allowed is not None:
+            mask &= allowed[: len(mask)]
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(self.doc_ids[i], float(scores[i])) for i in candidates]
+
+    def save(self, path: str):
+        """Compact and atomically write the index to ``path`` (.npz)."""
+        self.compact()
+        segment = self.segments[0] if self.segments else _Segment.from_postings(*(np.zeros(0),) * 3)
+        meta = {"vocab": list(self.vocab), "doc_ids": self.doc_ids, "k1": self.k1, "b": self.b}
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+                doc_len=self.doc_len,
+                alive=self.alive,
+                df=self.df,
+                terms=segment.terms,
+                offsets=segment.offsets,
+                docs=segment.docs,
+                tfs=segment.tfs,
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """Load an index written by ``save``, or return None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            index = cls(meta["k1"], meta["b"])
+            index.vocab = {term: i for i, term in enumerate(meta["vocab"])}
+            index.doc_ids = meta["doc_ids"]
+            index.doc_len = data["doc_len"]
+            index.alive = data["alive"]
+            index.df = data["df"]
+            if len(data["terms"]):
+                index.segments = [_Segment(data["terms"], data["offsets"], data["docs"], data["tfs"])]
+        index.doc_index = {doc_id: i for i, doc_id in enumerate(index.doc_ids)}
+        index._total_len = float(index.doc_len[index.alive].sum())
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,165 @@
+import os
+import re
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+# Estimated Jaccard similarity of word shingles above which a chunk counts as a near-duplicate.
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+
+_WORD = re.compile(r"\w+")
+# Hash arithmetic stays below 2**62 with 31-bit operands, so uint64 never overflows.
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def _bands_for(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """LSH (bands, rows) splitting ``num_perm`` whose collision threshold (1/b)^(1/r) is closest to ``threshold``."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class NearDuplicateFilter:
+    """MinHash signatures with LSH banding to spot chunks that repeat with small edits.
+
+    Boilerplate headers, footers and repeated sections differ only in page
+    numbers or dates, so exact chunk ids miss them. Candidates from the LSH
+    buckets are confirmed by the fraction of matching signature slots, an
+    estimate of their Jaccard similarity. Signatures are stable across
+    processes, so a filter can be saved and loaded with the store it covers.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        """Initialize the filter.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of a near-duplicate
+            num_perm: Hash permutations per signature
+            shingle_size: Words per shingle
+            seed: Seed of the permutations
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.bands, self.rows = _bands_for(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        # Ingestion checks on the event loop while the store adds and removes on worker threads.
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def keys(self) -> List[str]:
+        """Keys of the added chunks."""
+        with self._lock:
+            return list(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the text's word shingles."""
+        words = _WORD.findall(text.lower())
+        n = self.shingle_size if len(words) >= self.shingle_size else max(1, len(words))
+        shingles = {" ".join(words[i : i + n]) for i in range(max(1, len(words) - n + 1))}
+        # crc32 rather than hash(), which is salted per process.
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & 0x7FFFFFFF for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        return ((hashes[:, None] * self._a + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows : (i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def find(self, signature: np.ndarray, ignore: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Key of an added chunk that ``signature`` near-duplicates, if any, skipping keys ``ignore`` accepts."""
+        checked = set()
+        with self._lock:
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                for key in bucket.get(band_key, ()):
+                    if key in checked:
+                        continue
+                    checked.add(key)
+                    if ignore is not None and ignore(key):
+                        continue
+                    if np.mean(self._signatures[key] == signature) >= self.threshold:
+                        return key
+        return None
+
+    def add(self, key: str, signature: np.ndarray):
+        """Index a chunk's signature under ``key``; a key already added keeps its signature."""
+        with self._lock:
+            if key in self._signatures:
+                return
+            self._signatures[key] = signature
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(band_key, []).append(key)
+
+    def remove(self, keys: Iterable[str]):
+        """Forget the chunks under ``keys``."""
+        with self._lock:
+            for key in keys:
+                signature = self._signatures.pop(key, None)
+                if signature is None:
+                    continue
+                for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                    members = bucket[band_key]
+                    members.remove(key)
+                    if not members:
+                        del bucket[band_key]
+
+    def check(self, key: str, text: str, ignore: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Return the key of a near-duplicate of ``text``, or add ``text`` under ``key`` and return None.
+
+        Args:
+            key: Key to add ``text`` under
+            text: The chunk text
+            ignore: Keys it accepts do not count as duplicates
+        """
+        signature = self.signature(text)
+        duplicate = self.find(signature, ignore)
+        if duplicate is None:
+            self.add(key, signature)
+        return duplicate
+
+    def save(self, path: str):
+        """Atomically write the signatures to ``path`` (.npz)."""
+        with self._lock:
+            keys = list(self._signatures)
+            signatures = np.stack([self._signatures[k] for k in keys]) if keys else np.zeros((0, self.num_perm), np.uint32)
+        params = np.asarray([self.threshold, self.num_perm, self.shingle_size, self.seed], dtype=np.float64)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, params=params, keys=np.asarray(keys, dtype=str), signatures=signatures)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> Optional["NearDuplicateFilter"]:
+        """A filter built with ``kwargs`` holding the signatures saved at ``path``.
+
+        Returns:
+            The filter, or None if there is no file or it was saved with other settings
+        """
+        dedup = cls(**kwargs)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if data["params"].tolist() != [dedup.threshold, dedup.num_perm, dedup.shingle_size, dedup.seed]:
+                return None
+            for key, signature in zip(data["keys"].tolist(), data["signatures"]):
+                dedup.add(key, signature)
+        return dedup
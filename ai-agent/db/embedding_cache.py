@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from db.embedding_engine import is_rate_limited
+from utils.scheduler import RateScheduler, embedding_scheduler
+from utils.singleflight import SingleFlight
+from utils.tokens import count_tokens
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so that trivially different copies share a cache entry."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """A persistent (model, text hash) -> vector store in SQLite with LRU eviction.
+
+    SQLite in WAL mode lets every uvicorn worker on the host share one cache file.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        # Rows in the table, counted once here and then kept up to date by put_many.
+        # Other workers' inserts are only seen when the count is taken again before evicting.
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    @staticmethod
+    def key(model: str, kind: str, text: str) -> str:
+        """Cache key for a text embedded by ``model`` as a ``kind`` ("query" or "document")."""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model}:{kind}:{digest}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for whichever of ``keys`` are present, refreshing their recency."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found]
+                )
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors, evicting the least recently used entries beyond ``max_entries``."""
+        now = time.time()
+        rows = [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()]
+        with self._lock:
+            count = self._count
+            self._conn.execute("BEGIN")
+            try:
+                self._put_rows(rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # Leave the shared connection usable after SQLITE_BUSY or a full disk.
+                self._conn.rollback()
+                self._count = count
+                raise
+
+    def _put_rows(self, rows: List[tuple]):
+        """Insert and evict inside the caller's transaction."""
+        # A key's vector never changes, so a key stored meanwhile by another caller is kept as is.
+        self._count += self._conn.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?)", rows).rowcount
+        if self._count > self.max_entries:
+            # Only now is the table counted, to include rows added by other workers.
+            (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if self._count > self.max_entries:
+            # Evict an extra 10% so eviction doesn't run on every insert.
+            excess = self._count - int(self.max_entries * 0.9)
+            self._count -= self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedding model so repeated texts are served from an ``EmbeddingCache``.
+
+    Only misses reach the model, and each of those calls is admitted by the
+    scheduler. Concurrent misses for the same query share one call.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache: Optional[EmbeddingCache] = None,
+        scheduler: RateScheduler = embedding_scheduler,
+    ):
+        """Initialize the cached embeddings.
+
+        Args:
+            embeddings: The underlying embedding model
+            model_name: Name of the model, part of every cache key
+            cache: The cache to use; a default on-disk cache is opened if omitted
+            scheduler: Admits calls to the underlying model
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or EmbeddingCache()
+        self.scheduler = scheduler
+        self.query_flights = SingleFlight("query_embeddings")
+
+    def _check_rate_limit(self, e: Exception):
+        if is_rate_limited(e):
+            self.scheduler.pause()
+
+    def _embed(self, texts: List[str], call: Callable[[], Any]):
+        with self.scheduler.slot(sum(count_tokens(t) for t in texts)):
+            try:
+                return call()
+            except Exception as e:
+                self._check_rate_limit(e)
+                raise
+
+    async def _aembed(self, texts: List[str], call: Callable[[], Awaitable[Any]]):
+        async with self.scheduler.aslot(sum(count_tokens(t) for t in texts)):
+            try:
+                return await call()
+            except Exception as e:
+                self._check_rate_limit(e)
+                raise
+
+    def _lookup(self, texts: List[str], kind: str):
+        keys = [self.cache.key(self.model_name, kind, t) for t in texts]
+        found = self.cache.get_many(keys)
+        # Embed each distinct missing text once, even if it repeats within the batch.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return keys, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts, "document")
+        if missing:
+            pending = list(missing.values())
+            vectors = self._embed(pending, lambda: self.embeddings.embed_documents(pending))
+            new = dict(zip(missing, vectors))
+            self.cache.put_many(new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # SQLite reads and writes, and waits on the WAL lock, happen off the event loop.
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts, "document")
+        if missing:
+            pending = list(missing.values())
+            vectors = await self._aembed(pending, lambda: self.embeddings.aembed_documents(pending))
+            new = dict(zip(missing, vectors))
+            await asyncio.to_thread(self.cache.put_many, new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    def _query_miss(self, key: str, text: str) -> List[float]:
+        vector = self._embed([text], lambda: self.embeddings.embed_query(text))
+        self.cache.put_many({key: vector})
+        return vector
+
+    async def _aquery_miss(self, key: str, text: str) -> List[float]:
+        vector = await self._aembed([text], lambda: self.embeddings.aembed_query(text))
+        await asyncio.to_thread(self.cache.put_many, {key: vector})
+        return vector
+
+    def embed_query(self, text: str) -> List[float]:
+        (key,), found, missing = self._lookup([text], "query")
+        if missing:
+            # The same question asked by many users at once is embedded once.
+            found[key] = self.query_flights.do(key, lambda: self._query_miss(key, text))
+        return found[key]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        (key,), found, missing = await asyncio.to_thread(self._lookup, [text], "query")
+        if missing:
+            found[key] = await self.query_flights.ado(key, lambda: self._aquery_miss(key, text))
+        return found[key]
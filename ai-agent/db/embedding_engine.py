@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Tuple, TypeVar, Union
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("EmbeddingEngine")
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "6"))
+INGEST_BACKOFF_BASE = float(os.getenv("INGEST_BACKOFF_BASE", "1.0"))
+INGEST_BACKOFF_MAX = float(os.getenv("INGEST_BACKOFF_MAX", "60.0"))
+
+T = TypeVar("T")
+
+_RATE_LIMIT_MARKERS = ("429", "resource exhausted", "resourceexhausted", "rate limit", "quota", "too many requests")
+_TRANSIENT_MARKERS = ("500", "502", "503", "504", "unavailable", "deadline", "timeout", "timed out", "connection")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether an embedding API error means we are over quota."""
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _RATE_LIMIT_MARKERS)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an embedding API error is worth retrying."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return is_rate_limited(error) or any(marker in text for marker in _TRANSIENT_MARKERS)
+
+
+def batched(items: Iterable[T], size: int) -> Iterable[List[T]]:
+    """Yield consecutive lists of up to ``size`` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def abatched(items: AsyncIterable[T], size: int) -> AsyncIterator[List[T]]:
+    """Async ``batched``: consecutive lists of up to ``size`` items, pulled lazily."""
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class EmbeddingEngine:
+    """Embeds batches of texts with bounded concurrency and rate-limit-aware retries.
+
+    A 429 from any batch pauses every batch of the engine until the backoff
+    expires, so concurrent workers back off together instead of hammering the quota.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        concurrency: int = INGEST_CONCURRENCY,
+        max_retries: int = INGEST_MAX_RETRIES,
+        backoff_base: float = INGEST_BACKOFF_BASE,
+        backoff_max: float = INGEST_BACKOFF_MAX,
+    ):
+        """Initialize the engine.
+
+        Args:
+            embeddings: The embedding model
+            concurrency: Maximum number of batches in flight
+            max_retries: Retries per batch for rate-limit and transient errors
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Cap on a single backoff delay in seconds
+        """
+        self.embeddings = embeddings
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cooldown_until = 0.0
+        self.retries = 0
+
+    async def _wait_for_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying with full-jitter exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_cooldown()
+            try:
+                return await self.embeddings.aembed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if is_rate_limited(e):
+                    # Share the pause with every other in-flight batch.
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                self.retries += 1
+                logger.warning(f"Embedding batch of {len(texts)} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def embed_batches(
+        self, batches: Union[Iterable[Tuple[T, List[str]]], AsyncIterable[Tuple[T, List[str]]]]
+    ) -> AsyncIterator[Tuple[T, List[List[float]]]]:
+        """Embed ``(payload, texts)`` batches, yielding ``(payload, vectors)`` as each completes.
+
+        At most ``concurrency`` batches are in flight, and the input is only
+        pulled as slots free up, so a lazy source is never read far ahead.
+        Results arrive in completion order. If a batch fails for good the
+        remaining in-flight batches are cancelled and the error is raised.
+        """
+        if not hasattr(batches, "__aiter__"):
+            batches = _aiter(batches)
+
+        pending = set()
+        try:
+            async for payload, texts in batches:
+                if len(pending) >= self.concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.create_task(self._run(payload, texts)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _run(self, payload: T, texts: List[str]) -> Tuple[T, List[List[float]]]:
+        return payload, await self.embed_batch(texts)
+
+
+async def _aiter(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
@@ -0,0 +1,114 @@
+import math
+import os
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# Index type and tuning knobs. "flat" is exact brute force; the others are
+# approximate and trade recall for latency (see benchmarks/ann_benchmark.py).
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "16"))
+PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+TRAIN_SAMPLE_SIZE = int(os.getenv("FAISS_TRAIN_SAMPLE_SIZE", "50000"))
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+
+def _nlist_for(n_hint: Optional[int], nlist: int) -> int:
+    """Cap the number of IVF lists at ~4*sqrt(N), and at N, so small corpora still train well."""
+    if not n_hint:
+        return nlist
+    # k-means needs at least one training vector per list.
+    return max(1, min(nlist, int(4 * math.sqrt(n_hint)), n_hint))
+
+
+def create_index(
+    dim: int,
+    index_type: str = FAISS_INDEX_TYPE,
+    n_hint: Optional[int] = None,
+    nlist: int = IVF_NLIST,
+    hnsw_m: int = HNSW_M,
+    pq_m: int = PQ_M,
+    pq_nbits: int = PQ_NBITS,
+) -> faiss.Index:
+    """Create an empty L2 index of the given type.
+
+    Args:
+        dim: Vector dimension
+        index_type: One of "flat", "ivf_flat", "hnsw" or "ivf_pq"
+        n_hint: Expected number of vectors, used to size IVF lists and PQ codebooks
+        nlist: Maximum number of IVF lists
+        hnsw_m: Number of HNSW neighbours per node
+        pq_m: Number of PQ sub-quantizers (must divide ``dim``)
+        pq_nbits: Bits per PQ sub-quantizer code
+
+    Returns:
+        The index, accepting caller-assigned ids via ``add_with_ids``; IVF
+        indexes must be trained with ``train_index`` before use
+    """
+    if index_type == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, hnsw_m)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index = faiss.IndexIDMap2(hnsw)
+    elif index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, _nlist_for(n_hint, nlist))
+    elif index_type == "ivf_pq":
+        if dim % pq_m:
+            raise ValueError(f"FAISS_PQ_M={pq_m} must divide the embedding dimension {dim}")
+        if n_hint:
+            # PQ needs at least 2**nbits training points per codebook.
+            pq_nbits = max(1, min(pq_nbits, int(math.log2(n_hint))))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, _nlist_for(n_hint, nlist), pq_m, pq_nbits)
+    else:
+        raise ValueError(f"Unsupported FAISS index type: {index_type}. Supported types: {', '.join(INDEX_TYPES)}")
+
+    set_search_params(index)
+    return index
+
+
+def train_index(index: faiss.Index, vectors, sample_size: int = TRAIN_SAMPLE_SIZE):
+    """Train an index on a random sample of ``vectors``; a no-op for indexes that need no training."""
+    if index.is_trained:
+        return
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) > sample_size:
+        rng = np.random.default_rng(0)
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    index.train(vectors)
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """Return the innermost index, unwrapping any id-map layers."""
+    index = faiss.downcast_index(index)
+    while isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Which of INDEX_TYPES ``index`` is."""
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def set_search_params(index: faiss.Index, nprobe: int = IVF_NPROBE, ef_search: int = HNSW_EF_SEARCH):
+    """Apply query-time knobs: ``nprobe`` for IVF indexes, ``efSearch`` for HNSW."""
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(nprobe, inner.nlist)
+    elif isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
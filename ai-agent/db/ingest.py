@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from db.embedding_engine import INGEST_BATCH_SIZE, EmbeddingEngine, abatched
+from db.index_factory import TRAIN_SAMPLE_SIZE
+from db.registry import DocumentRegistry, chunk_id, source_key
+from db.vectorstore import (
+    VECTOR_STORE_DIR,
+    add_to_store,
+    embedding_model,
+    index_lock,
+    needs_training,
+    remove_from_store,
+    save_changes,
+    vector_store,
+)
+from loaders.engine import loader_engine
+from loaders.splitter import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, SPLITTER_THREADS, BoundaryTokenSplitter
+from utils.fingerprint import file_fingerprint
+from utils.scheduler import with_priority
+
+logger = logging.getLogger("Ingestion")
+
+# Persist the index every N embedded batches so a failed job keeps its progress.
+INGEST_CHECKPOINT_BATCHES = int(os.getenv("INGEST_CHECKPOINT_BATCHES", "50"))
+# "token" packs sentences into chunks of CHUNK_TOKENS tokens; "recursive" is
+# the character-based splitter sized by CHUNK_SIZE / CHUNK_OVERLAP.
+CHUNK_SPLITTER = os.getenv("CHUNK_SPLITTER", "token")
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "400"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "80"))
+
+
+# Source file -> content hash and chunk ids, persisted next to the vector store.
+registry = DocumentRegistry.load(VECTOR_STORE_DIR)
+_source_locks: Dict[str, asyncio.Lock] = {}
+
+
+class IngestionJob:
+    """Progress of one file moving through load -> split -> embed -> index."""
+
+    def __init__(self, path: str, metadata: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.metadata = metadata or {}
+        self.status = "queued"
+        self.total_chunks = 0
+        self.indexed_chunks = 0
+        self.unchanged_chunks = 0
+        self.removed_chunks = 0
+        self.duplicate_chunks = 0
+        self.duplicate_chars = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable job status for the progress endpoint."""
+        return {
+            "job_id": self.id,
+            "file": os.path.basename(self.path),
+            "status": self.status,
+            "total_chunks": self.total_chunks,
+            "indexed_chunks": self.indexed_chunks,
+            "unchanged_chunks": self.unchanged_chunks,
+            "removed_chunks": self.removed_chunks,
+            # Near-duplicates dropped before embedding, and the text that was not embedded.
+            "duplicate_chunks": self.duplicate_chunks,
+            "duplicate_chars": self.duplicate_chars,
+            "progress": self.indexed_chunks / self.total_chunks if self.total_chunks else 0.0,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# Job status is kept per process; poll the worker that accepted the upload.
+jobs: Dict[str, IngestionJob] = {}
+
+
+def create_job(path: str, metadata: Optional[Dict[str, Any]] = None) -> IngestionJob:
+    """Register a new ingestion job for ``path``."""
+    job = IngestionJob(path, metadata)
+    jobs[job.id] = job
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestionJob]:
+    """Look up a job by id."""
+    return jobs.get(job_id)
+
+
+def checkpoint(store=vector_store):
+    """Persist the changes to the vector store and the registry together, in proportion to their size."""
+    with index_lock.write():
+        save_changes(store, VECTOR_STORE_DIR)
+        registry.save(VECTOR_STORE_DIR)
+
+
+def _indexed(store, ids) -> List[str]:
+    """The subset of ``ids`` actually present in the store's docstore."""
+    return [i for i in ids if i in store.docstore._dict]
+
+
+def create_splitter():
+    """The text splitter selected by CHUNK_SPLITTER."""
+    if CHUNK_SPLITTER == "recursive":
+        return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return BoundaryTokenSplitter(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+
+
+async def split_stream(docs: AsyncIterator[Document], splitter) -> AsyncIterator[Document]:
+    """Split documents as they arrive instead of after the whole file is loaded.
+
+    A few documents are split together so the token splitter can spread them over its threads.
+    """
+    async with aclosing(docs), aclosing(abatched(docs, SPLITTER_THREADS)) as groups:
+        async for group in groups:
+            for split in await asyncio.to_thread(splitter.split_documents, group):
+                yield split
+
+
+def _tracked_chunks(store, chunk_ids: List[str], seen: set, previous: List[str]) -> List[str]:
+    """Chunks to record for a partly ingested source: those indexed so far from this run,
+    plus earlier chunks not reached yet, which are still in the index."""
+    return _indexed(store, chunk_ids + [cid for cid in previous if cid not in seen])
+
+
+def _estimate_chunks(path: str) -> int:
+    """Rough chunk count of a file from its size, used to size a new index before the file is read."""
+    if CHUNK_SPLITTER == "recursive":
+        chars_per_chunk = CHUNK_SIZE - CHUNK_OVERLAP
+    else:
+        chars_per_chunk = 4 * (CHUNK_TOKENS - CHUNK_OVERLAP_TOKENS)
+    return max(1, os.path.getsize(path) // max(1, chars_per_chunk))
+
+
+@with_priority("batch")
+async def run_ingestion(job: IngestionJob, store=vector_store, engine: Optional[EmbeddingEngine] = None):
+    """Bring the index up to date with the job's file, updating its progress as it goes.
+
+    Only chunks that are new since the file was last ingested are embedded, and
+    vectors of chunks that disappeared from it are removed, so re-ingesting a
+    file costs in proportion to what changed. Batches are embedded concurrently
+    by ``engine`` and added as they complete, with periodic checkpoints;
+    whatever was indexed before a failure is persisted.
+
+    The file streams through load -> split -> embed -> add: each stage pulls
+    from the previous one only when it has room, so memory holds a bounded
+    window of documents and batches rather than the whole file.
+    """
+    engine = engine or EmbeddingEngine(embedding_model)
+    source = source_key(job.path)
+    lock = _source_locks.setdefault(source, asyncio.Lock())
+    chunk_ids = []
+    seen = set()
+    previous = []
+    dedup = None
+    changed = False
+    added_since_checkpoint = 0
+    async with lock:
+        try:
+            job.status = "fingerprinting"
+            file_hash = await asyncio.to_thread(file_fingerprint, job.path)
+            previous = registry.chunks(source)
+            if registry.file_hash(source) == file_hash and len(_indexed(store, previous)) == len(previous):
+                job.unchanged_chunks = len(previous)
+                job.status = "unchanged"
+                return job
+
+            splitter = create_splitter()
+            # Near-duplicates are checked against every indexed chunk, from this file or any other.
+            dedup = store.dedup
+            stale = set(previous)
+
+            def superseded(key: str) -> bool:
+                """An earlier version of this file's chunk: replaced by its edit, not duplicated by it."""
+                return key in stale and key not in seen
+
+            async def new_chunks() -> AsyncIterator[Tuple[str, Document]]:
+                """The file's chunks not yet in the index, recording every chunk id on the way."""
+                # PDF, CSV and JSON parse in the loader engine's process pool; text is read in blocks.
+                async with aclosing(split_stream(loader_engine.stream([job.path]), splitter)) as splits:
+                    async for doc in splits:
+                        cid = chunk_id(source, doc.page_content)
+                        if cid in seen:
+                            continue
+                        seen.add(cid)
+                        if cid in store.docstore._dict:
+                            chunk_ids.append(cid)
+                            job.unchanged_chunks += 1
+                            continue
+                        if dedup and dedup.check(cid, doc.page_content, ignore=superseded):
+                            # Repeated boilerplate with small edits: not embedded, indexed or recorded.
+                            job.duplicate_chunks += 1
+                            job.duplicate_chars += len(doc.page_content)
+                            continue
+                        chunk_ids.append(cid)
+                        job.total_chunks += 1
+                        yield cid, doc
+
+            job.status = "indexing"
+            n_hint = _estimate_chunks(job.path)
+            # Until an IVF/PQ index is trained, batches are held back so it trains on a real sample;
+            # flat and HNSW indexes take each batch as soon as it is embedded.
+            pending_ids, pending_texts, pending_vectors, pending_metadatas = [], [], [], []
+            train_size = min(TRAIN_SAMPLE_SIZE, n_hint)
+
+            def flush():
+                nonlocal pending_ids, pending_texts, pending_vectors, pending_metadatas, changed
+                add_to_store(store, pending_texts, pending_vectors, pending_metadatas, pending_ids, n_hint=n_hint)
+                job.indexed_chunks += len(pending_ids)
+                changed = True
+                pending_ids, pending_texts, pending_vectors, pending_metadatas = [], [], [], []
+
+            async with aclosing(abatched(new_chunks(), INGEST_BATCH_SIZE)) as batches:
+                payloads = ((batch, [doc.page_content for _, doc in batch]) async for batch in batches)
+                async with aclosing(engine.embed_batches(payloads)) as embedded:
+                    async for batch, vectors in embedded:
+                        pending_ids += [cid for cid, _ in batch]
+                        pending_texts += [doc.page_content for _, doc in batch]
+                        pending_metadatas += [{**doc.metadata, **job.metadata, "chunk_id": cid} for cid, doc in batch]
+                        pending_vectors += vectors
+                        if needs_training(store) and len(pending_texts) < train_size:
+                            continue
+                        # Adding (and training on the first batch) holds the index write lock: off the event loop.
+                        await asyncio.to_thread(flush)
+
+                        added_since_checkpoint += 1
+                        if added_since_checkpoint >= INGEST_CHECKPOINT_BATCHES:
+                            registry.update(source, None, _tracked_chunks(store, chunk_ids, seen, previous))
+                            await asyncio.to_thread(checkpoint, store)
+                            added_since_checkpoint = 0
+            if pending_ids:
+                # A file smaller than the training sample: train on what there is.
+                await asyncio.to_thread(flush)
+
+            # Chunks that disappeared from the file are only known once all of it has been read.
+            removed = [cid for cid in previous if cid not in seen]
+            if removed:
+                job.removed_chunks = await asyncio.to_thread(remove_from_store, store, removed)
+                changed = True
+
+            registry.update(source, file_hash, chunk_ids)
+            changed = True
+            job.status = "done"
+        except Exception as e:
+            logger.exception(f"Ingestion of {job.path} failed after {job.indexed_chunks} chunks")
+            job.status = "failed"
+            job.error = str(e)
+            if changed:
+                # No file hash: the next run re-diffs this source instead of skipping it.
+                registry.update(source, None, _tracked_chunks(store, chunk_ids, seen, previous))
+        finally:
+            if dedup:
+                # Chunks signed on the way in but never indexed must not shadow a later run's.
+                dedup.remove([cid for cid in chunk_ids if cid not in store.docstore._dict])
+            if changed:
+                await asyncio.to_thread(checkpoint, store)
+            job.finished_at = time.time()
+    return job
+
+
+async def remove_source(path: str, store=vector_store) -> int:
+    """Drop every chunk indexed from ``path`` and forget the source.
+
+    Returns:
+        The number of vectors removed
+    """
+    source = source_key(path)
+    async with _source_locks.setdefault(source, asyncio.Lock()):
+        removed = await asyncio.to_thread(remove_from_store, store, registry.remove(source))
+        await asyncio.to_thread(checkpoint, store)
+    return removed
+
+
+async def refresh_directory(directory: str, store=vector_store) -> List[IngestionJob]:
+    """Re-ingest every file in ``directory`` and drop sources whose files are gone.
+
+    Unchanged files are skipped after hashing, so a periodic refresh costs in
+    proportion to what changed since the last one.
+    """
+    directory = source_key(directory)
+    for source in list(registry.sources):
+        if os.path.dirname(source) == directory and not os.path.exists(source):
+            await remove_source(source, store)
+
+    jobs_run = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            jobs_run.append(await run_ingestion(create_job(path), store))
+    return jobs_run
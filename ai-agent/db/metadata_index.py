@@ -0,0 +1,67 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# Metadata fields that queries can be scoped to. Chunks carry their loader
+# metadata ("source") plus the non-file form fields of their upload ("tenant").
+METADATA_INDEX_FIELDS = [f.strip() for f in os.getenv("METADATA_INDEX_FIELDS", "source,tenant").split(",") if f.strip()]
+
+
+def _key(field: str, value: Any) -> str:
+    """Canonical form of a metadata value; paths compare like registry source keys."""
+    value = str(value)
+    return os.path.normpath(value) if field == "source" else value
+
+
+class MetadataIndex:
+    """Inverted index from metadata values to the FAISS ids of the chunks carrying them.
+
+    Lets a filtered query resolve its slice of the store with set operations
+    instead of scanning every chunk's metadata.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None):
+        self.fields = fields if fields is not None else METADATA_INDEX_FIELDS
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.fields}
+
+    def add(self, faiss_ids: Iterable[int], metadatas: Iterable[dict]):
+        for i, metadata in zip(faiss_ids, metadatas):
+            for field in self.fields:
+                if metadata.get(field) is not None:
+                    self._postings[field].setdefault(_key(field, metadata[field]), set()).add(i)
+
+    def remove(self, faiss_ids: Iterable[int], metadatas: Iterable[dict]):
+        for i, metadata in zip(faiss_ids, metadatas):
+            for field in self.fields:
+                if metadata.get(field) is None:
+                    continue
+                key = _key(field, metadata[field])
+                ids = self._postings[field].get(key)
+                if ids is not None:
+                    ids.discard(i)
+                    if not ids:
+                        del self._postings[field][key]
+
+    def select(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Sorted FAISS ids matching ``filter``.
+
+        Each field must match; a list of values matches any of them.
+
+        Raises:
+            ValueError: If ``filter`` names a field that is not indexed
+        """
+        selected: Optional[Set[int]] = None
+        for field, values in filter.items():
+            if field not in self._postings:
+                raise ValueError(f"Cannot filter on {field!r}; indexed fields: {self.fields}")
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            ids = set().union(*(self._postings[field].get(_key(field, v), ()) for v in values))
+            selected = ids if selected is None else selected & ids
+            if not selected:
+                break
+        return np.fromiter(sorted(selected or ()), dtype=np.int64)
+
+    def values(self, field: str) -> List[str]:
+        """Distinct indexed values of ``field``."""
+        return sorted(self._postings.get(field, {}))
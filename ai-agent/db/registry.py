@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from utils.jsonlog import append_records, read_records
+
+REGISTRY_FILE = "registry.json"
+# Changes since registry.json was written, one record per changed source.
+REGISTRY_LOG_FILE = "registry-{generation}.jsonl"
+
+
+def source_key(path: str) -> str:
+    """Canonical registry key for a source path ("./a/b.txt" and "a/b.txt" match)."""
+    return os.path.normpath(path)
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Content-derived docstore id of a chunk; identical text in one source maps to one id."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+class DocumentRegistry:
+    """Tracks, per source file, its content hash and the ids of the chunks indexed from it.
+
+    Saving appends the entries of the sources changed since the last save to
+    a log; the whole registry is rewritten only once the log holds more
+    entries than the registry has sources.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, dict]] = None, generation: int = 0):
+        self.sources = sources or {}
+        # registry.json of this generation plus registry-<generation>.jsonl hold the saved state.
+        self.generation = generation
+        self._logged = 0
+        self._changed = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, index_dir: str) -> "DocumentRegistry":
+        """Load the registry saved next to the vector store, or an empty one."""
+        path = os.path.join(index_dir, REGISTRY_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        registry = cls(saved["sources"], saved.get("generation", 0))
+        records = read_records(os.path.join(index_dir, REGISTRY_LOG_FILE.format(generation=registry.generation)))
+        for record in records:
+            if record["entry"] is None:
+                registry.sources.pop(record["source"], None)
+            else:
+                registry.sources[record["source"]] = record["entry"]
+        registry._logged = len(records)
+        return registry
+
+    def save(self, index_dir: str):
+        """Persist the changes since the last save next to the vector store."""
+        os.makedirs(index_dir, exist_ok=True)
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            # Entries are replaced, never mutated, so copies taken here are consistent.
+            records = [{"source": source, "entry": self.sources.get(source)} for source in sorted(changed)]
+            sources = dict(self.sources)
+        path = os.path.join(index_dir, REGISTRY_FILE)
+        if self.generation and os.path.exists(path) and self._logged + len(records) <= len(sources):
+            if records:
+                append_records(os.path.join(index_dir, REGISTRY_LOG_FILE.format(generation=self.generation)), records)
+                self._logged += len(records)
+            return
+        # The new generation starts with an empty log; the old log is deleted once nothing refers to it.
+        old_log = os.path.join(index_dir, REGISTRY_LOG_FILE.format(generation=self.generation))
+        self.generation += 1
+        stale = os.path.join(index_dir, REGISTRY_LOG_FILE.format(generation=self.generation))
+        if os.path.exists(stale):
+            # Left by a registry.json that was since deleted.
+            os.remove(stale)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"generation": self.generation, "sources": sources}, f)
+        os.replace(path + ".tmp", path)
+        if os.path.exists(old_log):
+            os.remove(old_log)
+        self._logged = 0
+
+    def file_hash(self, source: str) -> Optional[str]:
+        """Content hash recorded for ``source`` at its last successful ingestion."""
+        entry = self.sources.get(source)
+        return entry["file_hash"] if entry else None
+
+    def chunks(self, source: str) -> List[str]:
+        """Chunk ids recorded for ``source``."""
+        entry = self.sources.get(source)
+        return entry["chunks"] if entry else []
+
+    def update(self, source: str, file_hash: Optional[str], chunks: List[str]):
+        """Record the chunk ids now indexed for ``source``; ``file_hash`` is None while incomplete."""
+        with self._lock:
+            self.sources[source] = {"file_hash": file_hash, "chunks": chunks}
+            self._changed.add(source)
+
+    def remove(self, source: str) -> List[str]:
+        """Forget ``source`` and return the chunk ids that were indexed for it."""
+        with self._lock:
+            entry = self.sources.pop(source, None)
+            self._changed.add(source)
+        return entry["chunks"] if entry else []
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MEMORY_BYTES = int(os.getenv("LLM_CACHE_MEMORY_BYTES", str(32 * 2**20)))
+LLM_CACHE_DISK_BYTES = int(os.getenv("LLM_CACHE_DISK_BYTES", str(512 * 2**20)))
+# Only temperature-0 calls are cached unless this is set: a sampled answer
+# replayed forever would hide the variety the caller asked for.
+LLM_CACHE_NONDETERMINISTIC = os.getenv("LLM_CACHE_NONDETERMINISTIC", "0") == "1"
+
+
+def response_key(prompt: str, llm_string: str) -> str:
+    """Cache key: a hash of the model configuration (model, temperature, stop, bound tools) and of the full prompt."""
+    model = hashlib.sha256(llm_string.encode("utf-8")).hexdigest()[:16]
+    return f"{model}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+
+
+class MemoryTier:
+    """Serialized responses in an LRU dict bounded by their total UTF-8 size in bytes."""
+
+    def __init__(self, max_bytes: int = LLM_CACHE_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        # Key -> (value, its size in bytes)
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteTier:
+    """Serialized responses in SQLite, evicted least-recently-used beyond ``max_bytes``.
+
+    WAL mode lets every uvicorn worker on the host share the file, like the embedding cache.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        # Total size of the entries, summed once here and then kept up to date by put.
+        # Other workers' writes are only seen when it is summed again before evicting.
+        (self._bytes,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def put(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            total = self._bytes
+            self._conn.execute("BEGIN")
+            try:
+                self._put(key, value, size)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # Leave the shared connection usable after SQLITE_BUSY or a full disk.
+                self._conn.rollback()
+                self._bytes = total
+                raise
+
+    def _put(self, key: str, value: str, size: int):
+        """Insert and evict inside the caller's transaction."""
+        old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, size, time.time()))
+        self._bytes += size - (old[0] if old else 0)
+        if self._bytes > self.max_bytes:
+            # Only now is the table summed, to include entries written by other workers.
+            (self._bytes,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if self._bytes > self.max_bytes:
+            # Evict down to 90% so eviction doesn't run on every insert.
+            excess = self._bytes - int(self.max_bytes * 0.9)
+            victims = []
+            for victim, victim_size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                if excess <= 0:
+                    break
+                victims.append((victim,))
+                excess -= victim_size
+                self._bytes -= victim_size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._bytes = 0
+
+    def size(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": total}
+
+
+class ResponseCache(BaseCache):
+    """LangChain cache of chat model responses: an in-memory LRU in front of SQLite.
+
+    Plugged into a chat model through its ``cache`` field, so lookups happen
+    before the call is scheduled and a hit never reaches the API. Disk hits
+    are promoted to memory. Either tier may be omitted.
+    """
+
+    def __init__(self, memory: Optional[MemoryTier] = None, disk: Optional[SqliteTier] = None):
+        """Initialize the cache.
+
+        Args:
+            memory: The in-process tier, checked first
+            disk: The persistent tier shared by workers
+        """
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = response_key(prompt, llm_string)
+        value = self.memory.get(key) if self.memory is not None else None
+        if value is not None:
+            self.memory_hits += 1
+        elif self.disk is not None and (value := self.disk.get(key)) is not None:
+            self.disk_hits += 1
+            if self.memory is not None:
+                self.memory.put(key, value)
+        else:
+            self.misses += 1
+            return None
+        return loads(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        key = response_key(prompt, llm_string)
+        value = dumps(list(return_val))
+        if self.memory is not None:
+            self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def clear(self, **kwargs: Any):
+        for tier in (self.memory, self.disk):
+            if tier is not None:
+                tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process, and size and evictions of each tier."""
+        stats: Dict[str, Any] = {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses}
+        if self.memory is not None:
+            stats["memory"] = {"entries": len(self.memory), "bytes": self.memory.bytes, "evictions": self.memory.evictions}
+        if self.disk is not None:
+            stats["disk"] = {**self.disk.size(), "evictions": self.disk.evictions}
+        return stats
+
+
+def cache_for(temperature: float, cache: Optional[bool] = None) -> Optional[ResponseCache]:
+    """The shared response cache for a client, or None.
+
+    Args:
+        temperature: The client's sampling temperature
+        cache: True to cache the client's calls at any temperature, False never to;
+            None caches temperature-0 clients, or all with LLM_CACHE_NONDETERMINISTIC=1
+
+    Returns:
+        The cache to attach to the client, if any
+    """
+    if not LLM_CACHE_ENABLED or cache is False:
+        return None
+    if cache is None and temperature != 0 and not LLM_CACHE_NONDETERMINISTIC:
+        return None
+    return response_cache
+
+
+response_cache = ResponseCache(MemoryTier(), SqliteTier()) if LLM_CACHE_ENABLED else None
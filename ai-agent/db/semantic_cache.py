@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import faiss
+import numpy as np
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CachedAnswer:
+    """An answer together with the question and chunks it was generated from."""
+
+    def __init__(self, question: str, answer: str, chunk_ids: List[str]):
+        self.question = question
+        self.answer = answer
+        self.chunk_ids = chunk_ids
+        self.created_at = time.time()
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+    faiss.normalize_L2(vector)
+    return vector
+
+
+class SemanticCache:
+    """Answers to past questions, looked up by cosine similarity of question embeddings.
+
+    Entries live in a small dedicated inner-product index over normalized
+    vectors, expire after ``ttl`` seconds and are evicted least-recently-used
+    beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        """Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an answer stays valid
+            max_entries: Maximum cached answers; 0 disables the cache
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _remove(self, ids: List[int]):
+        for i in ids:
+            self._entries.pop(i, None)
+        self._index.remove_ids(np.asarray(ids, dtype=np.int64))
+
+    def lookup(
+        self,
+        embedding,
+        is_valid: Callable[[CachedAnswer], bool],
+        accept: Optional[Callable[[CachedAnswer], bool]] = None,
+    ) -> Optional[CachedAnswer]:
+        """Return the closest cached answer above the threshold that is fresh, still ``is_valid``
+        and, if given, passes ``accept``.
+
+        Expired or invalid matches are evicted on the way; matches failing
+        ``accept`` (e.g. outside the caller's metadata filter) are kept.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+            scores, ids = self._index.search(_normalize(embedding), min(4, self._index.ntotal))
+            now = time.time()
+            stale = []
+            found = None
+            for score, i in zip(scores[0], ids[0]):
+                if i == -1 or score < self.threshold:
+                    break
+                entry = self._entries[int(i)]
+                if now - entry.created_at > self.ttl or not is_valid(entry):
+                    stale.append(int(i))
+                    continue
+                if accept is not None and not accept(entry):
+                    continue
+                self._entries.move_to_end(int(i))
+                found = entry
+                break
+            if stale:
+                self._remove(stale)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def store(self, embedding, question: str, answer: str, chunk_ids: List[str]):
+        """Cache an answer, evicting the least recently used entries beyond ``max_entries``."""
+        if not self.enabled:
+            return
+        vector = _normalize(embedding)
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            self._index.add_with_ids(vector, np.asarray([self._next_id], dtype=np.int64))
+            self._entries[self._next_id] = CachedAnswer(question, answer, chunk_ids)
+            self._next_id += 1
+            if len(self._entries) > self.max_entries:
+                excess = len(self._entries) - self.max_entries
+                self._remove([i for i, _ in zip(self._entries, range(excess))])
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -1,15 +1,579 @@
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
+import base64
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
 import faiss
+import numpy as np
 from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
 
-embedding_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-index = faiss.IndexFlatL2(len(embedding_model.embed_query("hello world")))
-
-vector_store = FAISS(
-    embedding_function=embedding_model,
-    index=index,
-    docstore=InMemoryDocstore(),
-    index_to_docstore_id={},
+from db.bm25 import BM25Index
+from db.dedup import DEDUP_ENABLED, NearDuplicateFilter
+from db.embedding_cache import CachedEmbeddings
+from db.index_factory import (
+    TRAIN_SAMPLE_SIZE,
+    base_index,
+    create_index,
+    index_type_of,
+    set_search_params,
+    train_index,
 )
+from db.metadata_index import MetadataIndex
+from utils.jsonlog import append_records, read_records
+
+logger = logging.getLogger("VectorStore")
+
+# On-disk layout: a snapshot made of the raw FAISS index (memory-mappable), the
+# docstore as one JSON record per line, the FAISS id -> docstore id map and the
+# BM25 keyword index and near-duplicate signatures, plus a log of the chunks added and removed since it was written.
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_index")
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.jsonl"
+ID_MAP_FILE = "id_map.json"
+KEYWORD_INDEX_FILE = "bm25.npz"
+DEDUP_FILE = "dedup.npz"
+DELTA_FILE = "delta-{generation}.jsonl"
+# Bumped when the layout changes; stores in an older format are rebuilt.
+STORE_FORMAT = 2
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+# Filtered searches over at most this many chunks compare against their vectors
+# directly; larger slices are searched through the index with an id selector.
+FILTER_BRUTE_FORCE_MAX = int(os.getenv("FILTER_BRUTE_FORCE_MAX", "4096"))
+# HNSW graphs cannot drop nodes: removed vectors stay in the index, excluded from
+# searches, until they exceed this fraction of it and the index is rebuilt.
+FAISS_TOMBSTONE_RATIO = float(os.getenv("FAISS_TOMBSTONE_RATIO", "0.2"))
+# Saving appends changes to the log until it holds more chunks than this fraction
+# of the store, then writes a new snapshot. 0 writes a snapshot on every save.
+VECTOR_STORE_COMPACT_RATIO = float(os.getenv("VECTOR_STORE_COMPACT_RATIO", "0.25"))
+
+class ReadWriteLock:
+    """Lets many searches run at once while adds, removals and saves get exclusive access.
+
+    Writers are preferred so a steady stream of searches cannot starve ingestion,
+    and a thread holding the write lock may re-enter either side.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            if self._writer == threading.get_ident():
+                reentrant = True
+            else:
+                reentrant = False
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            if not reentrant:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+            self._writer_depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+# Searches take the read side; every mutation or snapshot of the shared index takes the write side.
+index_lock = ReadWriteLock()
+
+# Every embedding call, at ingestion and query time, goes through the on-disk cache.
+if os.getenv("LLM_BACKEND") == "fake":
+    # Offline load tests: hash-based vectors, cached apart from the real model's.
+    embedding_model = CachedEmbeddings(
+        DeterministicFakeEmbedding(size=int(os.getenv("EMBEDDING_DIM", "768"))), "fake-embedding"
+    )
+else:
+    embedding_model = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
+
+
+def embedding_dimension() -> int:
+    """Dimension of the embedding model, from EMBEDDING_DIM or one (cached) probe embedding."""
+    if os.getenv("EMBEDDING_DIM"):
+        return int(os.environ["EMBEDDING_DIM"])
+    return len(embedding_model.embed_query("hello world"))
+
+
+def save_vector_store(store: FAISS, index_dir: str = VECTOR_STORE_DIR):
+    """Write a snapshot of the index, docstore, id map, keyword index and dedup signatures so other processes can mmap them.
+
+    The snapshot includes every change so far, so it starts a new, empty log.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    generation = store.generation + 1
+
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    faiss.write_index(store.index, index_path + ".tmp")
+
+    docstore_path = os.path.join(index_dir, DOCSTORE_FILE)
+    with open(docstore_path + ".tmp", "w", encoding="utf-8") as f:
+        for doc_id, doc in store.docstore._dict.items():
+            record = {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    id_map_path = os.path.join(index_dir, ID_MAP_FILE)
+    with open(id_map_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "format": STORE_FORMAT,
+                "generation": generation,
+                "index_type": index_type_of(store.index),
+                "next_id": store.next_id,
+                "index_to_docstore_id": list(store.index_to_docstore_id.items()),
+                "tombstones": sorted(store.tombstones),
+            },
+            f,
+        )
+
+    store.keyword_index.save(os.path.join(index_dir, KEYWORD_INDEX_FILE))
+    if store.dedup is not None:
+        store.dedup.save(os.path.join(index_dir, DEDUP_FILE))
+
+    # Atomic renames, id map last: readers treat its presence as "index complete",
+    # and it names the log of this snapshot.
+    _remove_logs(index_dir, keep=None)
+    os.replace(index_path + ".tmp", index_path)
+    os.replace(docstore_path + ".tmp", docstore_path)
+    os.replace(id_map_path + ".tmp", id_map_path)
+    _remove_logs(index_dir, keep=DELTA_FILE.format(generation=generation))
+    store.generation = generation
+    store.delta = []
+    store.delta_chunks = 0
+
+
+def _remove_logs(index_dir: str, keep: Optional[str]):
+    """Delete the change logs in ``index_dir`` other than ``keep``; None keeps only the current snapshot's."""
+    if keep is None:
+        # Before the id map is replaced: any log of the generation about to be written is stale.
+        try:
+            with open(os.path.join(index_dir, ID_MAP_FILE), encoding="utf-8") as f:
+                keep = DELTA_FILE.format(generation=json.load(f).get("generation", 0))
+        except (OSError, ValueError):
+            keep = ""
+    for name in os.listdir(index_dir):
+        if name.startswith("delta-") and name.endswith(".jsonl") and name != keep:
+            os.remove(os.path.join(index_dir, name))
+
+
+def save_changes(store: FAISS, index_dir: str = VECTOR_STORE_DIR):
+    """Persist the chunks added and removed since the last save, in proportion to how many there are.
+
+    Changes are appended to the snapshot's log. A new snapshot is written
+    instead when this store has not written one yet or the log would hold more than
+    VECTOR_STORE_COMPACT_RATIO of the store's chunks. Callers hold
+    ``index_lock`` for writing.
+    """
+    pending = sum(len(record["ids"]) for record in store.delta)
+    logged = store.delta_chunks + pending
+    snapshot = store.generation and os.path.exists(os.path.join(index_dir, ID_MAP_FILE))
+    if not snapshot or logged > VECTOR_STORE_COMPACT_RATIO * store.index.ntotal:
+        save_vector_store(store, index_dir)
+    elif store.delta:
+        append_records(os.path.join(index_dir, DELTA_FILE.format(generation=store.generation)), store.delta)
+        store.delta = []
+        store.delta_chunks = logged
+
+
+def _mmap_flags(index_type: str) -> int:
+    """Read flags mapping the vectors of an index of ``index_type`` instead of reading them.
+
+    The two mmap flags cannot be combined: FAISS refuses to load IVF lists
+    with ``IO_FLAG_MMAP_IFC`` set.
+    """
+    if index_type in ("ivf_flat", "ivf_pq"):
+        # Maps the inverted lists.
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    if not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        logger.warning("This FAISS build cannot mmap flat or HNSW codes; they are loaded into memory")
+        return 0
+    # Maps the codes of flat and HNSW indexes.
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+def _read_index(index_path: str, index_type: Optional[str]) -> faiss.Index:
+    if index_type is not None:
+        return faiss.read_index(index_path, _mmap_flags(index_type))
+    # Saved before the index type was recorded: try the flat/HNSW flags, then the IVF ones.
+    try:
+        return faiss.read_index(index_path, _mmap_flags("flat"))
+    except RuntimeError:
+        return faiss.read_index(index_path, _mmap_flags("ivf_flat"))
+
+
+def load_vector_store(index_dir: str = VECTOR_STORE_DIR, mmap: bool = True) -> Optional[FAISS]:
+    """Load a persisted vector store, or return None if none has been saved yet.
+
+    With ``mmap`` the index is opened read-only and memory-mapped: the
+    inverted lists of IVF indexes, and with FAISS 1.7.3 or later
+    (``IO_FLAG_MMAP_IFC``) the codes of flat and HNSW indexes, so every
+    worker on the host shares one copy of the vectors via the page cache.
+    On older FAISS, flat and HNSW vectors are read into each worker's memory.
+    """
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    docstore_path = os.path.join(index_dir, DOCSTORE_FILE)
+    id_map_path = os.path.join(index_dir, ID_MAP_FILE)
+    if not all(os.path.exists(p) for p in (index_path, docstore_path, id_map_path)):
+        return None
+
+    with open(id_map_path, encoding="utf-8") as f:
+        id_map = json.load(f)
+    if id_map.get("format") != STORE_FORMAT:
+        logger.warning(f"Ignoring vector store in {index_dir}: format {id_map.get('format')} != {STORE_FORMAT}, rebuilding")
+        return None
+    index_to_docstore_id = {int(i): doc_id for i, doc_id in id_map["index_to_docstore_id"]}
+
+    index = _read_index(index_path, id_map.get("index_type")) if mmap else faiss.read_index(index_path)
+    set_search_params(index)
+
+    docs = {}
+    with open(docstore_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            docs[record["id"]] = Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    store = FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    store.docstore_to_index_id = {doc_id: i for i, doc_id in index_to_docstore_id.items()}
+    store.is_mapped = mmap
+    store.index_path = index_path
+    store.next_id = id_map["next_id"]
+    store.generation = id_map.get("generation", 0)
+    _set_tombstones(store, id_map.get("tombstones", ()))
+    store.keyword_index = BM25Index.load(os.path.join(index_dir, KEYWORD_INDEX_FILE))
+    if store.keyword_index is None:
+        # Stores saved before keyword search existed: index the docstore texts once.
+        store.keyword_index = BM25Index()
+        store.keyword_index.add(list(docs), [doc.page_content for doc in docs.values()])
+    store.dedup = _load_dedup(os.path.join(index_dir, DEDUP_FILE), docs)
+    # Small and derived from the docstore, so rebuilt on load rather than persisted.
+    store.metadata_index = MetadataIndex()
+    store.metadata_index.add(index_to_docstore_id, (docs[doc_id].metadata for doc_id in index_to_docstore_id.values()))
+
+    store.delta = []
+    records = read_records(os.path.join(index_dir, DELTA_FILE.format(generation=store.generation)))
+    if records:
+        # Changes since the snapshot go into a private in-RAM copy of the index
+        # until the next snapshot is written and mapped again.
+        ensure_writable(store)
+        for record in records:
+            _replay(store, record)
+    store.delta_chunks = sum(len(record["ids"]) for record in records)
+    return store
+
+
+def _load_dedup(path: str, docs: dict) -> Optional[NearDuplicateFilter]:
+    """The near-duplicate filter over ``docs``, from its saved signatures where they still apply."""
+    if not DEDUP_ENABLED:
+        return None
+    dedup = NearDuplicateFilter.load(path)
+    if dedup is None:
+        # Saved before signatures were, or with other DEDUP_* settings: sign the docstore once.
+        dedup = NearDuplicateFilter()
+    # A crash between writing the signatures and the id map leaves them a save ahead.
+    dedup.remove([doc_id for doc_id in dedup.keys() if doc_id not in docs])
+    for doc_id, doc in docs.items():
+        if doc_id not in dedup:
+            dedup.add(doc_id, dedup.signature(doc.page_content))
+    return dedup
+
+
+def _replay(store: FAISS, record: dict):
+    """Apply a logged change to a store loaded from the snapshot the log belongs to."""
+    if record["op"] == "add":
+        vectors = np.frombuffer(base64.b64decode(record["vectors"]), dtype=np.float32).reshape(len(record["ids"]), -1)
+        store.next_id = record["first_id"]
+        _add(store, record["texts"], vectors, record["metadatas"], record["ids"], record.get("n_hint"))
+    else:
+        _remove(store, record["ids"])
+
+
+def ensure_writable(store: FAISS) -> FAISS:
+    """Replace a memory-mapped, read-only index with an in-RAM copy before adding to it.
+
+    The copy is read again from the index file without mmap flags:
+    ``faiss.clone_index`` cannot copy the on-disk inverted lists of a mapped IVF index.
+    """
+    if getattr(store, "is_mapped", False):
+        index = faiss.read_index(store.index_path, 0)
+        if index.ntotal != store.index.ntotal:
+            # Another process saved over the file; its vectors don't match this process's id map.
+            raise RuntimeError(f"{store.index_path} changed since it was loaded; restart to load the new store")
+        set_search_params(index)
+        store.index = index
+        store.is_mapped = False
+    return store
+
+
+def prepare_index(store: FAISS, vectors, n_hint: Optional[int] = None):
+    """Size and train the store's index for a first batch of ``vectors``.
+
+    An empty index is recreated, keeping its type, with IVF lists and PQ
+    codebooks sized for ``n_hint`` vectors (default: the batch), then trained
+    on a sample of the batch. Flat and HNSW indexes need no training.
+    """
+    if store.index.ntotal == 0:
+        n_hint = n_hint or len(vectors)
+        if len(vectors) < min(n_hint, TRAIN_SAMPLE_SIZE):
+            # Fewer vectors than the sample waited for: the corpus is smaller than estimated.
+            n_hint = len(vectors)
+        store.index = create_index(store.index.d, index_type_of(store.index), n_hint=n_hint)
+    train_index(store.index, vectors)
+
+
+def needs_training(store: FAISS) -> bool:
+    """Whether the next batch added to ``store`` will be used to size and train its index.
+
+    Only untrained IVF/PQ indexes do; flat and HNSW indexes take vectors as they come.
+    """
+    return not store.index.is_trained
+
+
+def add_to_store(
+    store: FAISS,
+    texts: List[str],
+    vectors: List[List[float]],
+    metadatas: List[dict],
+    ids: List[str],
+    n_hint: Optional[int] = None,
+) -> List[int]:
+    """Add pre-computed embeddings to ``store`` under ``index_lock``.
+
+    Each chunk gets a fresh, stable int64 FAISS id, so later removals never
+    shift the ids of the remaining vectors.
+
+    Args:
+        store: The vector store
+        texts: Chunk texts
+        vectors: Their embeddings
+        metadatas: Their metadata
+        ids: Their docstore ids
+        n_hint: Expected final corpus size, used to size a new index
+
+    Returns:
+        The FAISS ids of the added chunks
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    with index_lock.write():
+        first_id = store.next_id
+        faiss_ids = _add(store, texts, vectors, metadatas, ids, n_hint)
+        store.delta.append(
+            {
+                "op": "add",
+                "first_id": first_id,
+                "n_hint": n_hint,
+                "ids": ids,
+                "texts": texts,
+                "metadatas": metadatas,
+                "vectors": base64.b64encode(vectors.tobytes()).decode("ascii"),
+            }
+        )
+        return faiss_ids
+
+
+def _add(store: FAISS, texts: List[str], vectors: np.ndarray, metadatas: List[dict], ids: List[str], n_hint) -> List[int]:
+    ensure_writable(store)
+    if needs_training(store):
+        prepare_index(store, vectors, n_hint)
+    faiss_ids = np.arange(store.next_id, store.next_id + len(ids), dtype=np.int64)
+    store.index.add_with_ids(vectors, faiss_ids)
+    store.next_id += len(ids)
+    store.docstore.add({doc_id: Document(page_content=t, metadata=m) for doc_id, t, m in zip(ids, texts, metadatas)})
+    store.index_to_docstore_id.update(zip(faiss_ids.tolist(), ids))
+    store.docstore_to_index_id.update(zip(ids, faiss_ids.tolist()))
+    store.keyword_index.add(ids, texts)
+    store.metadata_index.add(faiss_ids.tolist(), metadatas)
+    if store.dedup is not None:
+        # Ingestion signs the chunks it checks; the rest (e.g. replayed adds) are signed here.
+        for doc_id, text in zip(ids, texts):
+            if doc_id not in store.dedup:
+                store.dedup.add(doc_id, store.dedup.signature(text))
+    return faiss_ids.tolist()
+
+
+def remove_from_store(store: FAISS, ids: List[str]) -> int:
+    """Remove chunks by docstore id under ``index_lock``.
+
+    Returns:
+        The number of vectors removed
+    """
+    with index_lock.write():
+        removed = _remove(store, ids)
+        if removed:
+            store.delta.append({"op": "remove", "ids": list(ids)})
+        return removed
+
+
+def _remove(store: FAISS, ids: List[str]) -> int:
+    faiss_ids = [store.docstore_to_index_id[doc_id] for doc_id in set(ids) if doc_id in store.docstore_to_index_id]
+    if not faiss_ids:
+        return 0
+    ensure_writable(store)
+    try:
+        store.index.remove_ids(np.asarray(faiss_ids, dtype=np.int64))
+    except RuntimeError:
+        # HNSW graphs cannot drop nodes: hide the vectors from searches, and
+        # rebuild from the survivors only once enough of the index is dead.
+        tombstones = store.tombstones | set(faiss_ids)
+        if len(tombstones) > FAISS_TOMBSTONE_RATIO * store.index.ntotal:
+            _rebuild_without(store, tombstones)
+            tombstones = set()
+        _set_tombstones(store, tombstones)
+    store.metadata_index.remove(
+        faiss_ids, [store.docstore._dict[store.index_to_docstore_id[i]].metadata for i in faiss_ids]
+    )
+    for i in faiss_ids:
+        del store.docstore_to_index_id[store.index_to_docstore_id.pop(i)]
+    store.docstore.delete([doc_id for doc_id in ids if doc_id in store.docstore._dict])
+    store.keyword_index.remove(ids)
+    if store.dedup is not None:
+        store.dedup.remove(ids)
+    return len(faiss_ids)
+
+
+def _rebuild_without(store: FAISS, removed: set):
+    """Rebuild the index keeping every vector whose FAISS id is not in ``removed``."""
+    keep = np.asarray([i for i in store.index_to_docstore_id if i not in removed], dtype=np.int64)
+    index = create_index(store.index.d, index_type_of(store.index), n_hint=len(keep))
+    if len(keep):
+        vectors = store.index.reconstruct_batch(keep)
+        train_index(index, vectors)
+        index.add_with_ids(vectors, keep)
+    store.index = index
+
+
+def _set_tombstones(store: FAISS, tombstones: Iterable[int]):
+    """Record the FAISS ids still in the index but removed, and the selector that excludes them from searches."""
+    store.tombstones = set(tombstones)
+    if store.tombstones:
+        removed = faiss.IDSelectorBatch(np.asarray(sorted(store.tombstones), dtype=np.int64))
+        # The wrapped selector must outlive the one referencing it.
+        store.live_selector = (faiss.IDSelectorNot(removed), removed)
+    else:
+        store.live_selector = None
+
+
+def _selector_params(index: faiss.Index, sel: faiss.IDSelector):
+    """Search parameters restricting ``index`` to the FAISS ids accepted by ``sel``, keeping its search knobs."""
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=inner.nprobe)
+    elif isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=inner.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    return params
+
+
+def search_ids(store: FAISS, embedding: List[float], k: int, selected: Optional[np.ndarray] = None) -> List[str]:
+    """Docstore ids of the ``k`` nearest chunks, optionally restricted to the FAISS ids in ``selected``.
+
+    Callers hold ``index_lock`` for reading. A small slice of a flat or HNSW
+    index is searched exactly over its own vectors, so its cost depends on the
+    slice rather than the whole store.
+    """
+    query = np.asarray([embedding], dtype=np.float32)
+    if selected is None and store.live_selector is not None:
+        # Skip removed vectors still in an HNSW graph; ``selected`` slices never contain them.
+        _, faiss_ids = store.index.search(query, k, params=_selector_params(store.index, store.live_selector[0]))
+        found = faiss_ids[0]
+    elif selected is None:
+        _, faiss_ids = store.index.search(query, k)
+        found = faiss_ids[0]
+    elif not len(selected):
+        return []
+    elif len(selected) <= FILTER_BRUTE_FORCE_MAX and isinstance(
+        base_index(store.index), (faiss.IndexFlat, faiss.IndexHNSWFlat)
+    ):
+        vectors = store.index.reconstruct_batch(selected)
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        found = selected[np.argsort(distances)[:k]]
+    else:
+        sel = faiss.IDSelectorBatch(selected)
+        _, faiss_ids = store.index.search(query, k, params=_selector_params(store.index, sel))
+        found = faiss_ids[0]
+    return [store.index_to_docstore_id[i] for i in found.tolist() if i != -1]
+
+
+def stored_vectors(store: FAISS, ids: List[str]) -> Optional[np.ndarray]:
+    """The indexed vectors of the chunks with docstore ``ids``, or None if the index cannot return them.
+
+    Flat and HNSW indexes keep every vector and look it up by id. IVF lists
+    cannot be read by id, and PQ keeps only codes, so for those (and for ids
+    no longer indexed) callers embed the texts instead. Callers hold
+    ``index_lock`` for reading.
+    """
+    if index_type_of(store.index) not in ("flat", "hnsw"):
+        return None
+    faiss_ids = [store.docstore_to_index_id.get(doc_id) for doc_id in ids]
+    if None in faiss_ids:
+        return None
+    return store.index.reconstruct_batch(np.asarray(faiss_ids, dtype=np.int64))
+
+
+def persist(store: FAISS, index_dir: str = VECTOR_STORE_DIR):
+    """Save ``store``'s changes without racing concurrent writers."""
+    with index_lock.write():
+        save_changes(store, index_dir)
+
+
+def _new_vector_store() -> FAISS:
+    """Create an empty in-RAM vector store."""
+    index = create_index(embedding_dimension())
+    store = FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    store.docstore_to_index_id = {}
+    store.is_mapped = False
+    store.next_id = 0
+    store.generation = 0
+    store.delta = []
+    store.delta_chunks = 0
+    _set_tombstones(store, ())
+    store.keyword_index = BM25Index()
+    store.metadata_index = MetadataIndex()
+    store.dedup = NearDuplicateFilter() if DEDUP_ENABLED else None
+    return store
+
+
+vector_store = load_vector_store() or _new_vector_store()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+from langchain_community.document_loaders import WebBaseLoader
+from langchain_community.document_loaders.notiondb import NotionDBLoader
+from langchain_community.document_loaders.telegram import TelegramChatApiLoader
+from langchain_core.documents import Document
+
+from loaders.loaders import LOCAL_LOADERS
+
+logger = logging.getLogger("LoaderEngine")
+
+# Worker processes for CPU-bound parsing (PDF, CSV, JSON).
+LOADER_PROCESSES = int(os.getenv("LOADER_PROCESSES", str(os.cpu_count() or 1)))
+# Concurrent network loads (web pages, Notion databases, Telegram chats).
+LOADER_IO_CONCURRENCY = int(os.getenv("LOADER_IO_CONCURRENCY", "8"))
+# Loaded documents buffered ahead of a slow consumer.
+LOADER_QUEUE_SIZE = int(os.getenv("LOADER_QUEUE_SIZE", "256"))
+# Plain text is streamed as documents of about this many characters.
+TEXT_BLOCK_CHARS = int(os.getenv("TEXT_BLOCK_CHARS", str(1024 * 1024)))
+
+PROCESS_TYPES = {"pdf", "csv", "json"}
+IO_TYPES = {"web", "notion", "telegram"}
+
+EXTENSION_TYPES = {
+    ".pdf": "pdf",
+    ".csv": "csv",
+    ".json": "json",
+}
+
+# A source is a path or URL, or a dict with "source", an optional "type" and loader arguments.
+Source = Union[str, Dict[str, str]]
+
+
+def detect_file_type(source: str) -> str:
+    """File type of a path or URL: by scheme, then extension, then the PDF magic bytes; defaults to text."""
+    if source.startswith(("http://", "https://")):
+        return "web"
+    file_type = EXTENSION_TYPES.get(os.path.splitext(source)[1].lower())
+    if file_type:
+        return file_type
+    try:
+        with open(source, "rb") as f:
+            if f.read(5) == b"%PDF-":
+                return "pdf"
+    except OSError:
+        pass
+    return "text"
+
+
+def load_file(file_path: str, file_type: Optional[str] = None) -> List[Document]:
+    """Load a local file synchronously with the loader for its type."""
+    return LOCAL_LOADERS[file_type or detect_file_type(file_path)](file_path)
+
+
+def iter_text_blocks(file_path: str, block_chars: int = TEXT_BLOCK_CHARS) -> Iterator[Document]:
+    """Read a text file lazily as Documents of about ``block_chars`` characters.
+
+    Blocks end at a paragraph break, or failing that a line break, so the
+    splitter sees the same boundaries it would in the whole file.
+    """
+    carry = ""
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        while block := f.read(block_chars):
+            text = carry + block
+            cut = text.rfind("\n\n")
+            if cut <= 0:
+                cut = text.rfind("\n")
+            if cut <= 0:
+                if len(text) < 4 * block_chars:
+                    carry = text
+                    continue
+                # No line breaks at all: cut anyway rather than buffer the whole file.
+                cut = len(text)
+            carry = text[cut:]
+            if text[:cut].strip():
+                yield Document(page_content=text[:cut], metadata={"source": file_path})
+    if carry.strip():
+        yield Document(page_content=carry, metadata={"source": file_path})
+
+
+def directory_sources(directory: str) -> Iterator[str]:
+    """Paths of all non-hidden files under ``directory``, lazily."""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def _io_loader(spec: Dict[str, str], file_type: str):
+    if file_type == "web":
+        return WebBaseLoader(spec["source"])
+    if file_type == "notion":
+        return NotionDBLoader(integration_token=spec["token"], database_id=spec["source"])
+    return TelegramChatApiLoader(
+        chat_entity=spec["source"], api_id=spec["api_id"], api_hash=spec["api_hash"], username=spec["username"]
+    )
+
+
+class _Failure:
+    def __init__(self, source: str, error: Exception):
+        self.source = source
+        self.error = error
+
+
+class LoaderEngine:
+    """Loads many sources concurrently and yields their Documents as one stream.
+
+    CPU-bound parsers run in a process pool so a bulk load scales with cores;
+    network loaders run on the event loop under a concurrency limit; plain text
+    is read incrementally in a thread, so a huge file is never held whole.
+    """
+
+    def __init__(self, processes: int = LOADER_PROCESSES, io_concurrency: int = LOADER_IO_CONCURRENCY):
+        """Initialize the engine.
+
+        Args:
+            processes: Worker processes for PDF, CSV and JSON parsing
+            io_concurrency: Maximum concurrent network loads
+        """
+        self.processes = processes
+        self.io_concurrency = io_concurrency
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._io_slots: Optional[asyncio.Semaphore] = None
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Not fork: the server process holds threads and locks (search pool, index lock,
+            # SQLite cache) that a forked child could inherit in a locked state. Workers fork
+            # from a clean forkserver that has imported only the loaders; where there is no
+            # forkserver (Windows) they are spawned. Either way they re-import the launching
+            # script, which is why main.py defers building the server to server.py.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["loaders.loaders"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(self.processes, mp_context=context)
+        return self._pool
+
+    async def _load(self, spec: Dict[str, str]) -> AsyncIterator[Document]:
+        source = spec["source"]
+        file_type = spec.get("type") or detect_file_type(source)
+        if file_type in PROCESS_TYPES:
+            loop = asyncio.get_running_loop()
+            for doc in await loop.run_in_executor(self._process_pool(), load_file, source, file_type):
+                yield doc
+        elif file_type in IO_TYPES:
+            if self._io_slots is None:
+                self._io_slots = asyncio.Semaphore(self.io_concurrency)
+            async with self._io_slots:
+                async for doc in _io_loader(spec, file_type).alazy_load():
+                    yield doc
+        elif file_type == "text":
+            blocks = iter_text_blocks(source)
+            try:
+                while (doc := await asyncio.to_thread(next, blocks, None)) is not None:
+                    yield doc
+            finally:
+                blocks.close()
+        elif file_type in LOCAL_LOADERS:
+            for doc in await asyncio.to_thread(load_file, source, file_type):
+                yield doc
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+
+    async def stream(self, sources: Iterable[Source], skip_errors: bool = False) -> AsyncIterator[Document]:
+        """Yield the Documents of all ``sources`` in completion order.
+
+        Sources are pulled lazily, with enough in flight to keep the process
+        pool and the network slots busy. A full output queue pauses loading.
+
+        Args:
+            sources: Paths, URLs or source dicts
+            skip_errors: Log and skip sources that fail to load instead of raising
+        """
+        queue: asyncio.Queue = asyncio.Queue(LOADER_QUEUE_SIZE)
+        slots = asyncio.Semaphore(2 * self.processes + self.io_concurrency)
+        finished = object()
+
+        async def load_one(spec: Dict[str, str]):
+            try:
+                async for doc in self._load(spec):
+                    await queue.put(doc)
+            except Exception as e:
+                if not skip_errors:
+                    await queue.put(_Failure(spec["source"], e))
+                logger.error(f"Failed to load {spec['source']}: {e}")
+            finally:
+                slots.release()
+
+        async def feed():
+            tasks = set()
+            try:
+                for source in sources:
+                    await slots.acquire()
+                    task = asyncio.create_task(load_one(source if isinstance(source, dict) else {"source": source}))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.wait(list(tasks))
+                await queue.put(finished)
+            except Exception as e:
+                await queue.put(_Failure("<sources>", e))
+            finally:
+                for task in list(tasks):
+                    task.cancel()
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while (item := await queue.get()) is not finished:
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            feeder.cancel()
+
+    async def load(self, source: Source) -> List[Document]:
+        """Load one source completely."""
+        return [doc async for doc in self.stream([source])]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+loader_engine = LoaderEngine()
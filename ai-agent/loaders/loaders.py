@@ -9,25 +9,21 @@ from langchain_community.document_loaders.json_loader import JSONLoader
 from langchain_community.document_loaders.text import TextLoader
 from langchain_community.document_loaders.telegram import  TelegramChatApiLoader
 # from langchain_community.document_loaders.markdown import MarkdownLoader
-from langchain_community.document_loaders.notion import NotionDirectoryLoader
+from langchain_community.document_loaders.notiondb import NotionDBLoader
 import asyncio
 
-TeleLoader=TelegramChatApiLoader()
-
 async def telegram_loader(chat_entity: str, api_id: int, api_hash: str, username: str):
     """Load Telegram chat data and return its content."""
-    TeleLoader.chat_entity = chat_entity
-    TeleLoader.api_id = api_id
-    TeleLoader.api_hash = api_hash
-    TeleLoader.username = username
-    documents = await TeleLoader.load()
+    # One loader per call: concurrent chats must not share credentials on a module-level instance.
+    loader = TelegramChatApiLoader(chat_entity=chat_entity, api_id=api_id, api_hash=api_hash, username=username)
+    documents = await asyncio.to_thread(loader.load)
     return documents
 
 
 async def notion_loader(token:str, database_id:str):
     """Load Notion database and return its content."""
-    loader = NotionDirectoryLoader(token, database_id)
-    documents = await loader.load()
+    loader = NotionDBLoader(integration_token=token, database_id=database_id)
+    documents = await asyncio.to_thread(loader.load)
     return documents
 
 
@@ -40,19 +36,19 @@ def pdf_loader(file_path: str):
 
 async def webloader(url:str):
     loader = WebBaseLoader(url)
-    documents = await loader.load()
+    documents = [doc async for doc in loader.alazy_load()]
     return documents
 
-async def  csv_loader(file_path: str):
+def csv_loader(file_path: str):
     """Load a CSV file and return its content."""
     loader = CSVLoader(file_path)
-    documents = await loader.load()
+    documents = loader.load()
     return documents
-    
-async def json_loader(file_path: str):
+
+def json_loader(file_path: str):
     """Load a JSON file and return its content."""
-    loader = JSONLoader(file_path)
-    documents = await loader.load()
+    loader = JSONLoader(file_path, jq_schema=".", text_content=False)
+    documents = loader.load()
     return documents
 
 def text_loader(file_path: str)->List[Document]:
@@ -61,17 +57,20 @@ def text_loader(file_path: str)->List[Document]:
     documents = loader.load()
     return documents
 
+# Synchronous loaders for local files, by file type.
+LOCAL_LOADERS = {
+    "pdf": pdf_loader,
+    "csv": csv_loader,
+    "json": json_loader,
+    "text": text_loader,
+}
+
 async def load_documents(file_path: str, file_type: str):
     """Load documents from a file based on its type."""
-    if file_type == "pdf":
-        return await pdf_loader(file_path)
-    elif file_type == "web":
+    if file_type == "web":
         return await webloader(file_path)
-    elif file_type == "csv":
-        return await csv_loader(file_path)
-    elif file_type == "json":
-        return await json_loader(file_path)
-    elif file_type == "text":
-        return await text_loader(file_path)
+    elif file_type in LOCAL_LOADERS:
+        # The local loaders block on disk and parsing; keep them off the event loop.
+        return await asyncio.to_thread(LOCAL_LOADERS[file_type], file_path)
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
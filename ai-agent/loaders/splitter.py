@@ -0,0 +1,108 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List
+
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+
+from utils.tokens import TOKEN_ENCODING, count_tokens, token_windows
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "100"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "20"))
+# tiktoken releases the GIL while encoding, so documents split in parallel on threads.
+SPLITTER_THREADS = int(os.getenv("SPLITTER_THREADS", str(min(8, os.cpu_count() or 1))))
+
+# Paragraph breaks, line breaks and sentence ends, found in one scan. The
+# whitespace of each match stays with the segment before it.
+_BOUNDARY = re.compile(r"\n\s*\n\s*|\n\s*|(?<=[.!?;])\s+")
+
+_executor = None
+
+
+def _split_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SPLITTER_THREADS, thread_name_prefix="splitter")
+    return _executor
+
+
+def segments(text: str) -> List[str]:
+    """Split ``text`` after every paragraph, line and sentence boundary; the pieces concatenate back to ``text``."""
+    pieces = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        pieces.append(text[start : match.end()])
+        start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+class BoundaryTokenSplitter(TextSplitter):
+    """Packs whole sentences and paragraphs into chunks of at most ``chunk_size`` tokens.
+
+    Boundaries come from a single regex scan and every segment is tokenized
+    once, so packing is a walk over per-segment token counts instead of the
+    recursive separator search of RecursiveCharacterTextSplitter. Chunk
+    sizes match what the model is billed for. A segment longer than a
+    chunk is cut at token boundaries.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_TOKENS,
+        chunk_overlap: int = CHUNK_OVERLAP_TOKENS,
+        encoding: str = TOKEN_ENCODING,
+        **kwargs: Any,
+    ):
+        """Initialize the splitter.
+
+        Args:
+            chunk_size: Maximum tokens per chunk
+            chunk_overlap: Tokens of trailing context repeated at the start of the next chunk
+            encoding: tiktoken encoding used to count tokens
+        """
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap, **kwargs)
+        self.encoding = encoding
+
+    def split_text(self, text: str) -> List[str]:
+        pieces = segments(text)
+        counts = [count_tokens(piece, self.encoding) for piece in pieces]
+        size, overlap = self._chunk_size, self._chunk_overlap
+
+        chunks = []
+        start = 0
+        while start < len(pieces):
+            if counts[start] > size:
+                chunks.extend(token_windows(pieces[start], size, overlap, self.encoding))
+                start += 1
+                continue
+            end, total = start, 0
+            while end < len(pieces) and total + counts[end] <= size:
+                total += counts[end]
+                end += 1
+            chunks.append("".join(pieces[start:end]))
+            if end == len(pieces):
+                break
+            # Step back over whole trailing segments worth at most ``overlap`` tokens,
+            # leaving room for the next chunk to take at least one new segment.
+            next_start, carried = end, 0
+            limit = min(overlap, size - counts[end])
+            while next_start - 1 > start and carried + counts[next_start - 1] <= limit:
+                next_start -= 1
+                carried += counts[next_start]
+            start = next_start
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Split documents in parallel, keeping their order and metadata."""
+        documents = list(documents)
+        if len(documents) < 2 or self._add_start_index:
+            return super().split_documents(documents)
+        results = _split_executor().map(self.split_text, [doc.page_content for doc in documents])
+        return [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc, chunks in zip(documents, results)
+            for chunk in chunks
+        ]
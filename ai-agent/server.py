@@ -0,0 +1,247 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from langchain_core.messages import HumanMessage
+from fastapi import FastAPI, UploadFile, File, Request, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from langchain.memory import ConversationBufferMemory
+from langchain_core.vectorstores import InMemoryVectorStore
+from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
+import os
+import uuid
+from db.vectorstore import vector_store, embedding_model
+from db.response_cache import response_cache
+from db.ingest import create_job, get_job, run_ingestion, refresh_directory
+from rich.console import Console
+
+
+from rich.markdown import Markdown
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from loaders.loaders import text_loader
+from agent.multi_agent import MultiAgentSystem
+from agent.web_tools import WebTools
+import asyncio
+from agent.single_coding_agent import SingleCodingAgent
+from agent.rag import answer_question, astream_answer
+from agent.tool_registry import tool_registry
+from contextlib import aclosing
+from utils.scheduler import embedding_scheduler, llm_scheduler
+from utils.singleflight import flight_stats
+import json
+
+app = FastAPI()
+console = Console()
+
+# Initialize the multi-agent system
+multi_agent = MultiAgentSystem()
+web_tools = WebTools()
+
+class QueryRequest(BaseModel):
+    query: str
+    agent_type: str = "coding"
+
+class ApiDocsRequest(BaseModel):
+    query: str
+    api_url: str
+
+class ExtractCodeRequest(BaseModel):
+    url: str
+
+class RagRequest(BaseModel):
+    question: str
+    retrieval_mode: Optional[str] = None  # "dense", "bm25" or "hybrid"; defaults to RAG_RETRIEVAL_MODE
+    filter: Optional[Dict[str, Any]] = None  # e.g. {"tenant": "acme"} or {"source": ["a.pdf", "b.pdf"]}
+    
+miniagent=SingleCodingAgent()
+
+print("user agent", os.getenv("USER_AGENT"))
+
+@app.get("/")
+async def root():
+    return {"message": "Server is working fine"}
+
+
+UPLOAD_DIR = "uploaded_files"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+@app.post("/upload")
+async def upload_file(request: Request, background_tasks: BackgroundTasks):
+    # Multipart parsing spools file parts to temporary files, so nothing here holds a whole upload in memory.
+    form = await request.form()
+    files = []
+    metadata = {}
+    for key, value in form.items():
+        print(f"Field: {key}, Type: {type(value)}")
+
+        # Check if it's a file
+        if hasattr(value, "read") and hasattr(value, "filename"):
+            print("✔️ Detected file field.")
+            files.append(value)
+        else:
+            print(f"📝 Not a file field: {key} = {value}")
+            metadata[key] = value
+
+    uploaded = []
+    for value in files:
+        # Copy to disk in fixed-size chunks; blocking writes run off the event loop.
+        save_path = os.path.join(UPLOAD_DIR, os.path.basename(value.filename))
+        with open(save_path, "wb") as f:
+            while chunk := await value.read(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+        await value.close()
+        print(f"📁 File saved to {save_path}")
+
+        # Index in the background; the client polls /upload/{job_id} for progress.
+        job = create_job(save_path, metadata)
+        background_tasks.add_task(run_ingestion, job)
+        uploaded.append({"filename": value.filename, "job_id": job.id})
+
+    return {"message": "File(s) uploaded and queued for indexing", "jobs": uploaded}
+
+@app.get("/upload/{job_id}")
+async def upload_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        return {"error": f"Unknown job id: {job_id}"}
+    return job.to_dict()
+
+@app.post("/reindex")
+async def reindex(background_tasks: BackgroundTasks):
+    # Only new or changed chunks are embedded; chunks of edited or deleted files are removed.
+    background_tasks.add_task(refresh_directory, UPLOAD_DIR)
+    return {"message": f"Refreshing the index from {UPLOAD_DIR}"}
+
+@app.get("/cache")
+async def cache_stats():
+    # Hits, misses and size of the LLM response cache and the embedding cache.
+    return {
+        "responses": response_cache.stats() if response_cache else None,
+        "embeddings": embedding_model.cache.stats(),
+    }
+
+@app.get("/scheduler")
+async def scheduler_stats():
+    # Queue depth per priority, calls in flight and wait times of the model call schedulers,
+    # and how many calls joined an identical one already in flight.
+    return {
+        "llm": llm_scheduler.stats(),
+        "embeddings": embedding_scheduler.stats(),
+        "coalesced": flight_stats(),
+        "agent_sessions": multi_agent.sessions.stats(),
+    }
+
+@app.get("/tools")
+async def tool_stats():
+    # Calls, errors and latency histogram of each registered agent tool.
+    return tool_registry.stats()
+
+@app.post("/query")
+async def process_query(request:Request):
+    try:
+        query =  request.query_params["query"]
+        agent_type = request.query_params.get("agent_type", "coding")
+        # Requests without a session start a fresh one; send the returned id to continue it.
+        session_id = request.query_params.get("session_id") or uuid.uuid4().hex
+        response = await multi_agent.route_request(
+            query,
+            agent_type,
+            session_id
+        )
+        return {
+            "response": response["response"],
+            "thought_process": response["thought_process"],
+            "session_id": session_id
+        }
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        return {"error": str(e)}
+
+@app.post("/search-api-docs")
+async def search_api_docs(request: ApiDocsRequest):
+    try:
+        result = await web_tools.search_api_docs(request.query, request.api_url)
+        md=Markdown(result)
+        console.print(md)
+
+        return {"result": result}
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        return {"error": str(e)}
+
+@app.post("/extract-code")
+async def extract_code(request: ExtractCodeRequest):
+    try:
+        result = await web_tools.extract_code_examples(request.url)
+        return {"result": result}
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        return {"error": str(e)}
+
+@app.post("/rag")
+async def rag_answer(request: RagRequest):
+    try:
+        # Fully async graph: the event loop keeps serving other requests during search and generation.
+        state = await answer_question(request.question, request.retrieval_mode, request.filter)
+        return {
+            "answer": state["answer"],
+            "sources": [doc.metadata for doc in state["context"]],
+            "cached": state.get("cache_hit", False)
+        }
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        return {"error": str(e)}
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/rag/stream")
+async def rag_stream(
+    request: Request,
+    question: str,
+    mode: Optional[str] = None,
+    tenant: Optional[str] = None,
+    source: Optional[str] = None,
+):
+    filter = {k: v for k, v in {"tenant": tenant, "source": source}.items() if v is not None}
+
+    async def events():
+        try:
+            # aclosing: breaking out closes the graph stream right away, cancelling the LLM call.
+            async with aclosing(astream_answer(question, mode, filter)) as stream:
+                async for event, data in stream:
+                    # Stop generating (and paying for tokens) once nobody is listening.
+                    if await request.is_disconnected():
+                        console.print("[yellow]Client disconnected, cancelling RAG stream[/yellow]")
+                        break
+                    yield sse_event(event, data)
+        except Exception as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/ask")
+async def askAgent(req: Request):
+    try:
+        question = "Build a blog layout with Header, PostCard, Footer components."
+        response = await miniagent.aask(question)  # response is a string
+        return {"response": response}
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        return {"error": str(e)}
+
+# Initialize vector store with uploaded documents
+@app.on_event("startup")
+async def startup_event():
+    # The persisted index is memory-mapped by db.vectorstore; an unchanged main.txt is skipped after hashing.
+    print(f"Loaded vector store with {vector_store.index.ntotal} vectors")
+    job = await run_ingestion(create_job("./uploaded_files/main.txt"))
+    print(f"main.txt: {job.status}, {job.indexed_chunks} chunks embedded, {job.removed_chunks} removed")
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Modules read their settings at import: point the stores and caches at a
+# scratch directory and the models at the offline stand-ins before any test imports them.
+_state = tempfile.mkdtemp(prefix="ai-agent-tests-")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("EMBEDDING_DIM", "32")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "100000")
+os.environ.setdefault("VECTOR_STORE_DIR", os.path.join(_state, "vector_index"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(_state, "embedding_cache.sqlite3"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_state, "llm_cache.sqlite3"))
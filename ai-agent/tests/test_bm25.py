@@ -0,0 +1,135 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from db.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+WORDS = ["faiss", "index", "vector", "ERR_CONN_RESET", "os.path.join", "retry", "query", "token", "HTTP-429", "cache"]
+
+
+def brute_force(docs, query, k1, b):
+    """BM25 scores of every matching document, computed from scratch."""
+    tokenized = {doc_id: Counter(tokenize(text)) for doc_id, text in docs.items()}
+    n = len(docs)
+    avg_len = sum(sum(c.values()) for c in tokenized.values()) / n
+    scores = {}
+    for doc_id, counts in tokenized.items():
+        length = sum(counts.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf = counts.get(term, 0)
+            if not tf:
+                continue
+            df = sum(1 for c in tokenized.values() if term in c)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        if score > 0:
+            scores[doc_id] = score
+    return scores
+
+
+def assert_matches(index, docs, query):
+    got = dict(index.search(query, k=len(docs) + 1))
+    expected = brute_force(docs, query, index.k1, index.b)
+    assert got.keys() == expected.keys()
+    for doc_id, score in expected.items():
+        assert got[doc_id] == pytest.approx(score, rel=1e-4)
+
+
+def random_docs(rng, n, start=0):
+    return {f"doc-{i}": " ".join(rng.choices(WORDS, k=rng.randint(1, 12))) for i in range(start, start + n)}
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("Call os.path.join on HTTP-429") == ["call", "os.path.join", "os", "path", "join", "on", "http-429", "http", "429"]
+
+
+def test_add_matches_brute_force():
+    rng = random.Random(0)
+    docs = random_docs(rng, 40)
+    index = BM25Index()
+    ids = list(docs)
+    # Several batches make several segments.
+    for i in range(0, len(ids), 7):
+        index.add(ids[i : i + 7], [docs[d] for d in ids[i : i + 7]])
+    assert len(index.segments) > 1
+    for query in ["faiss index", "ERR_CONN_RESET retry", "path", "http-429 cache token", "missing"]:
+        assert_matches(index, docs, query)
+
+
+def test_removed_documents_are_not_found_and_leave_idf_exact():
+    rng = random.Random(1)
+    docs = random_docs(rng, 30)
+    index = BM25Index()
+    index.add(list(docs), list(docs.values()))
+    removed = rng.sample(list(docs), 10)
+    index.remove(removed)
+    for doc_id in removed:
+        del docs[doc_id]
+    assert index.num_docs == len(docs)
+    for query in ["faiss index", "vector query", "os.path.join"]:
+        got = dict(index.search(query, k=100))
+        assert not set(got) & set(removed)
+        assert_matches(index, docs, query)
+
+
+def test_readding_an_id_replaces_its_text():
+    index = BM25Index()
+    index.add(["a", "b"], ["faiss index", "vector cache"])
+    index.add(["a"], ["retry token"])
+    assert index.num_docs == 2
+    assert_matches(index, {"a": "retry token", "b": "vector cache"}, "faiss retry")
+
+
+def test_compaction_keeps_scores_and_renumbers():
+    rng = random.Random(2)
+    docs = random_docs(rng, 25)
+    index = BM25Index()
+    ids = list(docs)
+    for i in range(0, len(ids), 5):
+        index.add(ids[i : i + 5], [docs[d] for d in ids[i : i + 5]])
+    index.remove(ids[::3])
+    for doc_id in ids[::3]:
+        del docs[doc_id]
+    index.compact()
+    assert len(index.segments) == 1
+    assert index.doc_ids == list(docs)
+    assert index.alive.all()
+    more = random_docs(rng, 5, start=100)
+    index.add(list(more), list(more.values()))
+    docs.update(more)
+    for query in ["faiss index", "token cache retry", "join"]:
+        assert_matches(index, docs, query)
+
+
+def test_allowed_mask_restricts_results():
+    index = BM25Index()
+    index.add(["a", "b", "c"], ["faiss", "faiss index", "index"])
+    results = index.search("faiss", k=10, allowed=index.mask(["b", "c"]))
+    assert [doc_id for doc_id, _ in results] == ["b"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = random.Random(3)
+    docs = random_docs(rng, 20)
+    index = BM25Index()
+    index.add(list(docs), list(docs.values()))
+    index.remove(["doc-0", "doc-5"])
+    del docs["doc-0"], docs["doc-5"]
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.doc_ids == list(docs)
+    assert_matches(loaded, docs, "faiss vector retry")
+    assert BM25Index.load(str(tmp_path / "missing.npz")) is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused] in (["a", "b", "c"], ["b", "a", "c"])
+    assert dict(fused)["c"] == pytest.approx(1 / 63)
+    assert dict(fused)["a"] == pytest.approx(1 / 61 + 1 / 62)
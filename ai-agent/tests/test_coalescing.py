@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from agent.base_agent import agent_flights, coalesce_requests
+from agent.memory import BoundedSummaryMemory, ConversationState, session
+
+
+class EchoAgent:
+    name = "Echo Agent"
+    runs = 0
+
+    def __init__(self):
+        self.memory = BoundedSummaryMemory(namespace=self.name, state=ConversationState())
+
+    @coalesce_requests
+    async def process_request(self, user_input: str):
+        EchoAgent.runs += 1
+        await asyncio.sleep(0.05)
+        await self.memory.asave_context({"input": user_input}, {"output": user_input.upper()})
+        return {"response": user_input.upper(), "thought_process": []}
+
+
+async def ask(agent, session_id, text):
+    with session(session_id):
+        return await agent.process_request(text)
+
+
+def test_first_turns_of_different_sessions_share_one_run():
+    EchoAgent.runs = 0
+    a, b = EchoAgent(), EchoAgent()
+    shared_before = agent_flights.shared
+
+    async def main():
+        return await asyncio.gather(ask(a, "s1", "hello  world"), ask(b, "s2", "hello world"))
+
+    first, second = asyncio.run(main())
+    assert first == second == {"response": "HELLO  WORLD", "thought_process": []}
+    assert EchoAgent.runs == 1
+    assert agent_flights.shared == shared_before + 1
+    # Both sessions remember the exchange, not only the one whose run served it.
+    assert len(a.memory.state.turns) == len(b.memory.state.turns) == 2
+
+
+def test_later_turns_only_coalesce_within_a_session():
+    EchoAgent.runs = 0
+    a, b = EchoAgent(), EchoAgent()
+    for agent in (a, b):
+        agent.memory.state.add("hi", "HI", agent.memory.max_tokens)
+
+    async def main():
+        return await asyncio.gather(ask(a, "s1", "again"), ask(b, "s2", "again"))
+
+    asyncio.run(main())
+    assert EchoAgent.runs == 2
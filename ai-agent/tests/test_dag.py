@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from agent.dag import Step, run_dag
+
+
+def returns(value, delay=0.0):
+    async def run(deps):
+        await asyncio.sleep(delay)
+        return value
+    return run
+
+
+async def fail(deps):
+    raise RuntimeError("boom")
+
+
+def test_values_flow_to_dependents():
+    async def total(deps):
+        return deps["a"] + deps["b"]
+
+    results = asyncio.run(run_dag([Step("sum", total, deps=("a", "b")), Step("a", returns(1)), Step("b", returns(2))]))
+    assert list(results) == ["a", "b", "sum"]
+    assert results["sum"].ok and results["sum"].value == 3
+
+
+def test_independent_steps_run_concurrently():
+    start = time.perf_counter()
+    results = asyncio.run(run_dag([Step(f"s{i}", returns(i, 0.1)) for i in range(5)]))
+    assert time.perf_counter() - start < 0.3
+    assert all(result.ok for result in results.values())
+
+
+def test_timeout_skips_dependents_only():
+    steps = [
+        Step("slow", returns("late", 1.0), timeout=0.05),
+        Step("after-slow", returns("never"), deps=("slow",)),
+        Step("chained", returns("never"), deps=("after-slow",)),
+        Step("other", returns("ok", 0.01)),
+    ]
+    start = time.perf_counter()
+    results = asyncio.run(run_dag(steps))
+    assert time.perf_counter() - start < 0.5
+    assert results["slow"].status == "timeout"
+    assert results["slow"].error == "timed out after 0.05s"
+    assert results["after-slow"].status == "skipped"
+    assert results["after-slow"].error == "slow did not complete"
+    assert results["chained"].status == "skipped"
+    assert results["other"].ok
+
+
+def test_failure_skips_dependents():
+    results = asyncio.run(run_dag([Step("a", fail), Step("b", returns(1)), Step("c", returns(2), deps=("a", "b"))]))
+    assert results["a"].status == "failed" and results["a"].error == "boom"
+    assert results["b"].ok
+    assert results["c"].status == "skipped"
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        [Step("a", returns(1)), Step("a", returns(2))],
+        [Step("a", returns(1), deps=("missing",))],
+        [Step("a", returns(1), deps=("b",)), Step("b", returns(2), deps=("a",))],
+    ],
+)
+def test_invalid_graphs_are_rejected(steps):
+    with pytest.raises(ValueError):
+        asyncio.run(run_dag(steps))
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from db.dedup import NearDuplicateFilter, _bands_for
+
+
+def words(seed, n=200):
+    rng = random.Random(seed)
+    return [f"w{rng.randrange(5000)}" for _ in range(n)]
+
+
+def test_bands_split_the_signature():
+    for num_perm, threshold in [(64, 0.8), (128, 0.5), (60, 0.9)]:
+        bands, rows = _bands_for(num_perm, threshold)
+        assert bands * rows == num_perm
+
+
+def test_small_edits_are_near_duplicates():
+    dedup = NearDuplicateFilter()
+    text = words(0)
+    assert dedup.check("page-1", " ".join(text)) is None
+    edited = list(text)
+    edited[100] = "page 2"
+    assert dedup.check("page-2", " ".join(edited)) == "page-1"
+    assert dedup.check("copy", " ".join(text).upper()) == "page-1"
+
+
+def test_different_text_is_kept():
+    dedup = NearDuplicateFilter()
+    assert dedup.check("a", " ".join(words(0))) is None
+    assert dedup.check("b", " ".join(words(1))) is None
+    # Both were added, so each is now found.
+    assert dedup.find(dedup.signature(" ".join(words(1)))) == "b"
+
+
+def test_short_text_gets_a_signature():
+    dedup = NearDuplicateFilter()
+    assert dedup.check("a", "hello") is None
+    assert dedup.check("b", "Hello!") == "a"
+    assert dedup.check("c", "") is None
+
+
+def test_removed_chunks_no_longer_match():
+    dedup = NearDuplicateFilter()
+    text = " ".join(words(0))
+    dedup.check("a", text)
+    dedup.remove(["a", "missing"])
+    assert "a" not in dedup and len(dedup) == 0
+    assert dedup.check("b", text) is None
+
+
+def test_ignored_keys_are_not_duplicates():
+    dedup = NearDuplicateFilter()
+    text = " ".join(words(0))
+    dedup.check("old", text)
+    assert dedup.check("new", text, ignore=lambda key: key == "old") is None
+    assert dedup.check("copy", text) in ("old", "new")
+
+
+def test_signatures_survive_save_and_load(tmp_path):
+    path = str(tmp_path / "dedup.npz")
+    dedup = NearDuplicateFilter()
+    dedup.check("a", " ".join(words(0)))
+    dedup.check("b", " ".join(words(1)))
+    dedup.save(path)
+
+    loaded = NearDuplicateFilter.load(path)
+    assert len(loaded) == 2
+    assert loaded.check("c", " ".join(words(1))) == "b"
+    # Saved under other settings: the signatures do not apply.
+    assert NearDuplicateFilter.load(path, num_perm=32) is None
+    assert NearDuplicateFilter.load(str(tmp_path / "missing.npz")) is None
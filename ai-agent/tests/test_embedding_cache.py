@@ -0,0 +1,97 @@
+import itertools
+import sqlite3
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("tiktoken")
+pytest.importorskip("langchain_core")
+
+from langchain_core.embeddings import Embeddings
+
+import db.embedding_cache as embedding_cache
+from db.embedding_cache import CachedEmbeddings, EmbeddingCache
+from utils.scheduler import RateScheduler
+
+
+class CountingEmbeddings(Embeddings):
+    """Vectors derived from the text length, counting the texts embedded."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded += texts
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(embedding_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def cached(tmp_path, max_entries=100):
+    model = CountingEmbeddings()
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=max_entries)
+    return model, CachedEmbeddings(model, "test-model", cache=cache, scheduler=RateScheduler("test", 0, 0, 0))
+
+
+def test_only_misses_reach_the_model(tmp_path):
+    model, embeddings = cached(tmp_path)
+    assert embeddings.embed_documents(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert model.embedded == ["a", "bb"]
+
+    # Whitespace differences share an entry; queries are cached apart from documents.
+    assert embeddings.embed_documents([" bb ", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert model.embedded == ["a", "bb", "ccc"]
+    embeddings.embed_query("a")
+    assert model.embedded == ["a", "bb", "ccc", "a"]
+    assert embeddings.cache.stats() == {"hits": 1, "misses": 4}
+
+
+def test_entries_persist_across_instances(tmp_path):
+    _, embeddings = cached(tmp_path)
+    embeddings.embed_documents(["shared"])
+    model, reopened = cached(tmp_path)
+    assert reopened.embed_documents(["shared"]) == [[6.0, 1.0]]
+    assert model.embedded == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    for i in range(10):
+        cache.put_many({f"k{i}": [float(i)]})
+    # Reading k0 makes it recent, so k1 is now the oldest.
+    assert cache.get_many(["k0"]) == {"k0": [0.0]}
+    cache.put_many({"k10": [10.0], "k11": [11.0]})
+
+    # Over the limit: evicted down to 90% of it, oldest first.
+    left = cache.get_many([f"k{i}" for i in range(12)])
+    assert sorted(left) == sorted(["k0"] + [f"k{i}" for i in range(4, 12)])
+    assert cache._count == 9
+
+
+def test_a_failed_write_is_rolled_back(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many({"kept": [1.0]})
+    put_rows = cache._put_rows
+
+    def fail(rows):
+        put_rows(rows)
+        raise sqlite3.OperationalError("database or disk is full")
+
+    monkeypatch.setattr(cache, "_put_rows", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        cache.put_many({"lost": [2.0]})
+    assert cache._count == 1
+    assert cache.get_many(["kept", "lost"]) == {"kept": [1.0]}
+
+    # The connection is left usable.
+    monkeypatch.undo()
+    cache.put_many({"later": [3.0]})
+    assert cache._count == 2
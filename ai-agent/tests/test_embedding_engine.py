@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from db.embedding_engine import EmbeddingEngine, abatched, batched, is_rate_limited, is_transient
+
+
+class FlakyEmbeddings:
+    """Fails each batch's first ``failures`` calls with ``error``, tracking calls in flight."""
+
+    def __init__(self, failures=0, error=None, delay=0.01):
+        self.failures = failures
+        self.error = error
+        self.delay = delay
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def aembed_documents(self, texts):
+        key = tuple(texts)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.calls[key] <= self.failures:
+                raise self.error
+            return [[float(len(t))] for t in texts]
+        finally:
+            self.in_flight -= 1
+
+
+def collect(engine, batches):
+    async def run():
+        return [item async for item in engine.embed_batches(batches)]
+
+    return asyncio.run(run())
+
+
+def test_batches_split_in_order():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    async def numbers():
+        for i in range(5):
+            yield i
+
+    async def run():
+        return [batch async for batch in abatched(numbers(), 2)]
+
+    assert asyncio.run(run()) == [[0, 1], [2, 3], [4]]
+
+
+def test_errors_are_classified():
+    assert is_rate_limited(RuntimeError("429 Resource exhausted"))
+    assert is_transient(RuntimeError("503 Service Unavailable"))
+    assert is_transient(ConnectionError())
+    assert not is_transient(ValueError("invalid argument: empty text"))
+
+
+def test_batches_run_concurrently_up_to_the_limit():
+    model = FlakyEmbeddings()
+    engine = EmbeddingEngine(model, concurrency=3)
+    batches = [(i, [f"text {i}", "x" * i]) for i in range(10)]
+    results = dict(collect(engine, batches))
+    assert results == {i: [[float(len(f"text {i}"))], [float(i)]] for i in range(10)}
+    assert model.max_in_flight == 3
+
+
+def test_transient_errors_are_retried():
+    model = FlakyEmbeddings(failures=2, error=RuntimeError("429 quota exceeded"))
+    engine = EmbeddingEngine(model, concurrency=2, max_retries=3, backoff_base=0.01)
+    assert dict(collect(engine, [(0, ["a"]), (1, ["b"])])) == {0: [[1.0]], 1: [[1.0]]}
+    assert engine.retries == 4
+
+
+def test_permanent_errors_fail_the_run():
+    model = FlakyEmbeddings(failures=1, error=ValueError("invalid argument"))
+    engine = EmbeddingEngine(model, max_retries=3, backoff_base=0.01)
+    with pytest.raises(ValueError):
+        collect(engine, [(0, ["a"])])
+    assert engine.retries == 0
+
+    model = FlakyEmbeddings(failures=5, error=RuntimeError("503 unavailable"))
+    engine = EmbeddingEngine(model, max_retries=2, backoff_base=0.01)
+    with pytest.raises(RuntimeError):
+        collect(engine, [(0, ["a"])])
+    assert model.calls[("a",)] == 3
+
+
+def test_the_source_is_pulled_as_slots_free_up():
+    pulled = []
+
+    def source():
+        for i in range(20):
+            pulled.append(i)
+            yield i, [str(i)]
+
+    async def run():
+        engine = EmbeddingEngine(FlakyEmbeddings(), concurrency=2)
+        async for _ in engine.embed_batches(source()):
+            # Never more than the batches in flight plus the one waiting for a slot.
+            return len(pulled)
+
+    assert asyncio.run(run()) <= 3
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from loaders.engine import detect_file_type
+
+
+def test_urls_are_web():
+    assert detect_file_type("https://example.com/report.pdf") == "web"
+    assert detect_file_type("http://example.com") == "web"
+
+
+def test_extension_decides_case_insensitively():
+    assert detect_file_type("report.PDF") == "pdf"
+    assert detect_file_type("data.csv") == "csv"
+    assert detect_file_type("data.json") == "json"
+
+
+def test_extensionless_pdf_is_sniffed(tmp_path):
+    path = tmp_path / "upload"
+    path.write_bytes(b"%PDF-1.7\n...")
+    assert detect_file_type(str(path)) == "pdf"
+
+
+def test_everything_else_is_text(tmp_path):
+    path = tmp_path / "notes"
+    path.write_text("plain text")
+    assert detect_file_type(str(path)) == "text"
+    assert detect_file_type(str(tmp_path / "missing")) == "text"
@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+from db.index_factory import INDEX_TYPES, base_index, create_index, index_type_of, train_index
+
+DIM = 32
+
+
+def clustered(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, DIM)).astype(np.float32) * 5
+    return (centers[rng.integers(20, size=n)] + rng.normal(size=(n, DIM))).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_every_type_finds_near_neighbours(index_type):
+    vectors = clustered(2000)
+    index = create_index(DIM, index_type, n_hint=len(vectors), pq_m=8)
+    assert index_type_of(index) == index_type
+    train_index(index, vectors)
+    index.add_with_ids(vectors, np.arange(100, 100 + len(vectors), dtype=np.int64))
+
+    queries = vectors[:50] + 0.01
+    _, found = index.search(queries, 10)
+    # Caller-assigned ids, and the query's own vector among the nearest.
+    hits = [100 + i in row for i, row in enumerate(found.tolist())]
+    # PQ compares compressed codes, so it may rank a close neighbour above the vector itself.
+    assert sum(hits) / len(hits) >= (0.5 if index_type == "ivf_pq" else 0.9)
+
+
+def test_ivf_lists_are_sized_for_the_corpus():
+    assert base_index(create_index(DIM, "ivf_flat", n_hint=100)).nlist == 40
+    assert base_index(create_index(DIM, "ivf_flat", n_hint=10**9, nlist=1024)).nlist == 1024
+    # Never more lists than vectors to train them, and nprobe never exceeds the lists there are.
+    small = base_index(create_index(DIM, "ivf_flat", n_hint=4))
+    assert small.nlist == 4 and small.nprobe == 4
+    assert base_index(create_index(DIM, "ivf_flat", n_hint=12)).nlist == 12
+
+
+def test_pq_codebooks_fit_a_small_corpus():
+    index = base_index(create_index(DIM, "ivf_pq", n_hint=100, pq_m=8, pq_nbits=8))
+    assert index.pq.nbits == 6
+
+
+def test_bad_settings_are_rejected():
+    with pytest.raises(ValueError):
+        create_index(DIM, "ivf_pq", pq_m=7)
+    with pytest.raises(ValueError):
+        create_index(DIM, "lsh")
+
+
+def test_training_is_a_no_op_once_trained():
+    index = create_index(DIM, "flat")
+    assert index.is_trained
+    train_index(index, clustered(10))
+    ivf = create_index(DIM, "ivf_flat", n_hint=400)
+    train_index(ivf, clustered(400), sample_size=200)
+    assert ivf.is_trained
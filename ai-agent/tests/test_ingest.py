@@ -0,0 +1,175 @@
+import asyncio
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("tiktoken")
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain_google_genai")
+
+import db.ingest as ingest
+from db.index_factory import create_index, index_type_of
+from db.registry import DocumentRegistry, source_key
+from db.vectorstore import _new_vector_store, load_vector_store
+
+
+def paragraphs(seed, n):
+    rng = random.Random(seed)
+    return [" ".join(f"w{rng.randrange(100000)}" for _ in range(60)) + "." for _ in range(n)]
+
+
+def write(path, paras):
+    path.write_text("\n\n".join(paras), encoding="utf-8")
+
+
+def run(path, store):
+    return asyncio.run(ingest.run_ingestion(ingest.create_job(str(path)), store))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "VECTOR_STORE_DIR", str(tmp_path / "vector_index"))
+    monkeypatch.setattr(ingest, "registry", DocumentRegistry())
+    return _new_vector_store()
+
+
+def indexed_sources(store):
+    return {store.docstore._dict[doc_id].metadata["source"] for doc_id in store.docstore._dict}
+
+
+def test_reingesting_embeds_only_what_changed(tmp_path, store):
+    (tmp_path / "docs").mkdir()
+    a, b = tmp_path / "docs" / "a.txt", tmp_path / "docs" / "b.txt"
+    a_paras = paragraphs(0, 12)
+    write(a, a_paras)
+    write(b, paragraphs(1, 8))
+
+    first = run(a, store)
+    assert first.status == "done" and first.indexed_chunks > 0
+    assert run(b, store).status == "done"
+    a_chunks = set(ingest.registry.chunks(source_key(str(a))))
+    assert len(a_chunks) == first.indexed_chunks
+
+    # Unchanged: hashed and skipped.
+    again = run(a, store)
+    assert again.status == "unchanged" and again.indexed_chunks == 0
+
+    # Edited: only the new paragraph is embedded, the dropped one's chunks are removed.
+    write(a, a_paras[:-1] + paragraphs(2, 1))
+    edited = run(a, store)
+    assert edited.status == "done"
+    assert 0 < edited.indexed_chunks < first.indexed_chunks
+    assert edited.removed_chunks > 0
+    assert edited.unchanged_chunks > 0
+    new_chunks = set(ingest.registry.chunks(source_key(str(a))))
+    assert new_chunks != a_chunks
+    assert not (a_chunks - new_chunks) & store.docstore._dict.keys()
+
+    tracked = set(ingest.registry.chunks(source_key(str(a)))) | set(ingest.registry.chunks(source_key(str(b))))
+    assert store.docstore._dict.keys() == tracked
+    assert store.index.ntotal == len(tracked)
+
+
+def test_deleted_files_are_dropped_on_refresh(tmp_path, store):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    a, b = docs / "a.txt", docs / "b.txt"
+    write(a, paragraphs(3, 5))
+    write(b, paragraphs(4, 5))
+    jobs = asyncio.run(ingest.refresh_directory(str(docs), store))
+    assert [job.status for job in jobs] == ["done", "done"]
+    assert indexed_sources(store) == {str(a), str(b)}
+
+    b.unlink()
+    jobs = asyncio.run(ingest.refresh_directory(str(docs), store))
+    assert [job.status for job in jobs] == ["unchanged"]
+    assert indexed_sources(store) == {str(a)}
+    assert ingest.registry.chunks(source_key(str(b))) == []
+
+    # Checkpoints left the same state on disk.
+    loaded = load_vector_store(ingest.VECTOR_STORE_DIR)
+    assert loaded.docstore._dict.keys() == store.docstore._dict.keys()
+    assert DocumentRegistry.load(ingest.VECTOR_STORE_DIR).sources == ingest.registry.sources
+
+
+def test_near_duplicates_of_other_files_are_skipped(tmp_path, store):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    a, b, c = docs / "a.txt", docs / "b.txt", docs / "c.txt"
+    paras = paragraphs(5, 10)
+    write(a, paras)
+    first = run(a, store)
+    assert first.status == "done" and first.duplicate_chunks == 0
+
+    # A separately uploaded copy with one word changed adds (almost) nothing.
+    edited = list(paras)
+    edited[0] = edited[0].replace(edited[0].split()[3], "changed", 1)
+    write(b, edited)
+    second = run(b, store)
+    assert second.status == "done"
+    assert second.duplicate_chunks >= first.indexed_chunks - 1
+    assert second.indexed_chunks <= 1
+
+    # The signatures are saved with the store, so a restarted worker still finds them.
+    loaded = load_vector_store(ingest.VECTOR_STORE_DIR)
+    assert len(loaded.dedup) == len(loaded.docstore._dict)
+    write(c, paras)
+    third = run(c, loaded)
+    assert third.status == "done" and third.indexed_chunks == 0
+
+
+def test_jobs_report_progress_and_carry_upload_metadata(tmp_path, store):
+    path = tmp_path / "notes.txt"
+    write(path, paragraphs(6, 6))
+    job = ingest.create_job(str(path), {"tenant": "acme"})
+    assert ingest.get_job(job.id) is job and job.to_dict()["status"] == "queued"
+
+    asyncio.run(ingest.run_ingestion(job, store))
+    status = job.to_dict()
+    assert status["status"] == "done" and status["progress"] == 1.0
+    assert status["indexed_chunks"] == status["total_chunks"] > 0
+    assert status["finished_at"] >= status["created_at"]
+    assert {doc.metadata["tenant"] for doc in store.docstore._dict.values()} == {"acme"}
+
+
+def test_a_missing_file_fails_the_job(tmp_path, store):
+    job = run(tmp_path / "missing.txt", store)
+    assert job.status == "failed" and job.error and job.finished_at
+    assert store.index.ntotal == 0 and len(store.dedup) == 0
+
+
+def record_adds(monkeypatch):
+    sizes = []
+    add_to_store = ingest.add_to_store
+
+    def add(store, texts, *args, **kwargs):
+        sizes.append(len(texts))
+        return add_to_store(store, texts, *args, **kwargs)
+
+    monkeypatch.setattr(ingest, "add_to_store", add)
+    monkeypatch.setattr(ingest, "INGEST_BATCH_SIZE", 4)
+    return sizes
+
+
+def test_flat_indexes_take_batches_as_they_are_embedded(tmp_path, store, monkeypatch):
+    sizes = record_adds(monkeypatch)
+    path = tmp_path / "doc.txt"
+    write(path, paragraphs(7, 30))
+    job = run(path, store)
+    assert job.status == "done"
+    assert len(sizes) > 1 and max(sizes) <= 4 and sum(sizes) == job.indexed_chunks
+
+
+def test_ivf_indexes_train_on_a_sample_of_the_file(tmp_path, store, monkeypatch):
+    sizes = record_adds(monkeypatch)
+    store.index = create_index(store.index.d, "ivf_flat")
+    path = tmp_path / "doc.txt"
+    write(path, paragraphs(8, 30))
+    job = run(path, store)
+    assert job.status == "done"
+    # The first add trained the index on more than one batch.
+    assert sizes[0] > 4 and sum(sizes) == job.indexed_chunks
+    assert index_type_of(store.index) == "ivf_flat" and store.index.is_trained
+    assert store.index.ntotal == job.indexed_chunks
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_google_genai")
+
+from langchain_core.messages import HumanMessage
+
+import agent.llm as llm_module
+from agent.llm import get_llm
+from db.response_cache import response_cache
+from utils.scheduler import llm_scheduler
+
+
+def granted():
+    return sum(llm_scheduler.stats()["granted"].values())
+
+
+def test_clients_are_shared_per_configuration():
+    client = get_llm("gemini-1.5-flash", temperature=0.4, max_output_tokens=100)
+    assert get_llm("gemini-1.5-flash", temperature=0.4, max_output_tokens=100) is client
+    assert get_llm("gemini-1.5-flash", temperature=0.5, max_output_tokens=100) is not client
+    assert get_llm("gemini-1.5-flash", temperature=0.4) is not client
+    assert get_llm(temperature=0.4, top_k=3, top_p=0.9) is get_llm(temperature=0.4, top_p=0.9, top_k=3)
+    # The module-level client is built once, on first import.
+    assert llm_module.llm is get_llm(temperature=1, max_output_tokens=512)
+
+
+def test_only_deterministic_clients_get_the_response_cache():
+    assert get_llm(temperature=0).cache is (response_cache or False)
+    assert get_llm(temperature=0.6).cache is False
+    assert get_llm(temperature=0.6, cache=True).cache is (response_cache or False)
+
+
+def test_every_call_is_admitted_once():
+    client = get_llm(temperature=0.8, max_output_tokens=8)
+    before = granted()
+    client.invoke([HumanMessage(content="sync call")])
+    assert granted() == before + 1
+
+    async def run():
+        await client.ainvoke([HumanMessage(content="async call")])
+        return [chunk async for chunk in client.astream([HumanMessage(content="streamed call")])]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) > 1
+    assert granted() == before + 3
+    assert llm_scheduler.stats()["in_flight"] == 0
+
+
+def test_identical_concurrent_calls_share_one_request():
+    client = get_llm(temperature=0.9, max_output_tokens=8)
+    before = granted()
+
+    async def run():
+        return await asyncio.gather(*(client.ainvoke([HumanMessage(content="same question")]) for _ in range(5)))
+
+    answers = asyncio.run(run())
+    assert len({answer.content for answer in answers}) == 1
+    assert granted() - before < 5
@@ -0,0 +1,122 @@
+import asyncio
+import types
+from typing import Any
+
+import pytest
+
+pytest.importorskip("langchain")
+
+import agent.memory as memory
+from agent.memory import BoundedSummaryMemory, ConversationState, SessionMemoryStore, session
+from utils.tokens import count_tokens
+
+
+class Summarizer:
+    """Stands in for the summary model, recording the prompts it is given."""
+
+    def __init__(self, reply="the summary"):
+        self.reply = reply
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages[0].content)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return types.SimpleNamespace(content=self.reply)
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+class StubMemory(BoundedSummaryMemory):
+    summarizer: Any = None
+
+    def _summarizer(self):
+        return self.summarizer
+
+
+def exchange(i):
+    return {"input": f"question {i} " + "about faiss " * 5}, {"output": f"answer {i} " + "use an index " * 5}
+
+
+def test_window_stays_within_its_budget():
+    state = ConversationState()
+    for i in range(20):
+        state.add(*(f"turn {i} " + "word " * 10 for _ in range(2)), max_tokens=100)
+        assert state.tokens <= 100
+        assert state.tokens == sum(n for _, _, n in state.turns)
+    # The oldest exchanges left the window, in order, whole.
+    assert len(state.pending) % 2 == 0
+    assert state.pending[0] == ("human", "turn 0 " + "word " * 10)
+    assert state.turns[0][1].startswith(f"turn {len(state.pending) // 2} ")
+
+
+def test_long_messages_are_truncated():
+    state = ConversationState()
+    state.add("word " * 500, "ok", max_tokens=100)
+    assert count_tokens(state.turns[0][1]) <= 25
+
+
+def test_evicted_exchanges_are_folded_into_the_summary():
+    summarizer = Summarizer()
+    mem = StubMemory(state=ConversationState(), max_tokens=100, summarizer=summarizer)
+    for i in range(6):
+        mem.save_context(*exchange(i))
+
+    assert summarizer.prompts and "question 0" in summarizer.prompts[0]
+    assert mem.state.summary == "the summary" and not mem.state.pending
+    history = mem.load_memory_variables({})["chat_history"]
+    assert history[0].content.endswith("the summary")
+    assert "question 5" in history[-2].content
+
+
+def test_a_failed_summary_keeps_the_newest_text():
+    mem = StubMemory(state=ConversationState(), max_tokens=100, summary_tokens=20, summarizer=Summarizer(RuntimeError()))
+    for i in range(6):
+        mem.save_context(*exchange(i))
+    assert mem.state.summary and count_tokens(mem.state.summary) <= 20
+    assert not mem.state.pending
+
+
+def test_async_folds_run_after_the_answer():
+    mem = StubMemory(state=ConversationState(), max_tokens=100, summarizer=Summarizer())
+
+    async def run():
+        for i in range(6):
+            await mem.asave_context(*exchange(i))
+        await asyncio.gather(*memory._folds)
+
+    asyncio.run(run())
+    assert mem.state.summary == "the summary" and not mem.state.pending
+
+
+def test_unbound_memory_follows_the_session():
+    mem = StubMemory(store=SessionMemoryStore(), summarizer=Summarizer())
+    with session("a"):
+        mem.save_context({"input": "hi from a"}, {"output": "hello"})
+    with session("b"):
+        assert mem.empty
+        mem.clear()
+    with session("a"):
+        assert mem.load_memory_variables({})["chat_history"][0].content == "hi from a"
+        mem.clear()
+        assert mem.empty
+
+
+def test_sessions_expire_and_are_capped(monkeypatch):
+    now = types.SimpleNamespace(value=0.0)
+    monkeypatch.setattr(memory, "time", types.SimpleNamespace(monotonic=lambda: now.value))
+    store = SessionMemoryStore(ttl=60, max_sessions=2)
+    a = store.get("a")
+    now.value = 30
+    store.get("b")
+    assert store.get("a") is a
+    store.get("c")
+    # "b" was the least recently used of three.
+    assert store.stats() == {"sessions": 2, "evicted": 1}
+    now.value = 50
+    store.get("c")
+    now.value = 100
+    # "a" was last used at 30, more than 60 seconds ago; "c" at 50.
+    assert store.get("a") is not a
+    assert store.stats()["evicted"] == 2
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from db.metadata_index import MetadataIndex
+
+
+def make_index():
+    index = MetadataIndex(fields=["source", "tenant"])
+    index.add(
+        [0, 1, 2, 3],
+        [
+            {"source": "docs/a.pdf", "tenant": "acme"},
+            {"source": "docs/./a.pdf", "tenant": "globex"},
+            {"source": "docs/b.pdf", "tenant": "acme"},
+            {"source": "docs/c.pdf"},
+        ],
+    )
+    return index
+
+
+def test_select_matches_every_field():
+    index = make_index()
+    assert index.select({"source": "docs/a.pdf"}).tolist() == [0, 1]
+    assert index.select({"tenant": "acme"}).tolist() == [0, 2]
+    assert index.select({"source": "docs/a.pdf", "tenant": "acme"}).tolist() == [0]
+    assert index.select({"source": "docs/c.pdf", "tenant": "acme"}).tolist() == []
+
+
+def test_list_of_values_matches_any():
+    index = make_index()
+    assert index.select({"source": ["docs/b.pdf", "docs/c.pdf"]}).tolist() == [2, 3]
+    assert index.select({"tenant": ["acme", "globex"]}).tolist() == [0, 1, 2]
+
+
+def test_remove_drops_ids_and_empty_values():
+    index = make_index()
+    index.remove([2], [{"source": "docs/b.pdf", "tenant": "acme"}])
+    assert index.select({"tenant": "acme"}).tolist() == [0]
+    assert index.values("source") == ["docs/a.pdf", "docs/c.pdf"]
+
+
+def test_unindexed_field_is_rejected():
+    with pytest.raises(ValueError):
+        make_index().select({"page": 1})
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from utils.project_writer import ProjectWriter, leaf_directories
+
+
+def test_leaf_directories_drop_duplicates_and_ancestors():
+    dirs = ["a/b/c", "a/b", "a", "a/b/c/", "x", "a/d", "", "x/y"]
+    assert leaf_directories(dirs) == ["a/b/c", "a/d", "x/y"]
+
+
+def test_files_are_written_with_their_directories(tmp_path):
+    writer = ProjectWriter(max_workers=4)
+    report = writer.write_files(
+        {"src/app/main.py": "print('hi')\n", "src/app/util.py": b"\x00\x01", "README.md": "héllo"}, root=str(tmp_path)
+    )
+    assert report.ok and sorted(report.written) == ["README.md", "src/app/main.py", "src/app/util.py"]
+    # One makedirs for both files under src/app, covering the root as well.
+    assert report.directories == 1
+    assert (tmp_path / "src/app/main.py").read_text() == "print('hi')\n"
+    assert (tmp_path / "src/app/util.py").read_bytes() == b"\x00\x01"
+    assert (tmp_path / "README.md").read_text(encoding="utf-8") == "héllo"
+    # No temporary files are left behind.
+    assert sorted(os.listdir(tmp_path / "src/app")) == ["main.py", "util.py"]
+
+
+def test_unchanged_files_are_not_rewritten(tmp_path):
+    writer = ProjectWriter()
+    writer.write_files({"a.py": "a = 1\n", "b.py": "b = 1\n"}, root=str(tmp_path))
+    before = os.stat(tmp_path / "a.py").st_ino
+
+    report = writer.write_files({"a.py": "a = 1\n", "b.py": "b = 2\n"}, root=str(tmp_path))
+    assert report.unchanged == ["a.py"] and report.written == ["b.py"]
+    assert os.stat(tmp_path / "a.py").st_ino == before
+
+    # A fresh writer compares against the content on disk, not its own memory.
+    report = ProjectWriter().write_files({"a.py": "a = 1\n", "b.py": "b = 3\n"}, root=str(tmp_path))
+    assert report.unchanged == ["a.py"] and report.written == ["b.py"]
+
+
+def test_replacing_a_file_keeps_its_permissions(tmp_path):
+    script = tmp_path / "run.sh"
+    script.write_text("echo 1\n")
+    script.chmod(0o750)
+    ProjectWriter().write_files({"run.sh": "echo 2\n"}, root=str(tmp_path))
+    assert script.read_text() == "echo 2\n"
+    assert stat.S_IMODE(script.stat().st_mode) == 0o750
+
+
+def test_failures_are_reported_per_file(tmp_path):
+    (tmp_path / "blocker").write_text("a file, not a directory")
+    report = ProjectWriter().write_files({"blocker/x.py": "x", "ok.py": "ok"}, root=str(tmp_path))
+    assert not report.ok
+    assert list(report.failed) == ["blocker/x.py"]
+    assert report.written == ["ok.py"]
+
+
+def test_async_writes_and_directories(tmp_path):
+    writer = ProjectWriter()
+
+    async def run():
+        failed = await writer.amake_dirs(["empty/one", "empty"], root=str(tmp_path))
+        report = await writer.awrite_files({"pkg/__init__.py": ""}, root=str(tmp_path))
+        return failed, report
+
+    failed, report = asyncio.run(run())
+    assert failed == {}
+    assert (tmp_path / "empty/one").is_dir()
+    assert report.written == ["pkg/__init__.py"] and (tmp_path / "pkg/__init__.py").read_text() == ""
@@ -0,0 +1,103 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("tiktoken")
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_google_genai")
+
+import agent.rag as rag
+from db.semantic_cache import SemanticCache
+from db.vectorstore import _new_vector_store, add_to_store, embedding_model
+
+TEXTS = [f"Chunk {i} explains {topic}." for i, topic in enumerate(
+    ["faiss indexes", "bm25 scoring", "token streaming", "semantic caching", "rate limits", "file uploads"] * 2
+)]
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = _new_vector_store()
+    metadatas = [{"source": f"doc{i % 2}.txt", "chunk_id": f"c{i}"} for i in range(len(TEXTS))]
+    add_to_store(store, TEXTS, embedding_model.embed_documents(TEXTS), metadatas, [f"c{i}" for i in range(len(TEXTS))])
+    monkeypatch.setattr(rag, "vector_store", store)
+    monkeypatch.setattr(rag, "semantic_cache", SemanticCache())
+    return store
+
+
+def test_answers_come_from_the_index_then_the_cache():
+    first = asyncio.run(rag.answer_question("How are faiss indexes built?"))
+    assert not first["cache_hit"]
+    assert 0 < len(first["context"]) <= rag.RAG_TOP_K
+    assert all(doc.page_content in TEXTS for doc in first["context"])
+    assert first["answer"]
+
+    again = asyncio.run(rag.answer_question("How are faiss indexes built?"))
+    assert again["cache_hit"] and again["answer"] == first["answer"]
+    assert [doc.page_content for doc in again["context"]] == [doc.page_content for doc in first["context"]]
+
+
+def test_concurrent_questions_are_answered_independently():
+    questions = [f"What about {topic}?" for topic in ("bm25 scoring", "token streaming", "rate limits")]
+
+    async def run():
+        return await asyncio.gather(*(rag.answer_question(q) for q in questions))
+
+    for question, state in zip(questions, asyncio.run(run())):
+        assert state["question"] == question and state["context"] and not state["cache_hit"]
+
+
+def test_sync_and_async_graphs_retrieve_the_same_context(monkeypatch):
+    question = "Which chunk covers file uploads?"
+    sync = rag.graph.invoke(rag._initial_state(question, "dense", None))
+    monkeypatch.setattr(rag, "semantic_cache", SemanticCache())
+    async_ = asyncio.run(rag.answer_question(question, "dense"))
+    assert [doc.page_content for doc in sync["context"]] == [doc.page_content for doc in async_["context"]]
+
+
+def test_filters_scope_retrieval():
+    state = asyncio.run(rag.answer_question("rate limits", filter={"source": "doc1.txt"}))
+    assert state["context"] and {doc.metadata["source"] for doc in state["context"]} == {"doc1.txt"}
+    with pytest.raises(ValueError):
+        asyncio.run(rag.answer_question("rate limits", filter={"author": "x"}))
+    with pytest.raises(ValueError):
+        asyncio.run(rag.answer_question("rate limits", retrieval_mode="sparse"))
+
+
+
+def collect(question):
+    async def run():
+        return [event async for event in rag.astream_answer(question)]
+
+    return asyncio.run(run())
+
+
+def test_streams_sources_then_tokens():
+    events = collect("How does token streaming work?")
+    names = [name for name, _ in events]
+    assert names[0] == "retrieval" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 3
+    assert events[0][1]["cached"] is False and events[0][1]["sources"]
+    text = "".join(data["text"] for name, data in events if name == "token")
+
+    # The streamed answer was cached: replayed whole.
+    cached = collect("How does token streaming work?")
+    assert [name for name, _ in cached] == ["retrieval", "token", "done"]
+    assert cached[0][1]["cached"] is True and cached[1][1]["text"] == text
+
+
+def test_closing_the_stream_stops_generation():
+    async def run():
+        async with aclosing(rag.astream_answer("How are uploads handled?")) as stream:
+            async for name, _ in stream:
+                if name == "token":
+                    break
+        # Nothing of the closed stream is left running once cancellations are processed.
+        await asyncio.sleep(0.05)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
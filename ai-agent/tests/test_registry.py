@@ -0,0 +1,55 @@
+import os
+
+from db.registry import REGISTRY_FILE, DocumentRegistry, chunk_id, source_key
+
+
+def test_source_keys_and_chunk_ids():
+    assert source_key("./docs/a.txt") == source_key("docs/a.txt")
+    assert chunk_id("a.txt", "text") == chunk_id("a.txt", "text")
+    assert chunk_id("a.txt", "text") != chunk_id("b.txt", "text")
+
+
+def test_changes_are_logged_then_folded_in(tmp_path):
+    index_dir = str(tmp_path)
+    registry = DocumentRegistry()
+    for i in range(4):
+        registry.update(f"f{i}.txt", f"hash{i}", [f"c{i}"])
+    registry.save(index_dir)
+    assert os.listdir(index_dir) == [REGISTRY_FILE]
+
+    registry.update("f0.txt", "hash0b", ["c0b"])
+    registry.remove("f1.txt")
+    registry.save(index_dir)
+    # Two changed sources are appended to the log; registry.json is not rewritten.
+    assert sorted(os.listdir(index_dir)) == ["registry-1.jsonl", REGISTRY_FILE]
+    assert DocumentRegistry.load(index_dir).sources == registry.sources
+
+    for i in (0, 2, 3):
+        registry.update(f"f{i}.txt", f"hash{i}c", [f"c{i}c"])
+    registry.save(index_dir)
+    # The log would outgrow the registry: it is rewritten and the log starts over.
+    assert sorted(os.listdir(index_dir)) == [REGISTRY_FILE]
+    loaded = DocumentRegistry.load(index_dir)
+    assert loaded.sources == registry.sources
+    assert loaded.file_hash("f0.txt") == "hash0c"
+    assert loaded.chunks("f1.txt") == []
+
+
+def test_truncated_log_record_is_skipped(tmp_path):
+    index_dir = str(tmp_path)
+    registry = DocumentRegistry()
+    registry.update("a.txt", "h1", ["c1"])
+    registry.update("b.txt", "h2", ["c2"])
+    registry.save(index_dir)
+    registry.update("a.txt", "h1b", ["c1b"])
+    registry.save(index_dir)
+    log = os.path.join(index_dir, "registry-1.jsonl")
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"source": "b.txt", "ent')
+    assert DocumentRegistry.load(index_dir).file_hash("a.txt") == "h1b"
+
+    # A later append starts on a new line and is read back.
+    loaded = DocumentRegistry.load(index_dir)
+    loaded.update("b.txt", "h2b", ["c2b"])
+    loaded.save(index_dir)
+    assert DocumentRegistry.load(index_dir).file_hash("b.txt") == "h2b"
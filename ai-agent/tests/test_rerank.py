@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain")
+
+from langchain_core.documents import Document
+
+from agent.rerank import lexical_overlap, mmr_order, pack_context, trim_overlap
+from utils.tokens import count_tokens
+
+
+def test_lexical_overlap_is_the_fraction_of_query_terms():
+    scores = lexical_overlap("faiss index retry", ["faiss index", "nothing here", "retry FAISS index"])
+    assert scores.tolist() == pytest.approx([2 / 3, 0.0, 1.0])
+
+
+def test_mmr_prefers_diverse_candidates():
+    relevance = np.array([1.0, 0.99, 0.5])
+    embeddings = [[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]]
+    assert mmr_order(relevance, embeddings, lambda_mult=1.0) == [0, 1, 2]
+    assert mmr_order(relevance, embeddings, lambda_mult=0.5) == [0, 2, 1]
+
+
+def test_shared_split_overlap_is_kept_once():
+    shared = "the shared overlap between two neighbouring chunks"
+    first = "Opening text of the document, long enough that the overlap is under half of it. " + shared
+    second = shared + " and then the rest of the second chunk, which goes on for a while longer."
+    assert trim_overlap(second, [first]) == "and then the rest of the second chunk, which goes on for a while longer."
+
+
+def test_pack_context_respects_the_budgets():
+    docs = [Document(page_content=f"chunk {i} " + "word " * 40, metadata={"source": f"s{i}"}) for i in range(10)]
+    packed = pack_context(docs, max_chunks=3, max_tokens=1000)
+    assert [doc.metadata["source"] for doc in packed] == ["s0", "s1", "s2"]
+    packed = pack_context(docs, max_chunks=10, max_tokens=100)
+    assert sum(count_tokens(doc.page_content) for doc in packed) <= 100
+    # The top chunk is truncated rather than dropped.
+    packed = pack_context(docs, max_chunks=10, max_tokens=10)
+    assert len(packed) == 1 and count_tokens(packed[0].page_content) <= 10
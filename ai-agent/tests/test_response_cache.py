@@ -0,0 +1,94 @@
+import itertools
+import types
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.outputs import Generation
+
+import db.response_cache as response_cache
+from db.response_cache import MemoryTier, ResponseCache, SqliteTier, cache_for
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_memory_tier_counts_utf8_bytes_and_evicts_lru():
+    tier = MemoryTier(max_bytes=10)
+    tier.put("a", "éé")
+    assert tier.bytes == 4
+    tier.put("b", "bbb")
+    assert tier.get("a") == "éé"
+    tier.put("c", "cccc")
+    # 11 bytes: "b" is the least recently used.
+    assert tier.get("b") is None
+    assert tier.bytes == 8 and tier.evictions == 1
+    # Replacing an entry counts only its new size; one larger than the tier is not kept.
+    tier.put("a", "a")
+    assert tier.bytes == 5
+    tier.put("huge", "x" * 11)
+    assert tier.get("huge") is None and len(tier) == 2
+
+
+def test_sqlite_tier_evicts_to_ninety_percent(tmp_path, clock):
+    path = str(tmp_path / "llm.sqlite3")
+    tier = SqliteTier(path, max_bytes=100)
+    for i in range(5):
+        tier.put(f"k{i}", "é" * 10)
+    assert tier.get("k0") is not None
+    tier.put("k5", "x" * 20)
+
+    # 120 bytes: the oldest entries go until at most 90 remain; k0 was read, so k1 goes first.
+    assert tier.get("k1") is None and tier.get("k2") is None
+    assert tier.get("k0") is not None and tier.get("k5") is not None
+    assert tier.size() == {"entries": 4, "bytes": 80}
+    assert tier.evictions == 2
+    # Other processes see the same entries.
+    assert SqliteTier(path, max_bytes=100).size() == {"entries": 4, "bytes": 80}
+
+
+def test_a_failed_sqlite_write_is_rolled_back(tmp_path, monkeypatch):
+    tier = SqliteTier(str(tmp_path / "llm.sqlite3"))
+    tier.put("kept", "v")
+
+    def fail(key, value, size):
+        tier._conn.execute("INSERT INTO responses VALUES (?, ?, ?, 0)", (key, value, size))
+        tier._bytes += size
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tier, "_put", fail)
+    with pytest.raises(OSError):
+        tier.put("lost", "value")
+    assert tier._bytes == 1 and tier.get("lost") is None
+    monkeypatch.undo()
+    tier.put("later", "v")
+    assert tier.size() == {"entries": 2, "bytes": 2}
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    disk = SqliteTier(str(tmp_path / "llm.sqlite3"))
+    writer = ResponseCache(MemoryTier(), disk)
+    writer.update("prompt", "model-a", [Generation(text="answer")])
+
+    reader = ResponseCache(MemoryTier(), disk)
+    assert reader.lookup("prompt", "model-b") is None
+    assert reader.lookup("prompt", "model-a")[0].text == "answer"
+    assert reader.lookup("prompt", "model-a")[0].text == "answer"
+    assert reader.stats()["memory_hits"] == 1
+    assert reader.stats()["disk_hits"] == 1
+    assert reader.stats()["misses"] == 1
+
+
+def test_only_deterministic_clients_are_cached_by_default(monkeypatch):
+    monkeypatch.setattr(response_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "LLM_CACHE_NONDETERMINISTIC", False)
+    assert cache_for(0) is response_cache.response_cache
+    assert cache_for(0.3) is None
+    assert cache_for(0.3, cache=True) is response_cache.response_cache
+    assert cache_for(0, cache=False) is None
+    monkeypatch.setattr(response_cache, "LLM_CACHE_NONDETERMINISTIC", True)
+    assert cache_for(0.3) is response_cache.response_cache
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from utils.scheduler import RateScheduler, TokenBucket, priority
+
+
+def test_token_bucket_refills_at_its_rate_up_to_a_minute():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(10, now + 4) == pytest.approx(6.0)
+    # Refilling stops at a full bucket.
+    bucket.wait_time(1, now + 1000)
+    assert bucket.level == 60
+
+
+def test_token_bucket_admits_a_call_larger_than_itself_once_full():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(100, now) == 0.0
+    bucket.take(100)
+    assert bucket.level == -40
+    assert bucket.wait_time(100, now) == pytest.approx(100.0)
+
+
+def test_disabled_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.take(1000)
+    assert bucket.wait_time(1000, bucket.updated) == 0.0
+
+
+def test_waiters_are_granted_by_priority_then_arrival():
+    scheduler = RateScheduler("test", max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    order = []
+
+    async def call(label):
+        async with scheduler.aslot():
+            order.append(label)
+
+    async def main():
+        held = await scheduler.aacquire()
+        tasks = []
+        for label, name in [("batch-1", "batch"), ("normal", "normal"), ("batch-2", "batch"), ("interactive", "interactive")]:
+            with priority(name):
+                tasks.append(asyncio.create_task(call(label)))
+            await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == {"interactive": 1, "normal": 1, "batch": 2}
+        scheduler.release(held)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["interactive", "normal", "batch-1", "batch-2"]
+    assert scheduler.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_hold_the_queue():
+    scheduler = RateScheduler("test", max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+
+    async def main():
+        held = await scheduler.aacquire()
+        with priority("interactive"):
+            abandoned = asyncio.create_task(scheduler.aacquire())
+        waiting = asyncio.create_task(scheduler.aacquire())
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        scheduler.release(held)
+        scheduler.release(await asyncio.wait_for(waiting, 1))
+
+    asyncio.run(main())
+    assert scheduler.in_flight == 0
+    assert sum(scheduler.stats()["queued"].values()) == 0
@@ -0,0 +1,68 @@
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+import db.semantic_cache as semantic_cache
+from db.semantic_cache import SemanticCache
+
+
+def always(entry):
+    return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(semantic_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_similar_questions_hit():
+    cache = SemanticCache(threshold=0.95)
+    cache.store([1.0, 0.0, 0.0], "what is faiss?", "a library", ["c1"])
+    # Cosine similarity, so the scale of the embedding does not matter.
+    assert cache.lookup([2.0, 0.01, 0.0], always).answer == "a library"
+    assert cache.lookup([0.0, 1.0, 0.0], always) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_expired_answers_are_evicted(clock):
+    cache = SemanticCache(ttl=60)
+    cache.store([1.0, 0.0], "q", "a", [])
+    clock.value += 30
+    assert cache.lookup([1.0, 0.0], always) is not None
+    clock.value += 31
+    assert cache.lookup([1.0, 0.0], always) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidated_answers_are_evicted_and_rejected_ones_kept():
+    cache = SemanticCache()
+    cache.store([1.0, 0.0], "q", "a", ["c1"])
+    # Outside the caller's filter: a miss, but the answer stays for other callers.
+    assert cache.lookup([1.0, 0.0], always, accept=lambda entry: False) is None
+    assert cache.stats()["entries"] == 1
+    # Its chunks changed: dropped.
+    assert cache.lookup([1.0, 0.0], lambda entry: "c1" not in entry.chunk_ids) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_answers_are_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "x", "x", [])
+    cache.store([0.0, 1.0, 0.0], "y", "y", [])
+    assert cache.lookup([1.0, 0.0, 0.0], always).answer == "x"
+    cache.store([0.0, 0.0, 1.0], "z", "z", [])
+    assert cache.lookup([0.0, 1.0, 0.0], always) is None
+    assert cache.lookup([1.0, 0.0, 0.0], always).answer == "x"
+    assert cache.lookup([0.0, 0.0, 1.0], always).answer == "z"
+
+
+def test_zero_entries_disables_the_cache():
+    cache = SemanticCache(max_entries=0)
+    cache.store([1.0, 0.0], "q", "a", [])
+    assert cache.lookup([1.0, 0.0], always) is None
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0}
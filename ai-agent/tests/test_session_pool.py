@@ -0,0 +1,77 @@
+import copy
+import types
+
+import pytest
+
+pytest.importorskip("langchain")
+
+import agent.memory as memory
+from agent.memory import SessionMemoryStore
+from agent.session_pool import AgentSessionPool
+
+
+class Template:
+    """An agent shared by every session; views copy it with their own memory."""
+
+    name = "Test Agent"
+
+    def for_session(self, mem):
+        view = copy.copy(self)
+        view.memory = mem
+        return view
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=0.0)
+    monkeypatch.setattr(memory, "time", types.SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_each_session_gets_one_view():
+    pool = AgentSessionPool({"test": Template()}, SessionMemoryStore())
+    a = pool.get("test", "a")
+    assert pool.get("test", "a") is a
+    b = pool.get("test", "b")
+    assert b is not a and b.memory.state is not a.memory.state
+    assert pool.stats() == {"sessions": 2, "evicted": 0, "views_created": 2}
+    with pytest.raises(ValueError):
+        pool.get("missing", "a")
+
+
+def test_views_share_the_history_of_the_unbound_memory():
+    store = SessionMemoryStore()
+    pool = AgentSessionPool({"test": Template()}, store)
+    view = pool.get("test", "a")
+    assert view.memory.state is store.get("Test Agent:a")
+
+
+def test_least_recently_used_views_are_evicted_with_their_session(clock):
+    pool = AgentSessionPool({"test": Template()}, SessionMemoryStore(ttl=3600, max_sessions=2))
+    a = pool.get("test", "a")
+    clock.value = 1
+    pool.get("test", "b")
+    clock.value = 2
+    assert pool.get("test", "a") is a
+    pool.get("test", "c")
+    assert pool.stats()["evicted"] == 1
+    assert pool.get("test", "a") is a
+    # "b" was dropped: a new view with a fresh history.
+    assert pool.stats()["views_created"] == 3
+    pool.get("test", "b")
+    assert pool.stats()["views_created"] == 4
+
+
+def test_idle_views_expire(clock):
+    pool = AgentSessionPool({"test": Template()}, SessionMemoryStore(ttl=60))
+    a = pool.get("test", "a")
+    clock.value = 61
+    assert pool.get("test", "a") is not a
+    assert pool.stats()["evicted"] == 1
+
+
+def test_dropping_a_session_forgets_its_view():
+    pool = AgentSessionPool({"test": Template()}, SessionMemoryStore())
+    a = pool.get("test", "a")
+    pool.drop("test", "a")
+    assert pool.get("test", "a") is not a
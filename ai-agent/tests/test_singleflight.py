@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import SingleFlight, flight_key
+
+
+def test_flight_key_ignores_dict_order():
+    assert flight_key("q", {"a": 1, "b": 2}) == flight_key("q", {"b": 2, "a": 1})
+    assert flight_key("q", 1) != flight_key("q", 2)
+
+
+def test_overlapping_calls_run_once():
+    group = SingleFlight("test")
+    runs = 0
+
+    async def fetch():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(group.ado("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert runs == 1
+    assert group.stats() == {"calls": 1, "shared": 4, "in_flight": 0}
+
+
+def test_async_error_is_shared_across_waiters():
+    group = SingleFlight("test")
+    runs = 0
+
+    async def fail():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(group.ado("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert runs == 1
+    assert all(isinstance(e, ValueError) and str(e) == "upstream down" for e in errors)
+    # A finished call is not reused.
+    with pytest.raises(ValueError):
+        asyncio.run(group.ado("key", fail))
+    assert runs == 2
+
+
+def test_sync_error_is_shared_across_waiters():
+    group = SingleFlight("test")
+    started = threading.Event()
+    runs = 0
+
+    def fail():
+        nonlocal runs
+        runs += 1
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+    assert runs == 1
+    assert len(errors) == 4
+    assert group.stats()["shared"] == 3
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    group = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        first = asyncio.create_task(group.ado("key", fetch))
+        second = asyncio.create_task(group.ado("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "value"
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("langchain_text_splitters")
+
+from langchain_core.documents import Document
+
+from loaders.splitter import CHUNK_TOKENS, BoundaryTokenSplitter, segments
+from utils.tokens import count_tokens
+
+
+def prose(seed, paragraphs=20):
+    rng = random.Random(seed)
+    words = ["index", "vector", "query", "token", "retry", "cache", "the", "a", "store", "chunk"]
+    text = []
+    for _ in range(paragraphs):
+        sentences = [
+            " ".join(rng.choices(words, k=rng.randint(3, 30))).capitalize() + rng.choice(".!?")
+            for _ in range(rng.randint(1, 6))
+        ]
+        text.append(" ".join(sentences))
+    return "\n\n".join(text)
+
+
+def test_segments_concatenate_back():
+    text = prose(0)
+    assert "".join(segments(text)) == text
+    assert segments("one. two\nthree\n\nfour") == ["one. ", "two\n", "three\n\n", "four"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_chunks_never_exceed_chunk_tokens(seed):
+    splitter = BoundaryTokenSplitter()
+    chunks = splitter.split_text(prose(seed))
+    assert chunks
+    assert all(count_tokens(chunk) <= CHUNK_TOKENS for chunk in chunks)
+
+
+def test_long_segment_is_cut_at_token_boundaries():
+    splitter = BoundaryTokenSplitter(chunk_size=20, chunk_overlap=5)
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = splitter.split_text(text)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 20 for chunk in chunks)
+    assert "word0" in chunks[0] and "word199" in chunks[-1]
+
+
+def test_every_sentence_lands_in_a_chunk():
+    splitter = BoundaryTokenSplitter(chunk_size=50, chunk_overlap=10)
+    text = prose(1)
+    joined = " ".join(splitter.split_text(text))
+    for sentence in segments(text):
+        if count_tokens(sentence) <= 50:
+            assert sentence.strip() in joined
+
+
+def test_split_documents_keeps_order_and_metadata():
+    splitter = BoundaryTokenSplitter(chunk_size=30, chunk_overlap=0)
+    documents = [Document(page_content=prose(i, 3), metadata={"source": f"doc-{i}"}) for i in range(4)]
+    chunks = splitter.split_documents(documents)
+    sources = [chunk.metadata["source"] for chunk in chunks]
+    assert sources == sorted(sources)
+    assert set(sources) == {f"doc-{i}" for i in range(4)}
+    expected = [chunk for doc in documents for chunk in splitter.split_text(doc.page_content)]
+    assert [chunk.page_content for chunk in chunks] == expected
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from loaders.engine import LoaderEngine, iter_text_blocks
+
+
+def test_text_blocks_end_at_paragraph_breaks(tmp_path):
+    paragraphs = [f"paragraph {i} " + "word " * (i % 7 + 3) for i in range(200)]
+    text = "\n\n".join(paragraphs)
+    path = tmp_path / "big.txt"
+    path.write_text(text, encoding="utf-8")
+
+    blocks = [doc.page_content for doc in iter_text_blocks(str(path), block_chars=256)]
+    assert len(blocks) > 10
+    assert "".join(blocks) == text
+    # Each block but the first starts a paragraph.
+    assert all(block.startswith("\n\nparagraph ") for block in blocks[1:])
+    assert all(len(block) < 2 * 256 for block in blocks)
+
+
+def test_text_without_line_breaks_is_still_cut(tmp_path):
+    path = tmp_path / "one-line.txt"
+    path.write_text("x" * 5000, encoding="utf-8")
+    blocks = [doc.page_content for doc in iter_text_blocks(str(path), block_chars=100)]
+    assert "".join(blocks) == "x" * 5000
+    assert max(len(block) for block in blocks) <= 4 * 100
+
+
+def test_text_blocks_are_read_lazily(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("\n\n".join(["line"] * 1000), encoding="utf-8")
+    blocks = iter_text_blocks(str(path), block_chars=64)
+    first = next(blocks)
+    assert first.metadata == {"source": str(path)} and len(first.page_content) <= 64
+    blocks.close()
+
+
+def test_stream_yields_every_source(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(f"document {i}\n\nsecond paragraph", encoding="utf-8")
+        paths.append(str(path))
+
+    async def run():
+        return [doc async for doc in LoaderEngine(processes=1).stream(paths)]
+
+    docs = asyncio.run(run())
+    assert sorted({doc.metadata["source"] for doc in docs}) == paths
+    assert "".join(doc.page_content for doc in docs if doc.metadata["source"] == paths[0]).startswith("document 0")
+
+
+def test_failed_sources_raise_or_are_skipped(tmp_path):
+    good = tmp_path / "good.txt"
+    good.write_text("fine", encoding="utf-8")
+    missing = str(tmp_path / "missing.txt")
+
+    async def run(skip_errors):
+        return [doc async for doc in LoaderEngine(processes=1).stream([missing, str(good)], skip_errors=skip_errors)]
+
+    assert [doc.page_content for doc in asyncio.run(run(True))] == ["fine"]
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(run(False))
+
+
+def test_a_failing_source_iterator_ends_the_stream(tmp_path):
+    good = tmp_path / "good.txt"
+    good.write_text("fine", encoding="utf-8")
+
+    def sources():
+        yield str(good)
+        raise RuntimeError("listing failed")
+
+    async def run():
+        return [doc async for doc in LoaderEngine(processes=1).stream(sources())]
+
+    with pytest.raises(RuntimeError, match="listing failed"):
+        asyncio.run(run())
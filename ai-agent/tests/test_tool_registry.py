@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain_core.tools import tool
+
+from agent.tool_registry import ToolRegistry
+
+
+def make_tools():
+    """Fresh tools per test; registering instruments a tool in place."""
+
+    @tool
+    def add(a: int, b: int) -> int:
+        """Add two numbers."""
+        return a + b
+
+    @tool
+    def explode(reason: str) -> str:
+        """Always fails."""
+        raise ValueError(reason)
+
+    @tool
+    async def echo(text: str) -> str:
+        """Echo the text."""
+        return text
+
+    return add, explode, echo
+
+
+def test_calls_and_errors_are_counted():
+    add, explode, _ = make_tools()
+    registry = ToolRegistry()
+    registry.register(add)
+    registry.register(explode)
+    assert registry.get("add").invoke({"a": 1, "b": 2}) == 3
+    with pytest.raises(ValueError):
+        registry.get("explode").invoke({"reason": "no"})
+    stats = registry.stats()
+    assert stats["add"]["calls"] == 1 and stats["add"]["errors"] == 0
+    assert stats["explode"]["calls"] == 1 and stats["explode"]["errors"] == 1
+    assert stats["add"]["in_flight"] == 0
+    assert sum(stats["add"]["latency_histogram"].values()) == 1
+
+
+def test_async_tools_are_counted():
+    _, _, echo = make_tools()
+    registry = ToolRegistry()
+    registry.register(echo)
+    assert asyncio.run(registry.get("echo").ainvoke({"text": "hi"})) == "hi"
+    assert registry.stats()["echo"]["calls"] == 1
+
+
+def test_lookup():
+    add, _, _ = make_tools()
+    registry = ToolRegistry()
+    registry.register(add)
+    assert "add" in registry and "missing" not in registry
+    assert registry.tools("add") == [add]
+    with pytest.raises(KeyError, match="registered tools: add"):
+        registry.get("missing")
+    with pytest.raises(ValueError):
+        registry.register(add)
@@ -0,0 +1,182 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain_google_genai")
+
+from db.index_factory import INDEX_TYPES, base_index, create_index, index_type_of
+import db.vectorstore as vectorstore
+from db.vectorstore import (
+    _new_vector_store,
+    add_to_store,
+    embedding_dimension,
+    load_vector_store,
+    needs_training,
+    remove_from_store,
+    save_changes,
+    save_vector_store,
+    search_ids,
+    stored_vectors,
+)
+
+DIM = embedding_dimension()
+
+
+def new_store(index_type):
+    store = _new_vector_store()
+    store.index = create_index(DIM, index_type)
+    return store
+
+
+def add_random(store, n, start=0, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(start, start + n)]
+    add_to_store(store, [f"text {i}" for i in ids], vectors.tolist(), [{"source": "a.txt"} for _ in ids], ids)
+    return vectors
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_save_and_load_round_trip(tmp_path, index_type):
+    store = new_store(index_type)
+    vectors = add_random(store, 600)
+    assert index_type_of(store.index) == index_type
+    save_vector_store(store, str(tmp_path))
+
+    loaded = load_vector_store(str(tmp_path))
+    assert loaded.is_mapped
+    assert index_type_of(loaded.index) == index_type
+    assert loaded.index.ntotal == 600
+    assert loaded.index_to_docstore_id == store.index_to_docstore_id
+    for query in vectors[:10]:
+        assert search_ids(loaded, query.tolist(), 5) == search_ids(store, query.tolist(), 5)
+
+    # Adding to a mapped store swaps in a writable copy first.
+    more = add_random(loaded, 10, start=600, seed=1)
+    assert not loaded.is_mapped
+    assert loaded.index.ntotal == 610
+    assert search_ids(loaded, more[0].tolist(), 1) == ["chunk-600"]
+
+
+def test_missing_store_loads_as_none(tmp_path):
+    assert load_vector_store(str(tmp_path)) is None
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_only_ivf_indexes_wait_for_a_training_sample(index_type):
+    store = new_store(index_type)
+    assert needs_training(store) == index_type.startswith("ivf")
+    add_random(store, 300)
+    assert not needs_training(store)
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq"])
+def test_ivf_indexes_train_on_fewer_vectors_than_estimated(index_type):
+    store = new_store(index_type)
+    vectors = np.random.default_rng(0).standard_normal((6, DIM)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(6)]
+    add_to_store(store, ids, vectors.tolist(), [{} for _ in ids], ids, n_hint=1000)
+    assert store.index.is_trained and store.index.ntotal == 6
+    assert base_index(store.index).nlist <= 6
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_stored_vectors_come_from_flat_and_hnsw_indexes(index_type):
+    store = new_store(index_type)
+    vectors = add_random(store, 300)
+    found = stored_vectors(store, ["chunk-7", "chunk-3"])
+    if index_type in ("flat", "hnsw"):
+        np.testing.assert_allclose(found, vectors[[7, 3]])
+    else:
+        assert found is None
+    assert stored_vectors(store, ["chunk-7", "missing"]) is None
+
+
+def assert_same_store(loaded, store):
+    assert loaded.index.ntotal == store.index.ntotal
+    assert loaded.index_to_docstore_id == store.index_to_docstore_id
+    assert loaded.docstore._dict.keys() == store.docstore._dict.keys()
+    assert loaded.tombstones == store.tombstones
+    assert loaded.next_id == store.next_id
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_removed_chunks_are_gone(index_type):
+    store = new_store(index_type)
+    vectors = add_random(store, 300)
+    assert remove_from_store(store, ["chunk-5", "chunk-6", "missing"]) == 2
+    assert remove_from_store(store, ["chunk-5"]) == 0
+    assert store.index.ntotal == 298
+    assert "chunk-5" not in store.docstore._dict and "chunk-5" not in store.docstore_to_index_id
+    assert store.metadata_index.select({"source": "a.txt"}).size == 298
+    assert "chunk-5" not in search_ids(store, vectors[5].tolist(), 10)
+    assert search_ids(store, vectors[7].tolist(), 1) == ["chunk-7"]
+
+
+def test_hnsw_removals_are_tombstoned_then_rebuilt(monkeypatch):
+    monkeypatch.setattr(vectorstore, "FAISS_TOMBSTONE_RATIO", 0.1)
+    store = new_store("hnsw")
+    vectors = add_random(store, 200)
+
+    remove_from_store(store, [f"chunk-{i}" for i in range(10)])
+    # HNSW cannot drop nodes: the vectors stay, hidden from searches.
+    assert store.index.ntotal == 200
+    assert len(store.tombstones) == 10
+    for i in range(10):
+        assert f"chunk-{i}" not in search_ids(store, vectors[i].tolist(), 5)
+    assert search_ids(store, vectors[50].tolist(), 1) == ["chunk-50"]
+
+    remove_from_store(store, [f"chunk-{i}" for i in range(10, 25)])
+    # Past the ratio the graph is rebuilt from the surviving vectors.
+    assert store.index.ntotal == 175
+    assert store.tombstones == set()
+    assert store.live_selector is None
+    assert index_type_of(store.index) == "hnsw"
+    assert search_ids(store, vectors[50].tolist(), 1) == ["chunk-50"]
+    assert stored_vectors(store, ["chunk-50"]) is not None
+
+
+def test_saves_append_to_a_log_until_it_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(vectorstore, "VECTOR_STORE_COMPACT_RATIO", 0.25)
+    index_dir = str(tmp_path)
+    store = new_store("hnsw")
+    add_random(store, 200)
+    save_changes(store, index_dir)
+    snapshot = os.path.getmtime(os.path.join(index_dir, "index.faiss"))
+    assert store.generation == 1 and not store.delta
+
+    # 20 added and 10 removed chunks are within 25% of the store: only the log grows.
+    add_random(store, 20, start=200, seed=1)
+    remove_from_store(store, [f"chunk-{i}" for i in range(10)])
+    save_changes(store, index_dir)
+    assert os.path.getmtime(os.path.join(index_dir, "index.faiss")) == snapshot
+    assert sorted(name for name in os.listdir(index_dir) if name.startswith("delta-")) == ["delta-1.jsonl"]
+    assert store.delta_chunks == 30
+    loaded = load_vector_store(index_dir)
+    assert_same_store(loaded, store)
+    assert not loaded.is_mapped
+    query = store.index.reconstruct(205).tolist()
+    assert search_ids(loaded, query, 3) == search_ids(store, query, 3)
+
+    # The next 40 chunks push the log past 25%: a new snapshot and an empty log.
+    add_random(store, 40, start=220, seed=2)
+    save_changes(store, index_dir)
+    assert store.generation == 2 and store.delta_chunks == 0
+    assert not any(name.startswith("delta-") for name in os.listdir(index_dir))
+    loaded = load_vector_store(index_dir)
+    assert_same_store(loaded, store)
+    assert loaded.is_mapped
+
+
+def test_truncated_log_record_is_skipped(tmp_path):
+    index_dir = str(tmp_path)
+    store = new_store("flat")
+    add_random(store, 100)
+    save_changes(store, index_dir)
+    add_random(store, 5, start=100, seed=1)
+    save_changes(store, index_dir)
+    with open(os.path.join(index_dir, "delta-1.jsonl"), "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "first_id": 105, "ids": ["chunk-1')
+    assert_same_store(load_vector_store(index_dir), store)
@@ -0,0 +1,38 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger("JsonLog")
+
+
+def append_records(path: str, records: Iterable[Dict[str, Any]]):
+    """Append ``records`` to a JSON-lines log and flush them to disk.
+
+    A record cut short by a crash is left on a line of its own, where
+    ``read_records`` skips it, instead of running into the next one.
+    """
+    with open(path, "ab") as f:
+        if f.tell():
+            with open(path, "rb") as tail:
+                tail.seek(-1, os.SEEK_END)
+                if tail.read(1) != b"\n":
+                    f.write(b"\n")
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Records of a log written by ``append_records``; empty if there is none."""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping a truncated record in {path}")
+    return records
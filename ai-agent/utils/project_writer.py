@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import secrets
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from utils.fingerprint import file_fingerprint
+
+logger = logging.getLogger("ProjectWriter")
+
+PROJECT_WRITER_THREADS = int(os.getenv("PROJECT_WRITER_THREADS", "8"))
+
+
+@dataclass
+class WriteReport:
+    """Outcome of one batch, with paths as the caller gave them."""
+
+    written: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    # Path -> error message
+    failed: Dict[str, str] = field(default_factory=dict)
+    directories: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def leaf_directories(dirs: Iterable[str]) -> List[str]:
+    """``dirs`` without duplicates or ancestors of other entries; creating these creates them all."""
+    dirs = {os.path.normpath(d) for d in dirs if d}
+    covered = set()
+    for d in dirs:
+        child, parent = d, os.path.dirname(d)
+        # An ancestor already covered has had its own ancestors covered too.
+        while parent and parent != child and parent not in covered:
+            covered.add(parent)
+            child, parent = parent, os.path.dirname(parent)
+    return sorted(dirs - covered)
+
+
+class ProjectWriter:
+    """Writes batches of generated files on a thread pool, off the event loop.
+
+    A batch creates each directory it needs once, then writes its files in
+    parallel. Each file goes to a temporary file next to the target that is
+    renamed over it, so a reader sees the old content or the new, never part
+    of a file. Files whose content is already on disk are not rewritten, so
+    regenerating a project only touches what changed.
+    """
+
+    def __init__(self, max_workers: int = PROJECT_WRITER_THREADS):
+        """Initialize the writer.
+
+        Args:
+            max_workers: Files written at once
+        """
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Absolute path -> (size, mtime_ns, sha256) of files seen by this writer,
+        # so checking an unchanged file does not read it again.
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="project-writer")
+            return self._executor
+
+    def _resolve(self, files: Mapping[str, Union[str, bytes]], root: Optional[str]) -> Dict[str, Tuple[str, bytes]]:
+        # Absolute target -> (path as given, bytes); two spellings of one path keep the last content.
+        base = root or os.getcwd()
+        targets = {}
+        for path, content in files.items():
+            data = content if isinstance(content, bytes) else str(content).encode("utf-8")
+            targets[os.path.abspath(os.path.join(base, path))] = (path, data)
+        return targets
+
+    def _hash_on_disk(self, target: str, st: os.stat_result) -> str:
+        with self._lock:
+            known = self._hashes.get(target)
+        if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+            return known[2]
+        digest = file_fingerprint(target)
+        with self._lock:
+            self._hashes[target] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def _write(self, target: str, data: bytes) -> bool:
+        """Atomically replace ``target`` with ``data``; False if it already held ``data``."""
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            st = os.stat(target)
+        except FileNotFoundError:
+            st = None
+        if st is not None and st.st_size == len(data) and self._hash_on_disk(target, st) == digest:
+            return False
+        directory, name = os.path.split(target)
+        tmp = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        # Created like open(target, "w") would create it: 0o666 less the process umask.
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            if st is not None:
+                # Replacing a file keeps its permissions.
+                os.chmod(tmp, stat.S_IMODE(st.st_mode))
+            os.replace(tmp, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+        written = os.stat(target)
+        with self._lock:
+            self._hashes[target] = (written.st_size, written.st_mtime_ns, digest)
+        return True
+
+    def _try_write(self, item: Tuple[str, Tuple[str, bytes]]) -> Tuple[str, str, Optional[str]]:
+        target, (path, data) = item
+        try:
+            return path, "written" if self._write(target, data) else "unchanged", None
+        except Exception as e:
+            logger.error(f"Error writing {path}: {e}")
+            return path, "failed", str(e)
+
+    def _make_dirs(self, dirs: Iterable[str]) -> Tuple[int, Dict[str, str]]:
+        created, failed = 0, {}
+        for directory in leaf_directories(dirs):
+            try:
+                os.makedirs(directory, exist_ok=True)
+                created += 1
+            except OSError as e:
+                # The files under it fail and are reported; the rest of the batch goes on.
+                logger.error(f"Error creating directory {directory}: {e}")
+                failed[directory] = str(e)
+        return created, failed
+
+    def _report(self, directories: int, outcomes: Iterable[Tuple[str, str, Optional[str]]], start: float) -> WriteReport:
+        report = WriteReport(directories=directories)
+        for path, status, error in outcomes:
+            if status == "failed":
+                report.failed[path] = error
+            else:
+                getattr(report, status).append(path)
+        report.seconds = time.perf_counter() - start
+        logger.info(
+            f"Wrote {len(report.written)} files, {len(report.unchanged)} unchanged, "
+            f"{len(report.failed)} failed, in {report.seconds:.2f}s"
+        )
+        return report
+
+    async def awrite_files(self, files: Mapping[str, Union[str, bytes]], root: Optional[str] = None) -> WriteReport:
+        """Write a project's files without blocking the event loop.
+
+        Args:
+            files: File path -> content; text is written as UTF-8
+            root: Directory relative paths are under; the working directory if None
+
+        Returns:
+            The files written, left unchanged and failed
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        targets = self._resolve(files, root)
+        directories, _ = await loop.run_in_executor(pool, self._make_dirs, [os.path.dirname(t) for t in targets])
+        outcomes = await asyncio.gather(*(loop.run_in_executor(pool, self._try_write, item) for item in targets.items()))
+        return self._report(directories, outcomes, start)
+
+    def write_files(self, files: Mapping[str, Union[str, bytes]], root: Optional[str] = None) -> WriteReport:
+        """Blocking ``awrite_files`` for synchronous callers; the files are still written in parallel."""
+        start = time.perf_counter()
+        targets = self._resolve(files, root)
+        directories, _ = self._make_dirs(os.path.dirname(t) for t in targets)
+        outcomes = list(self._pool().map(self._try_write, targets.items()))
+        return self._report(directories, outcomes, start)
+
+    async def amake_dirs(self, dirs: Iterable[str], root: Optional[str] = None) -> Dict[str, str]:
+        """Create ``dirs`` and their parents off the event loop, each path once.
+
+        Args:
+            dirs: Directory paths
+            root: Directory relative paths are under; the working directory if None
+
+        Returns:
+            Directory -> error, for those that could not be created
+        """
+        base = root or os.getcwd()
+        paths = [os.path.abspath(os.path.join(base, d)) for d in dirs]
+        _, failed = await asyncio.get_running_loop().run_in_executor(self._pool(), self._make_dirs, paths)
+        return failed
+
+    def make_dirs(self, dirs: Iterable[str], root: Optional[str] = None) -> Dict[str, str]:
+        """Blocking ``amake_dirs`` for synchronous callers."""
+        base = root or os.getcwd()
+        _, failed = self._make_dirs(os.path.abspath(os.path.join(base, d)) for d in dirs)
+        return failed
+
+project_writer = ProjectWriter()
@@ -0,0 +1,335 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Scheduler")
+
+# Limits of 0 disable the corresponding bucket.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "300"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_REQUESTS_PER_MINUTE = float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "1500"))
+EMBEDDING_TOKENS_PER_MINUTE = float(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "0"))
+# How long every queued call waits after the provider answers 429.
+RATE_LIMIT_COOLDOWN = float(os.getenv("RATE_LIMIT_COOLDOWN", "10"))
+
+# Lower ranks are served first; within a class, calls are served in arrival order.
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="normal")
+
+
+@contextmanager
+def priority(name: str):
+    """Run model calls made in this context (and tasks started from it) in priority class ``name``."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}, expected one of {sorted(PRIORITIES)}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_priority(name: str):
+    """Decorator running a sync or async function in priority class ``name``."""
+
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with priority(name):
+                    return await func(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with priority(name):
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class TokenBucket:
+    """Refills at ``per_minute / 60`` units a second up to a minute's worth.
+
+    A call larger than the whole bucket waits for a full bucket and then
+    drives the level negative, so it is admitted without starving forever.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        need = min(amount, self.per_minute)
+        return 0.0 if self.level >= need else (need - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.per_minute > 0:
+            self.level -= amount
+
+    def give(self, amount: float):
+        if self.per_minute > 0:
+            self.level = min(self.per_minute, self.level + amount)
+
+
+@dataclass
+class Permit:
+    """A granted slot; set ``used_tokens`` to the actual usage before releasing it."""
+
+    tokens: int
+    priority: str
+    queued_at: float
+    granted_at: float = 0.0
+    used_tokens: Optional[int] = None
+
+
+@dataclass(order=True)
+class _Waiter:
+    rank: int
+    seq: int
+    permit: Permit = field(compare=False)
+    event: Optional[threading.Event] = field(default=None, compare=False)
+    future: Optional[asyncio.Future] = field(default=None, compare=False)
+    loop: Optional[asyncio.AbstractEventLoop] = field(default=None, compare=False)
+    granted: bool = field(default=False, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RateScheduler:
+    """Admits model calls under a concurrency cap and request/token per-minute buckets.
+
+    Callers from threads and from event loops share one priority queue, so a
+    burst of ingestion embeddings queued as "batch" cannot delay an
+    interactive question by more than the calls already in flight. Token
+    cost is estimated up front and corrected with the reported usage on
+    release. A 429 from the provider pauses admissions for everyone.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        cooldown: float = RATE_LIMIT_COOLDOWN,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            name: Name used in logs and metrics
+            max_concurrency: Calls allowed in flight at once, 0 for no limit
+            requests_per_minute: Request budget, 0 for no limit
+            tokens_per_minute: Token budget, 0 for no limit
+            cooldown: Seconds to pause admissions after a rate-limit error
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.cooldown = cooldown
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self.in_flight = 0
+        self.granted = {p: 0 for p in PRIORITIES}
+        self.wait_seconds = {p: 0.0 for p in PRIORITIES}
+        self.max_wait = {p: 0.0 for p in PRIORITIES}
+        self.rate_limited = 0
+
+    def _dispatch(self) -> Optional[float]:
+        """Grant waiters at the head of the queue; returns seconds until the head may be granted.
+
+        Must be called with the lock held. None means the head waits for a release.
+        """
+        while self._queue:
+            waiter = self._queue[0]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                return None
+            now = time.monotonic()
+            delay = max(
+                self._paused_until - now,
+                self._requests.wait_time(1, now),
+                self._tokens.wait_time(waiter.permit.tokens, now),
+            )
+            if delay > 0:
+                return delay
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(waiter.permit.tokens)
+            self.in_flight += 1
+            permit = waiter.permit
+            permit.granted_at = now
+            waited = now - permit.queued_at
+            self.granted[permit.priority] += 1
+            self.wait_seconds[permit.priority] += waited
+            self.max_wait[permit.priority] = max(self.max_wait[permit.priority], waited)
+            waiter.granted = True
+            waiter.wake()
+        return None
+
+    def _enqueue(self, tokens: int, **wake: Any) -> _Waiter:
+        name = current_priority()
+        permit = Permit(tokens=max(0, int(tokens)), priority=name, queued_at=time.monotonic())
+        waiter = _Waiter(PRIORITIES[name], next(self._seq), permit, **wake)
+        heapq.heappush(self._queue, waiter)
+        return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            if waiter.granted:
+                self._release(waiter.permit)
+            else:
+                waiter.cancelled = True
+
+    def acquire(self, tokens: int = 0) -> Permit:
+        """Block the calling thread until a call costing ``tokens`` may start."""
+        with self._lock:
+            waiter = self._enqueue(tokens, event=threading.Event())
+            delay = self._dispatch()
+        try:
+            while not waiter.granted:
+                # Releases wake the head directly; the timeout covers bucket refills.
+                waiter.event.wait(timeout=delay if delay is not None else 1.0)
+                waiter.event.clear()
+                with self._lock:
+                    delay = self._dispatch()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return waiter.permit
+
+    async def aacquire(self, tokens: int = 0) -> Permit:
+        """Wait without blocking the event loop until a call costing ``tokens`` may start."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enqueue(tokens, future=loop.create_future(), loop=loop)
+            delay = self._dispatch()
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), delay if delay is not None else 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    delay = self._dispatch()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return waiter.permit
+
+    def _release(self, permit: Permit):
+        self.in_flight -= 1
+        if permit.used_tokens is not None:
+            # Refund an overestimate, or charge the difference of an underestimate.
+            delta = permit.tokens - permit.used_tokens
+            if delta > 0:
+                self._tokens.give(delta)
+            else:
+                self._tokens.take(-delta)
+        self._dispatch()
+
+    def release(self, permit: Permit):
+        """Free the permit's slot and correct the token budget with ``permit.used_tokens``."""
+        with self._lock:
+            self._release(permit)
+
+    def pause(self, seconds: Optional[float] = None):
+        """Hold every queued call for ``seconds`` (default: the cooldown), e.g. after a 429."""
+        seconds = self.cooldown if seconds is None else seconds
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"{self.name}: rate limited, pausing admissions for {seconds:.1f}s")
+
+    @contextmanager
+    def slot(self, tokens: int = 0):
+        """Hold a slot for the duration of a synchronous call."""
+        permit = self.acquire(tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int = 0):
+        """Hold a slot for the duration of an asynchronous call."""
+        permit = await self.aacquire(tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    def stats(self) -> Dict[str, Any]:
+        """Limits, queue depth per priority, calls in flight and wait times."""
+        with self._lock:
+            queued = {p: 0 for p in PRIORITIES}
+            for waiter in self._queue:
+                if not waiter.cancelled:
+                    queued[waiter.permit.priority] += 1
+            return {
+                "name": self.name,
+                "max_concurrency": self.max_concurrency,
+                "requests_per_minute": self._requests.per_minute,
+                "tokens_per_minute": self._tokens.per_minute,
+                "in_flight": self.in_flight,
+                "queued": queued,
+                "granted": dict(self.granted),
+                "avg_wait_ms": {
+                    p: round(1000 * self.wait_seconds[p] / self.granted[p], 1) if self.granted[p] else 0.0
+                    for p in PRIORITIES
+                },
+                "max_wait_ms": {p: round(1000 * w, 1) for p, w in self.max_wait.items()},
+                "rate_limited": self.rate_limited,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            }
+
+
+llm_scheduler = RateScheduler("llm", LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+embedding_scheduler = RateScheduler(
+    "embeddings", EMBEDDING_MAX_CONCURRENCY, EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_TOKENS_PER_MINUTE
+)
@@ -0,0 +1,118 @@
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_groups: List["SingleFlight"] = []
+
+
+def flight_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable ``parts``; anything else is keyed by its ``str``."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one call whose result every caller gets.
+
+    Only calls that overlap in time are shared; once a call finishes, the next
+    one with its key runs again. Errors are shared like results. An async
+    call runs as its own task, so a caller that is cancelled does not cancel
+    it for the others; it is cancelled only when every caller has gone.
+    """
+
+    def __init__(self, name: str):
+        """Initialize the group.
+
+        Args:
+            name: Name reported by ``flight_stats``
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+        _groups.append(self)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run ``fn`` unless a call with ``key`` is already running on another thread, then wait for that one."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await ``fn()`` unless a call with ``key`` is already in flight on this event loop, then await that one."""
+        loop = asyncio.get_running_loop()
+        flight_id = (id(loop), key)
+        with self._lock:
+            flight = self._flights.get(flight_id)
+            if flight is None or flight.task.done():
+                flight = self._flights[flight_id] = _Flight(loop.create_task(fn()))
+                flight.task.add_done_callback(functools.partial(self._forget, flight_id, flight))
+                self.calls += 1
+            else:
+                self.shared += 1
+            flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0
+            if abandoned and not flight.task.done():
+                flight.task.cancel()
+            raise
+
+    def _forget(self, flight_id: Hashable, flight: _Flight, task: asyncio.Task):
+        with self._lock:
+            if self._flights.get(flight_id) is flight:
+                del self._flights[flight_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Upstream calls made, calls served by joining one in flight, and calls running now."""
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls) + len(self._flights)}
+
+
+def flight_stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every single-flight group in the process, by name."""
+    return {group.name: group.stats() for group in _groups}
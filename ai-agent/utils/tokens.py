@@ -0,0 +1,49 @@
+import logging
+import os
+from functools import lru_cache
+from typing import List
+
+import tiktoken
+
+logger = logging.getLogger("Tokens")
+
+# Gemini's tokenizer is not available locally; cl100k_base counts within a few
+# percent of it on English prose and code, which is enough for budgeting.
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # The BPE file is downloaded on first use and may be unreachable offline.
+        logger.warning(f"Token encoding {name!r} unavailable ({e}), estimating 4 characters per token")
+        return None
+
+
+def count_tokens(text: str, encoding: str = TOKEN_ENCODING) -> int:
+    """Number of tokens in ``text``."""
+    enc = _encoding(encoding)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def token_windows(text: str, size: int, overlap: int = 0, encoding: str = TOKEN_ENCODING) -> List[str]:
+    """Split ``text`` into pieces of ``size`` tokens, consecutive pieces sharing ``overlap`` tokens."""
+    step = max(1, size - overlap)
+    enc = _encoding(encoding)
+    if enc is None:
+        return [text[i : i + size * 4] for i in range(0, max(1, len(text) - overlap * 4), step * 4)]
+    tokens = enc.encode_ordinary(text)
+    return [enc.decode(tokens[i : i + size]) for i in range(0, max(1, len(tokens) - overlap), step)]
+
+
+def truncate_tokens(text: str, max_tokens: int, encoding: str = TOKEN_ENCODING) -> str:
+    """The longest prefix of ``text`` that fits in ``max_tokens`` tokens."""
+    enc = _encoding(encoding)
+    if enc is None:
+        return text[: max_tokens * 4]
+    tokens = enc.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else enc.decode(tokens[:max_tokens])